@@ -1,10 +1,14 @@
 # app.py
+import os
+import time
 import streamlit as st
-import pandas as pd
-from src.chunking.chunking import (
-    chunk_by_recursive_character,
-    chunk_by_character,
-    chunk_by_token
+from src.utils.cache_util import (
+    cached_resource,
+    chunk_cache,
+    chunk_spans_cached,
+    file_fingerprint,
+    load_corpus_cached,
+    precompute_chunk_grid
 )
 # File path to your articles CSV
 file_path = 'data/articles.csv'
@@ -25,6 +29,49 @@ steps = [
 ]
 selected_step = st.sidebar.radio("Choose Step:", steps)
 
+if os.getenv('RAG_METRICS_PORT'):
+    # Prometheus scrape endpoint for the stage metrics, started once per app process
+    from src.utils.tracing import MetricsServer
+    metrics_server = cached_resource(('metrics_server', os.getenv('RAG_METRICS_PORT')),
+                                     lambda: MetricsServer(port=int(os.getenv('RAG_METRICS_PORT'))).start())
+    st.sidebar.caption(f"Metrics at {metrics_server.url}")
+
+
+def load_chunk_indexes(path, model_name='all-MiniLM-L6-v2'):
+    # Dense and BM25 chunk indexes shared by steps 6 and 9; imported here so other pages stay light
+    from src.utils.bm25_index import BM25Index
+    from src.utils.corpus_loader import chunk_records, clean_records, iter_corpus, iter_records, latest_records
+    from src.utils.embedding_util import EmbeddingEngine
+    from src.utils.vector_store import LocalVectorIndex
+    from src.utils.warm_server import get_model
+
+    model = get_model(model_name)
+
+    def build():
+        # Same chunks and ids as index_corpus; of a URL scraped more than once only the latest version
+        # is indexed, otherwise identical chunks of both versions would share an id
+        bm25_index = BM25Index()
+        ids, texts, metadata = [], [], []
+        records = latest_records(clean_records(iter_records(
+            iter_corpus(path, usecols=['headline', 'content', 'url', 'timestamp'])
+        )))
+        for chunk in chunk_records(records):
+            chunk_metadata = {
+                'headline': chunk['headline'], 'url': chunk['url'],
+                'article_id': chunk['article_id'], 'text': chunk['text'],
+            }
+            bm25_index.add(chunk['id'], chunk['text'], chunk_metadata)
+            ids.append(chunk['id'])
+            texts.append(chunk['text'])
+            metadata.append(chunk_metadata)
+        engine = EmbeddingEngine(model, model_name, cache_dir='data/embedding_cache')
+        dense_index = LocalVectorIndex.from_embeddings(ids, engine.encode(texts), metadata)
+        return dense_index, bm25_index
+
+    dense_index, bm25_index = cached_resource(('chunk_indexes', model_name, file_fingerprint(path)), build)
+    return model, dense_index, bm25_index
+
+
 # Main area - layout for each step
 if selected_step == "1. View Documents":
     st.header("View Documents (News Articles)")
@@ -32,8 +79,8 @@ if selected_step == "1. View Documents":
 
     # Load the filtered articles into a DataFrame
     try:
-        filtered_articles = pd.read_csv(filtered_articles_path)
-        top_articles = filtered_articles.head(20).drop(columns=['Unnamed: 0', 'relevant',"section"])  # Limit to the first 20 articles
+        filtered_articles = load_corpus_cached(filtered_articles_path, nrows=20)  # Limit to the first 20 articles
+        top_articles = filtered_articles.drop(columns=['relevant', "section"], errors='ignore')
     except FileNotFoundError:
         st.error(f"File not found: {filtered_articles_path}")
         st.stop()
@@ -56,8 +103,7 @@ elif selected_step == "2. Chunking / Parsing Techniques":
 
     # Load the filtered articles
     try:
-        filtered_articles = pd.read_csv(filtered_articles_path)
-        top_articles = filtered_articles.head(1)  # Use first article for demonstration
+        top_articles = load_corpus_cached(filtered_articles_path, usecols=['content'], nrows=1)  # Use first article for demonstration
         article_text = top_articles.iloc[0]['content']
     except FileNotFoundError:
         st.error(f"File not found: {filtered_articles_path}")
@@ -97,16 +143,30 @@ elif selected_step == "2. Chunking / Parsing Techniques":
         )
     
     # Parameters for chunking
-    chunk_size = st.slider("Select chunk size:", min_value=100, max_value=2000, value=1000)
-    chunk_overlap = st.slider("Select chunk overlap:", min_value=0, max_value=500, value=200)
+    chunk_size = st.slider("Select chunk size:", min_value=100, max_value=2000, value=1000, step=50)
+    chunk_overlap = st.slider("Select chunk overlap:", min_value=0, max_value=min(500, chunk_size - 50), value=min(200, chunk_size - 50), step=25)
+
+    # Chunk every slider combination in the background so that later interactions are cache hits
+    method_keys = {
+        "Recursive Character-Based": "recursive",
+        "Simple Character-Based": "character",
+        "Token-Based": "token",
+    }
+    precompute_chunk_grid(article_text, list(method_keys.values()), range(100, 2001, 50), range(0, 501, 25))
 
     # Apply the selected chunking method with overlap
-    if chunking_method == "Recursive Character-Based":
-        chunks = chunk_by_recursive_character(article_text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    elif chunking_method == "Simple Character-Based":
-        chunks = chunk_by_character(article_text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    else:
-        chunks = chunk_by_token(article_text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    start = time.perf_counter()
+    hits_before = chunk_cache.hits
+    spans = chunk_spans_cached(article_text, method_keys[chunking_method], chunk_size, chunk_overlap)
+    chunks = [article_text[begin:end] for begin, end in spans]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    cached = chunk_cache.hits > hits_before
+
+    stats = chunk_cache.stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Chunking time", f"{elapsed_ms:.1f} ms", "cache hit" if cached else "cache miss", delta_color="off")
+    col2.metric("Cache hit rate", f"{stats['hit_rate']:.0%}", f"{stats['hits']} hits / {stats['misses']} misses", delta_color="off")
+    col3.metric("Cached chunk results", stats['entries'])
 
     # Display chunks
     st.write(f"Displaying chunks using {chunking_method} method:")
@@ -184,8 +244,111 @@ elif selected_step == "3. Embedding Models for Vectorization":
 elif selected_step == "4. Vector Databases (VectorDBs)":
     st.header("Vector Databases (VectorDBs)")
     st.write("Showcase various vector databases and their performance.")
-    # Placeholder for VectorDB details and comparisons
-    st.info("Vector database performance comparisons will be displayed here.")
+
+    import shutil
+    import pandas as pd
+    from src.utils.compact_store import CompactVectorIndex
+    from src.utils.corpus_loader import iter_records, latest_records
+    from src.utils.embedding_util import EmbeddingEngine, content_hash
+    from src.utils.vector_store import LocalVectorIndex, evaluate_backends
+    from src.utils.warm_server import WarmClient, get_model
+
+    def load_local_indexes(path, model_name='all-MiniLM-L6-v2'):
+        # Served by the warm server if one is running, otherwise loaded into this process once
+        model = get_model(model_name)
+
+        fingerprint = file_fingerprint(path)
+
+        def build():
+            # Same ids as upsert_data_to_pinecone, so results are comparable across backends; of a URL scraped
+            # more than once only the latest version is kept, so every backend holds the same set of ids
+            articles = pd.DataFrame(latest_records(iter_records(
+                [load_corpus_cached(path, usecols=['headline', 'url', 'content', 'timestamp'])]
+            )))
+            engine = EmbeddingEngine(model, model_name, cache_dir='data/embedding_cache')
+            embeddings = engine.encode(articles['content'].fillna('').tolist())
+            ids = articles['article_id'].tolist()
+            metadata = articles[['headline', 'url']].to_dict('records')
+            exact_index = LocalVectorIndex.from_embeddings(ids, embeddings, metadata)
+            ivf_index = LocalVectorIndex.from_embeddings(ids, embeddings, metadata)
+            ivf_index.build_ivf()
+            # Compact layouts keep the float32 vectors memory-mapped on disk and search compressed codes;
+            # one directory per corpus version and model, older versions are removed
+            compact_root = 'data/compact_indexes'
+            compact_name = content_hash(repr((model_name, fingerprint)))[:16]
+            if os.path.isdir(compact_root):
+                for name in os.listdir(compact_root):
+                    if name != compact_name:
+                        shutil.rmtree(os.path.join(compact_root, name), ignore_errors=True)
+            compact_indexes = {}
+            for layout in ("float16", "pq"):
+                layout_dir = os.path.join(compact_root, compact_name, layout)
+                # index.json is written last, so an existing one marks a complete index from an earlier run
+                if os.path.exists(os.path.join(layout_dir, "index.json")):
+                    compact_indexes[f"Compact ({layout})"] = CompactVectorIndex.load(layout_dir)
+                else:
+                    compact_indexes[f"Compact ({layout})"] = CompactVectorIndex.build(layout_dir, ids, embeddings,
+                                                                                      metadata, layout=layout)
+            return exact_index, ivf_index, compact_indexes
+
+        # Rebuilt whenever the articles file changes
+        exact_index, ivf_index, compact_indexes = cached_resource(('local_indexes', model_name, fingerprint), build)
+        return model, exact_index, ivf_index, compact_indexes
+
+    try:
+        model, exact_index, ivf_index, compact_indexes = load_local_indexes(filtered_articles_path)
+    except FileNotFoundError:
+        st.error(f"File not found: {filtered_articles_path}")
+        st.stop()
+    if isinstance(model, WarmClient):
+        st.caption(f"Embeddings and Pinecone queries are served by the warm server at "
+                   f"{model.address[0]}:{model.address[1]}.")
+
+    queries = st.text_area(
+        "Test queries (one per line):",
+        "Biden debate performance\nOlympic swimming gold medal\nKamala Harris running mate\nParis 2024 opening ceremony"
+    ).splitlines()
+    queries = [q for q in queries if q.strip()]
+    top_k = st.slider("Top-k:", min_value=1, max_value=20, value=5)
+    ivf_index.n_probe = st.slider("IVF clusters probed per query:", min_value=1, max_value=len(ivf_index.centroids), value=min(4, len(ivf_index.centroids)))
+
+    rerank_factor = st.slider("Compact layouts: re-ranked candidates per result (0 = no re-ranking):",
+                              min_value=0, max_value=10, value=4)
+    for compact_index in compact_indexes.values():
+        compact_index.rerank_factor = rerank_factor
+
+    backends = {"Local (exact)": exact_index, "Local (IVF)": ivf_index, **compact_indexes}
+    if isinstance(model, WarmClient):
+        # The warm server keeps the Pinecone client connected, so the app never imports it
+        if os.getenv('PINECONE_API_KEY'):
+            backends["Pinecone"] = model.index('pinecone:news-articles-index')
+    elif os.getenv('PINECONE_API_KEY'):
+        from src.utils.pinecone_util import initialize_pinecone
+        backends["Pinecone"] = cached_resource(
+            ('pinecone', 'news-articles-index'),
+            lambda: initialize_pinecone(os.getenv('PINECONE_API_KEY'), "us-east-1", 'news-articles-index')
+        )
+
+    if queries:
+        query_vectors = model.encode(queries)
+        results = evaluate_backends(query_vectors, backends, reference="Local (exact)", top_k=top_k)
+        for row in results:
+            memory_bytes = getattr(backends[row["backend"]], "memory_bytes", None)
+            row["ram_kb"] = memory_bytes() / 1024 if memory_bytes else None
+        st.write(f"{len(exact_index)} articles, {len(queries)} queries. Recall is measured against the exact local search.")
+        st.dataframe(pd.DataFrame(results))
+
+        st.markdown(f"**Top results for:** {queries[0]}")
+        for match in exact_index.query(vector=query_vectors[0], top_k=top_k, include_metadata=True)['matches']:
+            st.write(f"{match['score']:.3f} — {match['metadata']['headline']}")
+
+    st.info(
+        "The local backends keep all vectors in a float32 matrix inside the app process, so a query costs "
+        "one matrix-vector product instead of a network round trip. The IVF variant only scores the vectors "
+        "of the closest clusters, trading some recall for lower latency on larger corpora. The compact layouts "
+        "search float16 copies (2 bytes per dimension) or product-quantized codes (48 bytes per vector) and "
+        "re-rank a shortlist against the float32 vectors, which stay memory-mapped on disk."
+    )
 
 elif selected_step == "5. Prompt Templates for Query Transformation":
     st.header("Prompt Templates for Query Transformation")
@@ -196,8 +359,121 @@ elif selected_step == "5. Prompt Templates for Query Transformation":
 elif selected_step == "6. Retrieval Methods":
     st.header("Retrieval Methods")
     st.write("Present different retrieval strategies and their effectiveness.")
-    # Placeholder for retrieval comparisons
-    st.info("Retrieval strategies and results will be displayed here.")
+
+    from src.utils.query_cache import QueryCache
+    from src.utils.rag_util import (
+        article_key, reciprocal_rank_fusion, retrieve_articles, retrieve_articles_bm25, stream_response
+    )
+
+    try:
+        model, dense_index, bm25_index = load_chunk_indexes(filtered_articles_path)
+    except FileNotFoundError:
+        st.error(f"File not found: {filtered_articles_path}")
+        st.stop()
+
+    st.write(
+        f"{len(bm25_index)} chunks indexed. The BM25 inverted index holds {len(bm25_index.vocabulary)} terms "
+        f"in {bm25_index.memory_bytes() / 2 ** 20:.1f} MB of postings arrays."
+    )
+    query = st.text_input("Query:", "Simone Biles floor final")
+    top_k = st.slider("Top-k:", min_value=1, max_value=20, value=5)
+    candidates = st.slider("Candidates per retriever for fusion:", min_value=top_k, max_value=100, value=max(top_k, 20))
+
+    if query.strip():
+        start = time.perf_counter()
+        dense = retrieve_articles(query, model, dense_index, top_k=candidates)
+        dense_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        sparse = retrieve_articles_bm25(query, bm25_index, top_k=candidates)
+        sparse_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        hybrid = reciprocal_rank_fusion([dense, sparse], top_k=top_k)
+        fusion_ms = (time.perf_counter() - start) * 1000
+
+        dense_ids = {m['id'] for m in dense[:top_k]}
+        sparse_ids = {m['id'] for m in sparse[:top_k]}
+        union = dense_ids | sparse_ids
+        st.write(
+            f"Top-{top_k} overlap between dense and BM25: {len(dense_ids & sparse_ids)} chunks "
+            f"(Jaccard {len(dense_ids & sparse_ids) / len(union) if union else 0:.2f})."
+        )
+
+        columns = st.columns(3)
+        results = [
+            ("Dense (MiniLM)", dense[:top_k], dense_ms),
+            ("BM25", sparse[:top_k], sparse_ms),
+            ("Hybrid (RRF)", hybrid, dense_ms + sparse_ms + fusion_ms),
+        ]
+        for column, (title, matches, latency_ms) in zip(columns, results):
+            column.markdown(f"**{title}**")
+            column.caption(f"{latency_ms:.1f} ms")
+            for match in matches:
+                marker = "🔵" if match['id'] in dense_ids and match['id'] in sparse_ids else ""
+                column.markdown(f"{marker} **{match['metadata']['headline']}** ({match['score']:.3f})")
+                column.caption(match['metadata']['text'][:200] + "...")
+
+        st.info(
+            "Dense retrieval finds paraphrases but can miss exact names; BM25 matches the exact terms but not "
+            "their meaning. Reciprocal rank fusion combines both rankings without having to calibrate their "
+            "scores, so exact-name queries succeed without raising top-k. 🔵 marks chunks found by both retrievers."
+        )
+
+        st.subheader("Answer generation")
+        st.write(
+            "The answer is streamed from the chat model, so the first words appear after the time to first "
+            "token instead of after the whole completion. The context is filled from the fused candidates up to "
+            "an exact token budget; chunks of the same article share one headline and duplicates are dropped."
+        )
+        max_context_tokens = st.slider("Context budget (tokens):", min_value=200, max_value=4000, value=1500, step=100)
+        # One answer cache per corpus version, so changed articles never serve stale answers
+        query_cache = cached_resource(('query_cache', file_fingerprint(filtered_articles_path)),
+                                      lambda: QueryCache(model))
+        query_cache.similarity_threshold = st.slider(
+            "Semantic cache threshold (cosine):", min_value=0.90, max_value=1.00, value=0.97, step=0.01
+        )
+        if st.button("Generate answer"):
+            namespace = ("answer", candidates, max_context_tokens)
+            candidates_fused = reciprocal_rank_fusion([dense, sparse], top_k=candidates)
+            fused_articles = {article_key(match) for match in candidates_fused}
+            # A semantically similar query only reuses an answer built from (nearly) the same articles
+            cached_answer, cache_info = query_cache.lookup(query, namespace=namespace,
+                                                           current_articles=lambda _: fused_articles)
+            if cache_info['level'] is not None:
+                st.write(cached_answer)
+                details = f"similarity {cache_info['similarity']:.3f}"
+                if cache_info['level'] == 'semantic':
+                    details += f", article overlap {cache_info['overlap']:.2f}"
+                st.success(
+                    f"Served from the {cache_info['level']} cache (cached query: \"{cache_info['query']}\", "
+                    f"{details}), saving about {cache_info['saved_ms']:.0f} ms."
+                )
+            else:
+                generation_metrics = {}
+                try:
+                    answer = st.write_stream(stream_response(query, candidates_fused,
+                                                             max_context_tokens=max_context_tokens,
+                                                             metrics=generation_metrics))
+                except Exception as e:
+                    st.error(f"Generation failed: {e}. Set OPENAI_API_KEY, or OPENAI_BASE_URL for a local mock "
+                             f"server (python -m src.utils.mock_openai_server).")
+                else:
+                    # Retrieval runs before every lookup, so a hit saves the generation only
+                    query_cache.store(query, answer, fused_articles, compute_ms=generation_metrics['total_ms'],
+                                      namespace=namespace, embedding=cache_info['embedding'])
+                    ttft_ms = generation_metrics['ttft_ms']
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("Time to first token", f"{ttft_ms:.0f} ms" if ttft_ms is not None else "–")
+                    col2.metric("Total latency", f"{generation_metrics['total_ms']:.0f} ms")
+                    col3.metric("Context tokens", f"{generation_metrics['context_tokens']} / {max_context_tokens}")
+                    col4.metric("Articles / chunks",
+                                f"{generation_metrics['articles']} / {generation_metrics['chunks']}")
+
+        cache_stats = query_cache.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Cached answers", cache_stats['entries'])
+        col2.metric("Exact hit rate", f"{cache_stats['exact_hit_rate']:.0%}")
+        col3.metric("Semantic hit rate", f"{cache_stats['semantic_hit_rate']:.0%}")
+        col4.metric("Latency saved", f"{cache_stats['saved_ms'] / 1000:.1f} s")
 
 elif selected_step == "7. Model Evaluation and Feedback":
     st.header("Model Evaluation and Feedback")
@@ -211,14 +487,149 @@ elif selected_step == "7. Model Evaluation and Feedback":
 elif selected_step == "8. Performance Metrics and Comparisons":
     st.header("Performance Metrics and Comparisons")
     st.write("Compare the performance of different configurations across the pipeline.")
-    # Placeholder for performance metrics and charts
-    st.info("Performance metrics and comparisons will be visualized here.")
+
+    import pandas as pd
+    from src.benchmarks.pipeline_benchmark import BASELINE_RUNS, DEFAULT_RESULTS, find_regressions, load_history
+    from src.utils.tracing import tracer
+
+    # Stages traced in this app process so far, e.g. by steps 6 and 9
+    stage_summary = tracer.metrics.stage_summary()
+    if stage_summary:
+        st.subheader("Live stage metrics")
+        st.dataframe(pd.DataFrame(stage_summary).set_index('stage'))
+
+    history = load_history(DEFAULT_RESULTS)
+    if not history:
+        st.info(
+            "No benchmark results yet. Run `python -m src.benchmarks.pipeline_benchmark` to benchmark "
+            "every pipeline stage offline on the bundled articles; results are appended to "
+            f"`{DEFAULT_RESULTS}`."
+        )
+        st.stop()
+
+    embedders = sorted({run['embedder'] for run in history})
+    embedder = st.selectbox("Embedding model used in the benchmark:", embedders)
+    runs = [run for run in history if run['embedder'] == embedder]
+    latest = runs[-1]
+
+    st.write(
+        f"Latest run: {latest['timestamp']} (commit {latest.get('commit') or 'unknown'}), "
+        f"{latest['docs']} articles, {latest['cpus']} CPUs, Python {latest['python']}."
+    )
+    if len(runs) > 1:
+        # Median of the earlier runs, so a single noisy run neither hides nor causes a regression
+        regressions = find_regressions(runs[-BASELINE_RUNS - 1:-1], latest)
+        if regressions:
+            st.warning("Regressions against the median of the previous runs: " + ", ".join(
+                f"{r['metric']} ({r['change']:+.0%})" for r in regressions))
+        else:
+            st.success("No regressions against the median of the previous runs.")
+    for stage, error in latest.get('errors', {}).items():
+        st.error(f"{stage} was skipped: {error}")
+
+    latest_metrics = pd.DataFrame(
+        [(metric.rsplit('.', 1)[0], metric.rsplit('.', 1)[1], value) for metric, value in latest['metrics'].items()],
+        columns=['stage', 'metric', 'value']
+    ).pivot(index='stage', columns='metric', values='value')
+    st.dataframe(latest_metrics)
+
+    metric_names = sorted(latest['metrics'])
+    default_metrics = [m for m in metric_names if m.startswith('query.') and m.endswith('p95_ms')]
+    selected_metrics = st.multiselect("Metrics over time:", metric_names, default=default_metrics)
+    if selected_metrics:
+        trend = pd.DataFrame(
+            [{metric: run['metrics'].get(metric) for metric in selected_metrics} for run in runs],
+            index=[f"{run['timestamp']} ({run.get('commit') or '?'})" for run in runs]
+        )
+        st.line_chart(trend)
 
 elif selected_step == "9. Error Handling and Explainability":
     st.header("Error Handling and Explainability")
-    st.write("Explain common errors and provide insights into the pipeline.")
-    # Placeholder for error handling and explainability
-    st.info("Error handling insights and explanations will be shown here.")
+    st.write("Trace a query through the pipeline: where the time went, which chunks drove the answer and what failed.")
+
+    import json
+    import pandas as pd
+    from src.utils.rag_util import attribute_answer, generate_response, retrieve_articles_hybrid
+    from src.utils.tracing import tracer
+
+    try:
+        model, dense_index, bm25_index = load_chunk_indexes(filtered_articles_path)
+    except FileNotFoundError:
+        st.error(f"File not found: {filtered_articles_path}")
+        st.stop()
+
+    query = st.text_input("Query:", "Who won the women's gymnastics all-around in Paris?")
+    top_k = st.slider("Chunks retrieved (hybrid):", min_value=1, max_value=20, value=5)
+    generate = st.checkbox("Generate an answer (needs OPENAI_API_KEY, or OPENAI_BASE_URL for the mock server)",
+                           value=bool(os.getenv('OPENAI_API_KEY') or os.getenv('OPENAI_BASE_URL')))
+
+    if st.button("Trace query") and query.strip():
+        matches, answer, generation_metrics = [], None, {}
+        with tracer.span("query", query=query, top_k=top_k) as root:
+            try:
+                matches = retrieve_articles_hybrid(query, model, dense_index, bm25_index, top_k=top_k)
+                if generate:
+                    answer = generate_response(query, matches, metrics=generation_metrics)
+            except Exception as e:
+                # The failing stage is marked in the trace; the page shows it instead of stopping
+                root.fail(e)
+        spans = tracer.trace(root.trace_id)
+
+        for span in spans:
+            if span.status == "error":
+                st.error(f"{span.name} failed: {span.error}")
+        if answer is not None:
+            st.markdown("**Answer**")
+            st.write(answer)
+
+        st.subheader("Where the time went")
+        child_ms = {}
+        for span in spans:
+            if span.parent_id is not None:
+                child_ms[span.parent_id] = child_ms.get(span.parent_id, 0.0) + span.duration_ms
+        trace_rows = [{
+            'stage': "· " * span.depth + span.name,
+            'start_ms': (span.start_time - root.start_time) * 1000,
+            'duration_ms': span.duration_ms,
+            'self_ms': span.duration_ms - child_ms.get(span.span_id, 0.0),
+            'status': span.status,
+            **span.counters,
+        } for span in spans]
+        st.write(f"Total {root.duration_ms:.1f} ms in {len(spans)} spans.")
+        st.dataframe(pd.DataFrame(trace_rows))
+        # Self time excludes child stages, so the bars add up to the total
+        st.bar_chart(pd.DataFrame({'self_ms': [row['self_ms'] for row in trace_rows]},
+                                  index=[f"{row['stage']} ({position})" for position, row in enumerate(trace_rows)]))
+
+        if matches:
+            st.subheader("Which chunks drove the answer")
+            sources = set(generation_metrics.get('sources', []))
+            overlaps = attribute_answer(answer, matches) if answer else [None] * len(matches)
+            st.dataframe(pd.DataFrame([{
+                'rank': rank,
+                'headline': match['metadata']['headline'],
+                'chunk': match['id'],
+                'rrf_score': match['score'],
+                'in_context': match['id'] in sources if generate else None,
+                'answer_overlap': overlap,
+                'text': match['metadata']['text'][:200],
+            } for rank, (match, overlap) in enumerate(zip(matches, overlaps), start=1)]))
+            st.caption(
+                "in_context: the chunk fit into the token budget of the prompt. answer_overlap: share of the "
+                "answer's content words that appear in the chunk, a cheap hint of which chunks the answer used."
+            )
+
+        st.download_button("Download trace (JSON)", json.dumps([span.to_dict() for span in spans], default=str),
+                           file_name=f"trace-{root.trace_id}.json", mime="application/json")
+
+    with st.expander("Prometheus metrics of this app process"):
+        st.code(tracer.metrics.render(), language="text")
+    st.info(
+        "Every pipeline stage (filtering, chunking, embedding, upserting, retrieval and generation) reports a "
+        "span with its latency and counters such as items, bytes, tokens, cache hits, retries and errors. "
+        "Set RAG_TRACE_FILE to append every finished trace to a JSON lines file, or RAG_METRICS_PORT to serve "
+        "the aggregated metrics for Prometheus at /metrics."
+    )
 
 # Footer or additional notes
 st.markdown("---")
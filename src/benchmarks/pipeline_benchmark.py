@@ -0,0 +1,303 @@
+# src/benchmarks/pipeline_benchmark.py
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from src.utils.embedding_util import HashingEmbedder
+
+DEFAULT_CORPUS = 'data/filtered_articles.csv'
+DEFAULT_RESULTS = 'data/benchmarks/results.jsonl'
+
+# Metrics ending in one of these suffixes are better when higher; all others when lower
+HIGHER_IS_BETTER = ("_per_sec", "recall")
+
+# Absolute changes below these are run-to-run noise however large they are relative to a ~10 ms stage.
+# Throughput metrics use the noise floor of their stage's `.seconds`.
+MIN_DELTAS = {".seconds": 0.05, "_ms": 2.0, ".peak_mb": 2.0}
+
+# Number of earlier runs whose median is the baseline of the regression check
+BASELINE_RUNS = 5
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _measure(fn, measure_memory, warm_up=None, min_time=1.0, max_repeat=5):
+    """
+    Times `fn` and, optionally, runs it once more under tracemalloc for the memory peak.
+
+    `warm_up` is called untimed beforehand, e.g. to trigger lazy imports and
+    caches that would otherwise be charged to the first timed call. Short
+    stages are repeated until `min_time` seconds or `max_repeat` runs have
+    passed, and the fastest run counts, which filters out scheduling noise.
+    """
+    if warm_up is not None:
+        warm_up()
+    seconds = float("inf")
+    total = 0.0
+    for _ in range(max_repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        seconds = min(seconds, elapsed)
+        total += elapsed
+        if total >= min_time:
+            break
+    peak_mb = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+def _percentiles(latencies_ms, prefix, metrics):
+    for p in (50, 95, 99):
+        metrics[f"{prefix}.p{p}_ms"] = float(np.percentile(latencies_ms, p))
+
+
+def run_benchmark(corpus_path=DEFAULT_CORPUS, embedder="hashing", query_count=200, top_k=5,
+                  upsert_latency=0.0, measure_memory=True):
+    """
+    Runs every pipeline stage offline on the bundled corpus and collects metrics.
+
+    Pinecone is replaced by FakeIndex and LocalVectorIndex; no stage calls OpenAI.
+
+    Args:
+        corpus_path (str): Article CSV or CorpusStore directory.
+        embedder (str): 'hashing' for the HashingEmbedder stand-in, or a SentenceTransformer model name.
+        query_count (int): Number of retrieval queries (article headlines).
+        top_k (int): Number of matches per query.
+        upsert_latency (float): Simulated round-trip time of the fake index in seconds.
+        measure_memory (bool): Also record the tracemalloc peak of every stage.
+
+    Returns:
+        dict: Run metadata and a flat `metrics` dict, e.g. {'chunk.token.docs_per_sec': ...}.
+    """
+    from src.chunking.chunking import chunk_by_character, chunk_by_recursive_character, chunk_by_token
+    from src.utils.corpus_loader import article_uid, load_corpus
+    from src.utils.fake_index import FakeIndex
+    from src.utils.near_duplicates import NearDuplicateIndex
+    from src.utils.pinecone_util import load_and_preprocess_data, upsert_data_to_pinecone
+    from src.utils.rag_util import retrieve_articles
+    from src.utils.vector_store import LocalVectorIndex
+
+    metrics = {}
+    errors = {}
+
+    def record(stage, seconds, peak_mb, **values):
+        metrics[f"{stage}.seconds"] = seconds
+        if peak_mb is not None:
+            metrics[f"{stage}.peak_mb"] = peak_mb
+        for name, value in values.items():
+            metrics[f"{stage}.{name}"] = value
+
+    # Loading
+    articles, seconds, peak_mb = _measure(lambda: load_corpus(corpus_path), measure_memory)
+    texts = articles['content'].fillna('').tolist()
+    record("load", seconds, peak_mb, docs_per_sec=len(texts) / seconds)
+
+    # Near-duplicate detection, as run before filtering and indexing
+    def dedup():
+        detector = NearDuplicateIndex()
+        for doc_id, text in enumerate(texts):
+            detector.add(doc_id, text)
+        return detector
+    detector, seconds, peak_mb = _measure(dedup, measure_memory)
+    record("dedup", seconds, peak_mb, docs_per_sec=len(texts) / seconds,
+           duplicates=detector.stats()["duplicates"], bytes_per_doc=detector.memory_bytes() / max(len(texts), 1))
+
+    # Chunking
+    chunkers = {
+        "recursive": (chunk_by_recursive_character, 1000, 200),
+        "character": (chunk_by_character, 1000, 200),
+        "token": (chunk_by_token, 200, 50),
+    }
+    for name, (chunker, size, overlap) in chunkers.items():
+        try:
+            # The splitters import langchain and tiktoken on first use, which is not chunking time
+            chunks, seconds, peak_mb = _measure(
+                lambda: [c for t in texts for c in chunker(t, size, overlap)], measure_memory,
+                warm_up=lambda: chunker(texts[0] if texts else "warm up", size, overlap),
+            )
+        except Exception as e:
+            errors[f"chunk.{name}"] = str(e)
+            continue
+        record(f"chunk.{name}", seconds, peak_mb, docs_per_sec=len(texts) / seconds, chunks=len(chunks))
+
+    # Embedding, without the on-disk cache so every run encodes the whole corpus
+    if embedder == "hashing":
+        model = HashingEmbedder()
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(embedder)
+    (df, _), seconds, peak_mb = _measure(
+        lambda: load_and_preprocess_data(corpus_path, model_name=str(embedder), cache_dir=None, model=model),
+        measure_memory,
+    )
+    record("embed", seconds, peak_mb, docs_per_sec=len(df) / seconds)
+
+    # Upsert into the fake Pinecone index
+    def upsert():
+        index = FakeIndex(latency=upsert_latency)
+        upsert_data_to_pinecone(index, df)
+        return index
+    fake_index, seconds, peak_mb = _measure(upsert, measure_memory)
+    record("upsert", seconds, peak_mb, vectors_per_sec=len(df) / seconds)
+
+    # Query latency through retrieve_articles for both index stand-ins
+    ids = [article_uid(row) for row in df.to_dict('records')]
+    local_index = LocalVectorIndex.from_embeddings(
+        ids, np.stack(df['content_embedding']), df[['headline', 'url']].to_dict('records'),
+    )
+    queries = df['headline'].fillna('').tolist()[:query_count]
+    # Measure search cost only, not the simulated round trip
+    fake_index.latency = 0.0
+    for name, index in (("local", local_index), ("fake_pinecone", fake_index)):
+        latencies = []
+        hits = 0
+        for query_no, query in enumerate(queries):
+            start = time.perf_counter()
+            matches = retrieve_articles(query, model, index, top_k=top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            # A headline should retrieve its own article
+            hits += ids[query_no] in [m['id'] for m in matches]
+        _percentiles(latencies, f"query.{name}", metrics)
+        metrics[f"query.{name}.recall"] = hits / len(queries) if queries else 0.0
+        metrics[f"query.{name}.queries_per_sec"] = len(queries) / (sum(latencies) / 1000) if latencies else 0.0
+
+    return {
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "corpus": corpus_path,
+        "docs": len(texts),
+        "embedder": embedder,
+        "metrics": metrics,
+        "errors": errors,
+    }
+
+
+def append_result(result, path=DEFAULT_RESULTS):
+    """
+    Appends one benchmark run as a JSON line to `path`.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+def load_history(path=DEFAULT_RESULTS):
+    """
+    Reads all benchmark runs from `path`, oldest first.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline_metrics(runs):
+    """
+    Returns the median of every metric over `runs`, so that a single noisy run is no baseline.
+    """
+    values = {}
+    for run in runs:
+        for metric, value in run["metrics"].items():
+            values.setdefault(metric, []).append(value)
+    return {metric: float(np.median(series)) for metric, series in values.items()}
+
+
+def _is_noise(metric, before, value, baseline, latest):
+    for suffix, min_delta in MIN_DELTAS.items():
+        if metric.endswith(suffix):
+            return abs(value - before) < min_delta
+    if metric.endswith("_per_sec"):
+        seconds = metric.rsplit(".", 1)[0] + ".seconds"
+        if seconds in baseline and seconds in latest:
+            return abs(latest[seconds] - baseline[seconds]) < MIN_DELTAS[".seconds"]
+    return False
+
+
+def find_regressions(previous, latest, threshold=0.2):
+    """
+    Lists metrics of `latest` that are more than `threshold` worse than before.
+
+    The baseline is the median over the earlier runs, and changes smaller
+    than the absolute noise floors in MIN_DELTAS are ignored, so that stages
+    taking a few milliseconds do not trip the relative threshold.
+
+    Args:
+        previous (dict | list): An earlier run as returned by `run_benchmark`, or a list of earlier runs.
+        latest (dict): The run to check.
+        threshold (float): Allowed relative change, 0.2 = 20 %.
+
+    Returns:
+        list: Dicts with metric, previous (baseline), latest and relative change.
+    """
+    baseline = baseline_metrics([previous] if isinstance(previous, dict) else previous)
+    regressions = []
+    for metric, value in latest["metrics"].items():
+        before = baseline.get(metric)
+        if before is None or before == 0 or metric.endswith((".chunks", ".duplicates")):
+            continue
+        change = (value - before) / abs(before)
+        worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+        if worse > threshold and not _is_noise(metric, before, value, baseline, latest["metrics"]):
+            regressions.append({"metric": metric, "previous": before, "latest": value, "change": change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the RAG pipeline stages.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--embedder", default="hashing",
+                        help="'hashing' (offline stand-in) or a SentenceTransformer model name")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--upsert-latency", type=float, default=0.0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", default=DEFAULT_RESULTS)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    history = [run for run in load_history(args.output) if run.get("embedder") == args.embedder]
+    result = run_benchmark(args.corpus, embedder=args.embedder, query_count=args.queries, top_k=args.top_k,
+                           upsert_latency=args.upsert_latency, measure_memory=not args.no_memory)
+    append_result(result, args.output)
+
+    for metric, value in sorted(result["metrics"].items()):
+        print(f"{metric:<40} {value:>12.3f}")
+    for stage, error in result["errors"].items():
+        print(f"{stage}: skipped ({error})")
+
+    regressions = find_regressions(history[-BASELINE_RUNS:], result, args.threshold) if history else []
+    for regression in regressions:
+        print(f"REGRESSION {regression['metric']}: {regression['previous']:.3f} -> "
+              f"{regression['latest']:.3f} ({regression['change']:+.0%})")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# src/benchmarks/startup_profile.py
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+
+# What each page of app.py imports when it is opened; the shell runs on every page
+STEP_IMPORTS = {
+    "app shell": ["streamlit", "src.utils.cache_util"],
+    "1. View Documents": ["src.utils.corpus_loader"],
+    "2. Chunking / Parsing Techniques": ["src.chunking.chunking", "langchain.text_splitter"],
+    "4. Vector Databases (VectorDBs)": [
+        "pandas", "src.utils.compact_store", "src.utils.corpus_loader", "src.utils.embedding_util",
+        "src.utils.vector_store", "src.utils.warm_server",
+    ],
+    "4. with in-process model": ["sentence_transformers"],
+    "6. Retrieval Methods": [
+        "src.utils.bm25_index", "src.utils.corpus_loader", "src.utils.embedding_util", "src.utils.query_cache",
+        "src.utils.rag_util", "src.utils.vector_store", "src.utils.warm_server",
+    ],
+    "6. answer generation": ["openai", "tiktoken"],
+    "8. Performance Metrics and Comparisons": ["pandas", "src.benchmarks.pipeline_benchmark"],
+}
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """
+    Parses the output of `python -X importtime`.
+
+    Returns:
+        list: One dict per imported module with `module`, `self_us`,
+            `cumulative_us` and the nesting `depth` (0 for top-level imports).
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                "module": module,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": (len(indent) - 1) // 2,
+            })
+    return entries
+
+
+def profile_imports(modules, baseline=(), python=sys.executable, top=10):
+    """
+    Imports modules in a fresh interpreter and reports where the time goes.
+
+    Every call starts a new process, so nothing is cached in `sys.modules`;
+    only the operating system's file cache is warm. Modules in `baseline`
+    are imported first and not counted, e.g. what the app shell already loaded.
+
+    Args:
+        modules (list): Module names to import.
+        baseline (iterable): Module names imported beforehand.
+        python (str): Interpreter to profile.
+        top (int): Number of packages listed in `top_packages`.
+
+    Returns:
+        dict: `import_ms` (sum of the self times), `wall_ms` of the imports,
+            `modules` (number of newly imported modules), `top_packages`
+            ([package, ms] summed over the modules of each top-level package),
+            `missing` (modules that could not be imported) and `error`.
+    """
+    # Everything the baseline imports is in sys.modules before the profiled section starts;
+    # modules that are not installed are reported instead of failing the whole page
+    code = (
+        "import json, sys, time\n"
+        "missing = []\n"
+        "def load(name):\n"
+        "    try:\n"
+        "        __import__(name)\n"
+        "    except ImportError as e:\n"
+        "        missing.append(f'{name} ({e.name})')\n"
+        f"for name in {list(baseline)!r}: load(name)\n"
+        "sys.stderr.write('--- profile ---\\n')\n"
+        "missing.clear()\n"
+        "start = time.perf_counter()\n"
+        f"for name in {list(modules)!r}: load(name)\n"
+        "print(json.dumps({'wall_ms': (time.perf_counter() - start) * 1000, 'missing': missing}))\n"
+    )
+    start = time.perf_counter()
+    process = subprocess.run([python, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    process_ms = (time.perf_counter() - start) * 1000
+    if process.returncode != 0:
+        error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"
+        return {"import_ms": None, "wall_ms": None, "process_ms": process_ms, "modules": 0,
+                "top_packages": [], "missing": [], "error": error}
+
+    entries = parse_importtime(process.stderr.split("--- profile ---", 1)[-1])
+    # Self times add up without double counting, so they are summed per top-level package
+    packages = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + entry["self_us"]
+    top_packages = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    return {
+        "import_ms": sum(entry["self_us"] for entry in entries) / 1000,
+        "wall_ms": result["wall_ms"],
+        "process_ms": process_ms,
+        "modules": len(entries),
+        "top_packages": [[package, us / 1000] for package, us in top_packages],
+        "missing": result["missing"],
+        "error": None,
+    }
+
+
+def profile_steps(steps=STEP_IMPORTS, python=sys.executable, top=5):
+    """
+    Profiles the imports of every app page on top of the app shell.
+
+    Returns:
+        list: One row per page, see `profile_imports`.
+    """
+    shell = steps.get("app shell", [])
+    rows = []
+    for step, modules in steps.items():
+        baseline = () if step == "app shell" else shell
+        rows.append(dict(profile_imports(modules, baseline, python=python, top=top), step=step))
+    return rows
+
+
+def profile_model_startup(model_name='all-MiniLM-L6-v2', address=None):
+    """
+    Compares getting a usable embedding model in-process with connecting to the warm server.
+
+    Returns:
+        dict: `local_ms` (import and load in this process, including the
+            first encode), and `warm_ms` (connect and first encode) or None
+            if no warm server for `model_name` is running.
+    """
+    from src.utils.warm_server import connect
+
+    start = time.perf_counter()
+    client = connect(address)
+    warm_ms = None
+    if client is not None and client.model_name == model_name:
+        client.encode(["startup probe"])
+        warm_ms = (time.perf_counter() - start) * 1000
+    if client is not None:
+        client.close()
+
+    from src.utils.embedding_pool import load_model
+
+    start = time.perf_counter()
+    load_model(model_name).encode(["startup probe"])
+    local_ms = (time.perf_counter() - start) * 1000
+    return {"model": model_name, "local_ms": local_ms, "warm_ms": warm_ms}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the import time of every app page.")
+    parser.add_argument("--top", type=int, default=5, help="slowest packages listed per page")
+    parser.add_argument("--model", default=None, help="also time loading this model against the warm server")
+    parser.add_argument("--json", action="store_true", help="print the rows as JSON")
+    args = parser.parse_args(argv)
+
+    rows = profile_steps(top=args.top)
+    if args.json:
+        print(json.dumps(rows, indent=1))
+    else:
+        print(f"{'page':42} {'wall_ms':>9} {'modules':>8}  slowest packages (ms)")
+        for row in rows:
+            if row["error"]:
+                print(f"{row['step']:42} {'-':>9} {'-':>8}  {row['error']}")
+                continue
+            packages = ", ".join(f"{package} {ms:.0f}" for package, ms in row["top_packages"])
+            missing = f" [not installed: {', '.join(row['missing'])}]" if row["missing"] else ""
+            print(f"{row['step']:42} {row['wall_ms']:9.0f} {row['modules']:8d}  {packages}{missing}")
+
+    if args.model:
+        startup = profile_model_startup(args.model)
+        warm = f"{startup['warm_ms']:.0f} ms" if startup["warm_ms"] is not None else "no warm server running"
+        print(f"{args.model}: in-process load {startup['local_ms']:.0f} ms, warm server {warm}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
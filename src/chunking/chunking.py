@@ -1,9 +1,39 @@
 # src/chunking/chunking.py
-from langchain.text_splitter import (
-    RecursiveCharacterTextSplitter,
-    CharacterTextSplitter,
-    TokenTextSplitter
-)
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from src.utils.tracing import text_bytes, tracer
+
+RECURSIVE_SEPARATORS = ["\n\n", "\n", ".", " "]
+
+# Below this many documents chunk_corpus runs inline by default, since starting worker processes costs more
+MIN_PARALLEL_DOCS = 1000
+
+# langchain is imported on first use, so importing this module stays cheap
+@lru_cache(maxsize=32)
+def _recursive_splitter(chunk_size, chunk_overlap):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=RECURSIVE_SEPARATORS
+    )
+
+@lru_cache(maxsize=32)
+def _token_splitter(chunk_size, chunk_overlap):
+    from langchain.text_splitter import TokenTextSplitter
+    return TokenTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+
+@lru_cache(maxsize=4)
+def _encoding(name="gpt2"):
+    # Same encoding as the TokenTextSplitter default
+    import tiktoken
+    return tiktoken.get_encoding(name)
 
 def chunk_by_recursive_character(text, chunk_size=1000, chunk_overlap=200):
     """
@@ -17,12 +47,11 @@ def chunk_by_recursive_character(text, chunk_size=1000, chunk_overlap=200):
     Returns:
         list: A list of text chunks.
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ".", " "]
-    )
-    return text_splitter.split_text(text)
+    with tracer.span("chunk.recursive") as span:
+        chunks = _recursive_splitter(chunk_size, chunk_overlap).split_text(text)
+        span.add("items", len(chunks))
+        span.add("bytes", text_bytes(text))
+    return chunks
 
 def chunk_by_character(text, chunk_size=1000, chunk_overlap=200):
     """
@@ -36,13 +65,10 @@ def chunk_by_character(text, chunk_size=1000, chunk_overlap=200):
     Returns:
         list: A list of text chunks.
     """
-    chunks = []
-    current_pos = 0
-    while current_pos < len(text):
-        end_pos = current_pos + chunk_size
-        chunk = text[current_pos:end_pos]
-        chunks.append(chunk)
-        current_pos += chunk_size - chunk_overlap  # Adjust position for overlap
+    with tracer.span("chunk.character") as span:
+        chunks = [text[start:end] for start, end in character_spans(text, chunk_size, chunk_overlap)]
+        span.add("items", len(chunks))
+        span.add("bytes", text_bytes(text))
     return chunks
 
 def chunk_by_token(text, chunk_size=200, chunk_overlap=50):
@@ -57,8 +83,175 @@ def chunk_by_token(text, chunk_size=200, chunk_overlap=50):
     Returns:
         list: A list of text chunks.
     """
-    text_splitter = TokenTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap
-    )
-    return text_splitter.split_text(text)
+    with tracer.span("chunk.token") as span:
+        chunks = _token_splitter(chunk_size, chunk_overlap).split_text(text)
+        span.add("items", len(chunks))
+        span.add("bytes", text_bytes(text))
+    return chunks
+
+def character_spans(text, chunk_size=1000, chunk_overlap=200):
+    """
+    Computes fixed-size character chunks as (start, end) offsets.
+
+    Args:
+        text (str): The input text to chunk.
+        chunk_size (int): Maximum number of characters per chunk.
+        chunk_overlap (int): Number of overlapping characters between chunks.
+
+    Returns:
+        list: (start, end) offsets into `text`.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+    step = chunk_size - chunk_overlap  # Adjust position for overlap
+    return [(start, min(start + chunk_size, len(text))) for start in range(0, len(text), step)]
+
+def recursive_character_spans(text, chunk_size=1000, chunk_overlap=200):
+    """
+    Runs the recursive character splitter and maps its chunks back to (start, end) offsets.
+
+    Each chunk is searched for starting `chunk_overlap` characters before the
+    end of the previous one, so the lookup stays linear in the length of the text.
+
+    Args:
+        text (str): The input text to chunk.
+        chunk_size (int): Maximum number of characters per chunk.
+        chunk_overlap (int): Number of overlapping characters between chunks.
+
+    Returns:
+        list: (start, end) offsets into `text`.
+
+    Raises:
+        ValueError: If the splitter returned a chunk that is not a substring of `text`.
+    """
+    spans = []
+    previous_end = 0
+    for chunk in _recursive_splitter(chunk_size, chunk_overlap).split_text(text):
+        start = text.find(chunk, max(0, previous_end - chunk_overlap))
+        if start < 0:
+            start = text.find(chunk)
+        if start < 0:
+            raise ValueError(f"Chunk not found in the text: {chunk[:50]!r}")
+        spans.append((start, start + len(chunk)))
+        previous_end = start + len(chunk)
+    return spans
+
+def token_spans(texts, chunk_size=200, chunk_overlap=50, num_threads=None):
+    """
+    Tokenizes a batch of texts once and cuts token windows into (start, end) character offsets.
+
+    Args:
+        texts (list): The input texts.
+        chunk_size (int): Maximum number of tokens per chunk.
+        chunk_overlap (int): Number of overlapping tokens between chunks.
+        num_threads (int): Threads used by the tokenizer, defaults to the number of cores.
+
+    Returns:
+        list: One list of (start, end) offsets per text.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+    encoding = _encoding()
+    step = chunk_size - chunk_overlap
+    batch_tokens = encoding.encode_ordinary_batch(list(texts), num_threads=num_threads or os.cpu_count() or 1)
+    result = []
+    for text, tokens in zip(texts, batch_tokens):
+        _, offsets = encoding.decode_with_offsets(tokens)
+        offsets.append(len(text))
+        spans = []
+        for start in range(0, len(tokens), step):
+            end = min(start + chunk_size, len(tokens))
+            spans.append((offsets[start], offsets[end]))
+            if end == len(tokens):
+                break
+        result.append(spans)
+    return result
+
+def _chunk_batch(method, doc_ids, texts, chunk_size, chunk_overlap):
+    if method == "token":
+        batch_spans = token_spans(texts, chunk_size, chunk_overlap, num_threads=1)
+    elif method == "character":
+        batch_spans = [character_spans(text, chunk_size, chunk_overlap) for text in texts]
+    elif method == "recursive":
+        batch_spans = [recursive_character_spans(text, chunk_size, chunk_overlap) for text in texts]
+    else:
+        raise ValueError(f"Unknown chunking method: {method}")
+    return [(doc_id, start, end) for doc_id, spans in zip(doc_ids, batch_spans) for start, end in spans]
+
+def _batches(documents, batch_size):
+    doc_ids, texts = [], []
+    for doc_id, text in documents:
+        doc_ids.append(doc_id)
+        texts.append("" if text is None else str(text))
+        if len(texts) == batch_size:
+            yield doc_ids, texts
+            doc_ids, texts = [], []
+    if texts:
+        yield doc_ids, texts
+
+# chunk_corpus method computing the same chunks as each per-document chunker
+CORPUS_METHODS = {
+    chunk_by_recursive_character: "recursive",
+    chunk_by_character: "character",
+    chunk_by_token: "token",
+}
+
+def chunk_corpus(documents, method="recursive", chunk_size=1000, chunk_overlap=200, n_jobs=None, batch_size=256):
+    """
+    Chunks a whole corpus and yields offset spans instead of copied strings.
+
+    Documents are processed in batches; with `n_jobs` > 1 the batches are
+    spread over worker processes, keeping at most two batches per worker in
+    flight. Without `n_jobs`, corpora of fewer than `MIN_PARALLEL_DOCS`
+    documents are chunked inline. Splitters and the tokenizer are created once per process and
+    reused, and the token method tokenizes every document exactly once.
+
+    Args:
+        documents (iterable): (doc_id, text) pairs.
+        method (str): 'recursive', 'character' or 'token'.
+        chunk_size (int): Maximum chunk size in characters (tokens for 'token').
+        chunk_overlap (int): Overlap between chunks in characters (tokens for 'token').
+        n_jobs (int): Number of worker processes, defaults to the number of cores for large corpora; 1 runs inline.
+        batch_size (int): Number of documents per batch.
+
+    Yields:
+        tuple: (doc_id, start, end) with `text[start:end]` being the chunk, in document order.
+    """
+    batches = _batches(documents, batch_size)
+    if n_jobs is None:
+        # Read ahead until the corpus is known to be large enough for a process pool
+        head, docs = [], 0
+        for batch in batches:
+            head.append(batch)
+            docs += len(batch[0])
+            if docs >= MIN_PARALLEL_DOCS:
+                break
+        n_jobs = (os.cpu_count() or 1) if docs >= MIN_PARALLEL_DOCS else 1
+        batches = itertools.chain(head, batches)
+    if n_jobs == 1:
+        for doc_ids, texts in batches:
+            yield from _chunk_batch(method, doc_ids, texts, chunk_size, chunk_overlap)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        pending = []
+        for doc_ids, texts in batches:
+            pending.append(executor.submit(_chunk_batch, method, doc_ids, texts, chunk_size, chunk_overlap))
+            if len(pending) >= 2 * n_jobs:
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
+
+def span_text(texts, span):
+    """
+    Returns the text of a chunk span.
+
+    Args:
+        texts (dict): Mapping of doc_id to the original text.
+        span (tuple): (doc_id, start, end) as produced by `chunk_corpus`.
+
+    Returns:
+        str: The chunk text.
+    """
+    doc_id, start, end = span
+    return texts[doc_id][start:end]
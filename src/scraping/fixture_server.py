@@ -0,0 +1,201 @@
+# src/scraping/fixture_server.py
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from src.scraping.scraper import ValidatorCache, create_session, parse_headlines, scrape_bbc_news
+
+
+def fixture_file(directory, path):
+    """
+    Maps a URL path to a fixture file: '/news/articles/abc' -> 'news/articles/abc.html'.
+    """
+    path = urlparse(path).path.strip("/") or "index"
+    return os.path.join(directory, *path.split("/")) + ".html"
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves saved pages with ETag and Last-Modified headers and answers
+    matching conditional requests with 304 Not Modified.
+    """
+
+    def __init__(self, *args, directory=None, latency=0.0, **kwargs):
+        self.directory = directory
+        self.latency = latency
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        file_path = fixture_file(self.directory, self.path)
+        if not os.path.isfile(file_path):
+            self.send_error(404)
+            return
+        with open(file_path, "rb") as f:
+            body = f.read()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        mtime = int(os.path.getmtime(file_path))
+
+        not_modified = self.headers.get("If-None-Match") == etag
+        if not not_modified and self.headers.get("If-Modified-Since") and not self.headers.get("If-None-Match"):
+            try:
+                not_modified = parsedate_to_datetime(self.headers["If-Modified-Since"]).timestamp() >= mtime
+            except (TypeError, ValueError):
+                pass
+
+        self.send_response(304 if not_modified else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        if not_modified:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """
+    Local HTTP server for saved BBC pages, usable as a context manager.
+
+    The front page is expected at `<directory>/news.html` and articles at
+    `<directory>/news/articles/<id>.html`, mirroring the URL paths on bbc.com.
+
+    Args:
+        directory (str): Directory with the saved pages.
+        latency (float): Seconds of simulated server latency per request.
+        port (int): Port to listen on, 0 picks a free port.
+    """
+
+    def __init__(self, directory, latency=0.0, port=0):
+        handler = partial(FixtureRequestHandler, directory=directory, latency=latency)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def save_fixture_pages(directory, url="https://www.bbc.com/news", session=None):
+    """
+    Downloads the live front page and all linked articles into a fixture directory.
+
+    Article links are rewritten to relative paths so that the saved front page
+    points at the fixture server instead of bbc.com.
+
+    Args:
+        directory (str): Target directory.
+        url (str): URL of the front page.
+        session (requests.Session): Session to use, a new pooled session if None.
+
+    Returns:
+        int: Number of saved pages.
+    """
+    session = session or create_session()
+    front_page = session.get(url, timeout=10).content
+    pages = {urlparse(url).path: front_page.replace(b"https://www.bbc.com/", b"/")}
+    for _, article_url in parse_headlines(front_page, url):
+        response = session.get(article_url, timeout=10)
+        if response.status_code == 200:
+            pages[urlparse(article_url).path] = response.content
+    for path, body in pages.items():
+        file_path = fixture_file(directory, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(body)
+    return len(pages)
+
+
+def make_synthetic_fixtures(directory, n_articles=100, paragraphs=20):
+    """
+    Writes BBC-like pages with the same markup the scraper parses, for benchmarks without saved pages.
+    """
+    os.makedirs(os.path.join(directory, "news", "articles"), exist_ok=True)
+    cards = []
+    for i in range(n_articles):
+        cards.append(f'<a href="/news/articles/a{i:05d}"><h2 data-testid="card-headline">Headline {i}</h2></a>')
+        body = "".join(f"<p>Paragraph {p} of article {i}. " + "Lorem ipsum dolor sit amet. " * 10 + "</p>"
+                       for p in range(paragraphs))
+        article = (
+            "<html><body><article>"
+            f'<time>{i % 23 + 1} hours ago</time><span data-testid="byline-name">By Reporter {i}</span>{body}'
+            "</article></body></html>"
+        )
+        with open(os.path.join(directory, "news", "articles", f"a{i:05d}.html"), "w", encoding="utf-8") as f:
+            f.write(article)
+    with open(os.path.join(directory, "news.html"), "w", encoding="utf-8") as f:
+        f.write("<html><body>" + "".join(cards) + "</body></html>")
+
+
+def benchmark_scraper(directory, worker_counts=(1, 4, 8, 16), latency=0.05, parser=None):
+    """
+    Measures scraping throughput in pages per second against a FixtureServer.
+
+    A second run per configuration checks that the conditional GET of the
+    unchanged front page short-circuits the scrape.
+
+    Args:
+        directory (str): Fixture directory, see `make_synthetic_fixtures` and `save_fixture_pages`.
+        worker_counts (tuple): Concurrency levels to compare.
+        latency (float): Simulated server latency per request.
+        parser (str): BeautifulSoup parser to use.
+
+    Returns:
+        list: One result dict per concurrency level.
+    """
+    results = []
+    with FixtureServer(directory, latency=latency) as server:
+        for max_workers in worker_counts:
+            validators = ValidatorCache()
+            session = create_session(pool_size=max_workers)
+            start = time.perf_counter()
+            df = scrape_bbc_news(f"{server.url}/news", session=session, max_workers=max_workers,
+                                 validators=validators, parser=parser)
+            seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            unchanged = scrape_bbc_news(f"{server.url}/news", session=session, known_urls=set(df["url"]),
+                                        max_workers=max_workers, validators=validators, parser=parser)
+            results.append({
+                "max_workers": max_workers,
+                "articles": len(df),
+                "seconds": seconds,
+                "pages_per_sec": (len(df) + 1) / seconds,
+                "rescrape_articles": len(unchanged),
+                "rescrape_seconds": time.perf_counter() - start,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        fixture_dir = sys.argv[1]
+        results = benchmark_scraper(fixture_dir)
+    else:
+        with tempfile.TemporaryDirectory() as fixture_dir:
+            make_synthetic_fixtures(fixture_dir)
+            results = benchmark_scraper(fixture_dir)
+    for result in results:
+        print(result)
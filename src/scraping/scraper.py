@@ -0,0 +1,290 @@
+# src/scraping/scraper.py
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urljoin
+
+import pandas as pd
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+FAILED_CONTENT = "Failed to retrieve the article content."
+COLUMNS = ["headline", "content", "timestamp", "url", "author", "publication_date"]
+
+
+def default_parser():
+    """
+    Returns the fastest available BeautifulSoup parser: 'lxml' if installed, else 'html.parser'.
+
+    lxml is not a declared dependency. Without it the standard library parser
+    is used, which extracts the same content but parses pages a few times
+    slower; `pip install lxml` enables the faster parser.
+    """
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+def create_session(pool_size=16, retries=3):
+    """
+    Creates a requests session with a connection pool and retries on transient errors.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host.
+        retries (int): Number of retries for connection errors and 429/5xx responses.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "Mozilla/5.0 (compatible; bbc-llm-showcase)"
+    return session
+
+
+class ValidatorCache:
+    """
+    Stores ETag and Last-Modified headers per URL for conditional GET requests.
+
+    Args:
+        path (str): JSON file the validators are persisted to, or None to keep them in memory only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.validators = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.validators = json.load(f)
+        self._lock = threading.Lock()
+
+    def headers(self, url):
+        """Returns the If-None-Match / If-Modified-Since headers for `url`."""
+        stored = self.validators.get(url, {})
+        headers = {}
+        if stored.get("etag"):
+            headers["If-None-Match"] = stored["etag"]
+        if stored.get("last_modified"):
+            headers["If-Modified-Since"] = stored["last_modified"]
+        return headers
+
+    def update(self, url, response):
+        """Remembers the validators of a 200 response."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._lock:
+                self.validators[url] = {"etag": etag, "last_modified": last_modified}
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.validators, f)
+
+
+def fetch(session, url, validators=None, timeout=10):
+    """
+    GETs a page, conditionally if validators for it are known.
+
+    Args:
+        session (requests.Session): The session to use.
+        url (str): The page URL.
+        validators (ValidatorCache): Optional validator cache.
+        timeout (float): Request timeout in seconds.
+
+    Returns:
+        requests.Response: The response; status 304 means the page is unchanged.
+    """
+    headers = validators.headers(url) if validators is not None else {}
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 200 and validators is not None:
+        validators.update(url, response)
+    return response
+
+
+def calculate_pub_date(relative_time, now=None):
+    """
+    Converts a relative time such as '3 hours ago' into an absolute timestamp.
+
+    Args:
+        relative_time (str): The relative time shown on the article page.
+        now (datetime): Reference time, defaults to the current time.
+
+    Returns:
+        str: The publication date as '%Y-%m-%d %H:%M:%S', or 'Unknown'.
+    """
+    # Get the current time
+    current_time = now or datetime.now()
+    # Match the relative time format (e.g., "3 hours ago")
+    match = re.match(r'(\d+)\s*(\w+)', relative_time)
+    if match:
+        quantity = int(match.group(1))
+        unit = match.group(2)
+        # Subtract the relative time from the current time
+        if 'hour' in unit:
+            pub_date = current_time - timedelta(hours=quantity)
+        elif 'minute' in unit:
+            pub_date = current_time - timedelta(minutes=quantity)
+        elif 'second' in unit:
+            pub_date = current_time - timedelta(seconds=quantity)
+        elif 'day' in unit:
+            pub_date = current_time - timedelta(days=quantity)
+        else:
+            pub_date = current_time
+        return pub_date.strftime('%Y-%m-%d %H:%M:%S')
+    return 'Unknown'
+
+
+def parse_article(html, parser=None):
+    """
+    Extracts text, author and publication date from a BBC article page.
+
+    Args:
+        html (bytes): The page content.
+        parser (str): BeautifulSoup parser, defaults to `default_parser()`.
+
+    Returns:
+        tuple: (article_text, author, pub_date)
+    """
+    soup = BeautifulSoup(html, parser or default_parser())
+
+    # Extract the main article content
+    article_body = soup.find('article')
+    if not article_body:
+        # Fallback to a different class if the article tag is not found
+        article_body = soup.find('div', class_='ssrcss-uf6wea-RichTextComponentWrapper e1xue1i86')
+        if not article_body:
+            return FAILED_CONTENT, "Unknown", "Unknown"
+    paragraphs = article_body.find_all('p')
+
+    # Join the paragraph texts into a single string
+    article_text = ' '.join([paragraph.get_text() for paragraph in paragraphs])
+
+    # Extract additional metadata
+    author_tag = soup.find('span', {'data-testid': 'byline-name'})
+    if not author_tag:
+        author_tag = soup.find('div', class_='ssrcss-68pt20-Text-TextContributorName e8mq1e96')
+    author = author_tag.get_text().replace('By', '').strip() if author_tag else 'Unknown'
+
+    time_tag = soup.find('time')
+    pub_date = calculate_pub_date(time_tag.get_text()) if time_tag else 'Unknown'
+    return article_text, author, pub_date
+
+
+def parse_headlines(html, page_url, parser=None):
+    """
+    Extracts (headline, absolute article URL) pairs from the BBC News front page.
+
+    Args:
+        html (bytes): The page content.
+        page_url (str): URL of the page, used to resolve relative links.
+        parser (str): BeautifulSoup parser, defaults to `default_parser()`.
+
+    Returns:
+        list: (headline, url) tuples in page order, without duplicate URLs.
+    """
+    soup = BeautifulSoup(html, parser or default_parser())
+    headlines = []
+    seen = set()
+    # Find all headlines with the specific data-testid
+    for headline in soup.find_all('h2', {'data-testid': 'card-headline'}):
+        link = headline.find_parent('a')
+        if link is None or not link.get('href'):
+            continue
+        # Ensure the URL is absolute
+        article_url = urljoin(page_url, link['href'])
+        if article_url not in seen:
+            seen.add(article_url)
+            headlines.append((headline.get_text().strip(), article_url))
+    return headlines
+
+
+def get_article_content(url, session=None, validators=None, parser=None):
+    """
+    Downloads and parses a single article.
+
+    Args:
+        url (str): The article URL.
+        session (requests.Session): Session to use, a new pooled session if None.
+        validators (ValidatorCache): Optional validator cache for conditional requests.
+        parser (str): BeautifulSoup parser, defaults to `default_parser()`.
+
+    Returns:
+        tuple: (article_text, author, pub_date), or None if the page is unchanged (304).
+    """
+    session = session or create_session()
+    try:
+        response = fetch(session, url, validators)
+    except requests.RequestException:
+        return FAILED_CONTENT, "Unknown", "Unknown"
+    if response.status_code == 304:
+        return None
+    if response.status_code != 200:
+        return FAILED_CONTENT, "Unknown", "Unknown"
+    return parse_article(response.content, parser)
+
+
+def scrape_bbc_news(url="https://www.bbc.com/news", session=None, known_urls=(), max_workers=8,
+                    validators=None, parser=None):
+    """
+    Scrapes the BBC News front page and all linked articles not yet in the corpus.
+
+    Articles are downloaded concurrently over a pooled session and URLs in
+    `known_urls` are skipped. Only the front page is requested conditionally:
+    an article is fetched at most until it is in the corpus, and a 304 for
+    an article that was scraped but never stored would lose it for good.
+
+    The front page validators are only updated in `validators`, not saved.
+    Call `validators.save()` once the returned articles are stored, otherwise
+    a 304 on the next run would skip articles that never made it into the corpus.
+
+    Args:
+        url (str): URL of the front page.
+        session (requests.Session): Session to use, a new pooled session if None.
+        known_urls (set): Article URLs already in the corpus.
+        max_workers (int): Maximum number of concurrent article downloads.
+        validators (ValidatorCache): Validators for a conditional GET of the front page, or None.
+        parser (str): BeautifulSoup parser, defaults to `default_parser()`.
+
+    Returns:
+        pd.DataFrame: One row per new article with the columns of `articles.csv`.
+    """
+    session = session or create_session(pool_size=max_workers)
+    parser = parser or default_parser()
+
+    response = fetch(session, url, validators)
+    if response.status_code == 304:
+        print("Front page not modified since the last run.")
+        return pd.DataFrame(columns=COLUMNS)
+    if response.status_code != 200:
+        print(f"Failed to retrieve the page. Status code: {response.status_code}")
+        return pd.DataFrame(columns=COLUMNS)
+
+    known_urls = set(known_urls)
+    headlines = [(h, u) for h, u in parse_headlines(response.content, url, parser) if u not in known_urls]
+
+    def scrape(item):
+        headline_text, article_url = item
+        article_content, author, pub_date = get_article_content(article_url, session, parser=parser)
+        # Get the current timestamp
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return [headline_text, article_content, timestamp, article_url, author, pub_date]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        data = list(executor.map(scrape, headlines))
+    return pd.DataFrame(data, columns=COLUMNS)
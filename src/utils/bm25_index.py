@@ -0,0 +1,149 @@
+# src/utils/bm25_index.py
+import re
+from array import array
+
+import numpy as np
+
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from has have he her his i in is it its of on or our she "
+    "that the their they this to was we were will with would you".split()
+)
+
+
+def tokenize(text):
+    """
+    Lower-cases a text and splits it into word tokens without stopwords.
+    """
+    return [token for token in re.findall(r"\w+", str(text).lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Compact in-process inverted index with Okapi BM25 scoring.
+
+    Every term maps to two typed arrays, one with document numbers and one
+    with term frequencies, so a posting costs 8 bytes instead of a Python
+    object per entry. Documents can be added at any time; statistics such
+    as the average document length are updated incrementally. Adding an id
+    that is already indexed replaces that document.
+
+    Args:
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self._doc_numbers = []
+        self._frequencies = []
+        self.doc_ids = []
+        self._positions = {}
+        self.metadata = []
+        self.doc_lengths = array("i")
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def add(self, doc_id, text, metadata=None):
+        """
+        Indexes one document, replacing an earlier document with the same id.
+
+        A replacement scans all postings, so it is meant for occasional updates
+        such as a re-scraped article, not for rebuilding the index.
+
+        Args:
+            doc_id (str): Id returned in search results, e.g. a chunk id.
+            text (str): The text to index.
+            metadata (dict): Optional metadata returned with the matches.
+        """
+        doc_number = self._positions.get(doc_id)
+        if doc_number is None:
+            doc_number = len(self.doc_ids)
+            self._positions[doc_id] = doc_number
+            self.doc_ids.append(doc_id)
+            self.metadata.append(metadata or {})
+            self.doc_lengths.append(0)
+        else:
+            self._remove_postings(doc_number)
+            self.total_length -= self.doc_lengths[doc_number]
+            self.metadata[doc_number] = metadata or {}
+        tokens = tokenize(text)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                term_id = len(self.vocabulary)
+                self.vocabulary[token] = term_id
+                self._doc_numbers.append(array("i"))
+                self._frequencies.append(array("i"))
+            self._doc_numbers[term_id].append(doc_number)
+            self._frequencies[term_id].append(count)
+        self.doc_lengths[doc_number] = len(tokens)
+        self.total_length += len(tokens)
+
+    def _remove_postings(self, doc_number):
+        for doc_numbers, frequencies in zip(self._doc_numbers, self._frequencies):
+            if doc_number in doc_numbers:
+                position = doc_numbers.index(doc_number)
+                del doc_numbers[position]
+                del frequencies[position]
+
+    def add_many(self, documents):
+        """
+        Indexes (doc_id, text, metadata) tuples, e.g. streamed chunks.
+        """
+        for doc_id, text, metadata in documents:
+            self.add(doc_id, text, metadata)
+
+    def search(self, query, top_k=10, include_metadata=True):
+        """
+        Returns the `top_k` best BM25 matches for a text query.
+
+        Args:
+            query (str): The query text.
+            top_k (int): Number of matches to return.
+            include_metadata (bool): Whether to include the metadata of each match.
+
+        Returns:
+            dict: {"matches": [{"id", "score", "metadata"}, ...]}, like a Pinecone query response.
+        """
+        n_docs = len(self.doc_ids)
+        if n_docs == 0:
+            return {"matches": []}
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.int32)
+        average_length = self.total_length / n_docs
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            docs = np.frombuffer(self._doc_numbers[term_id], dtype=np.int32)
+            tf = np.frombuffer(self._frequencies[term_id], dtype=np.int32).astype(np.float32)
+            idf = np.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[docs] / average_length)
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        matches = []
+        for doc_number in candidates:
+            match = {"id": self.doc_ids[doc_number], "score": float(scores[doc_number])}
+            if include_metadata:
+                match["metadata"] = self.metadata[doc_number]
+            matches.append(match)
+        return {"matches": matches}
+
+    def memory_bytes(self):
+        """
+        Approximate size of the postings and document arrays in bytes.
+        """
+        postings = sum(a.itemsize * len(a) for a in self._doc_numbers) + \
+            sum(a.itemsize * len(a) for a in self._frequencies)
+        return postings + self.doc_lengths.itemsize * len(self.doc_lengths)
@@ -0,0 +1,201 @@
+# src/utils/cache_util.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.utils.embedding_util import content_hash
+
+
+def file_fingerprint(path):
+    """
+    Returns a cheap fingerprint that changes whenever a file or CorpusStore is modified.
+
+    For a CorpusStore directory the ingest log is used, since every ingest appends to it.
+
+    Args:
+        path (str): Path to a file or CorpusStore directory.
+
+    Returns:
+        tuple: (path, mtime in ns, size in bytes).
+    """
+    if os.path.isdir(path):
+        from src.utils.corpus_store import CorpusStore
+        log_path = os.path.join(path, CorpusStore.LOG_FILE)
+        path = log_path if os.path.exists(log_path) else path
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with hit/miss statistics.
+
+    Module-level instances live as long as the Streamlit server process, so
+    they survive the script reruns triggered by every widget interaction.
+    Keys should contain everything the result depends on (e.g. a file
+    fingerprint or content hash), which makes stale entries unreachable;
+    `invalidate` removes them explicitly.
+
+    Args:
+        max_entries (int): Maximum number of cached results.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get_or_compute(self, key, compute, count=True):
+        """
+        Returns the cached result for `key`, computing and storing it on a miss.
+
+        Args:
+            key (tuple): Hashable cache key.
+            compute (callable): Function without arguments producing the result.
+            count (bool): Whether the lookup counts towards the hit/miss statistics.
+
+        Returns:
+            The cached or freshly computed result.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return self._entries[key]
+            if count:
+                self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, predicate=None):
+        """
+        Removes all entries, or only those whose key matches `predicate`.
+        """
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if predicate(k)]:
+                    del self._entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+corpus_cache = ResultCache(max_entries=16)
+chunk_cache = ResultCache(max_entries=20000)
+resource_cache = ResultCache(max_entries=16)
+
+
+def load_corpus_cached(path, usecols=None, nrows=None):
+    """
+    `load_corpus` memoized on the file fingerprint; a modified file is reloaded.
+    """
+    # Imported here so that pages without documents do not load pandas
+    from src.utils.corpus_loader import load_corpus
+
+    fingerprint = file_fingerprint(path)
+    corpus_cache.invalidate(lambda key: key[0] == path and key[1] != fingerprint)
+    key = (path, fingerprint, tuple(usecols) if usecols else None, nrows)
+    return corpus_cache.get_or_compute(key, lambda: load_corpus(path, usecols=usecols, nrows=nrows))
+
+
+def chunk_spans_cached(text, method, chunk_size, chunk_overlap, count=True):
+    """
+    Chunk offsets of a single text, memoized on (method, chunk_size, chunk_overlap, doc hash).
+
+    Args:
+        text (str): The text to chunk.
+        method (str): 'recursive', 'character' or 'token'.
+        chunk_size (int): Chunk size passed to the chunker.
+        chunk_overlap (int): Chunk overlap passed to the chunker.
+        count (bool): Whether the lookup counts towards the hit/miss statistics.
+
+    Returns:
+        list: (start, end) offsets into `text`.
+    """
+    def compute():
+        from src.chunking.chunking import character_spans, recursive_character_spans, token_spans
+        if method == "recursive":
+            return recursive_character_spans(text, chunk_size, chunk_overlap)
+        if method == "character":
+            return character_spans(text, chunk_size, chunk_overlap)
+        return token_spans([text], chunk_size, chunk_overlap)[0]
+
+    key = (method, chunk_size, chunk_overlap, content_hash(text))
+    return chunk_cache.get_or_compute(key, compute, count=count)
+
+
+def cached_resource(key, factory):
+    """
+    Returns a long-lived resource such as an embedding model or index handle, creating it once per key.
+    """
+    return resource_cache.get_or_compute(key, factory, count=False)
+
+
+_precompute_started = set()
+_precompute_lock = threading.Lock()
+
+
+def precompute_chunk_grid(text, methods, chunk_sizes, chunk_overlaps):
+    """
+    Fills the chunk cache for every valid slider combination in a background thread.
+
+    The thread is started at most once per text, so calling this on every
+    rerun is cheap. Combinations with overlap >= size are skipped.
+
+    Args:
+        text (str): The text shown in the app.
+        methods (list): Chunking methods to precompute.
+        chunk_sizes (iterable): Chunk sizes offered by the slider.
+        chunk_overlaps (iterable): Chunk overlaps offered by the slider.
+
+    Returns:
+        bool: True if a new background thread was started.
+    """
+    key = content_hash(text)
+    with _precompute_lock:
+        if key in _precompute_started:
+            return False
+        _precompute_started.add(key)
+
+    chunk_sizes = list(chunk_sizes)
+    chunk_overlaps = list(chunk_overlaps)
+
+    def run():
+        for method in methods:
+            for chunk_size in chunk_sizes:
+                for chunk_overlap in chunk_overlaps:
+                    if chunk_overlap >= chunk_size:
+                        continue
+                    try:
+                        chunk_spans_cached(text, method, chunk_size, chunk_overlap, count=False)
+                    except Exception:
+                        # e.g. tokenizer files unavailable; skip the row, the foreground path reports the error
+                        break
+                # Yield to the foreground rerun between rows of the grid
+                time.sleep(0)
+
+    threading.Thread(target=run, daemon=True, name="chunk-precompute").start()
+    return True
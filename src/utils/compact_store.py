@@ -0,0 +1,382 @@
+# src/utils/compact_store.py
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from src.utils.vector_store import LocalVectorIndex, VectorStore, _normalize, _top_k, evaluate_backends
+
+LAYOUTS = ("float32", "float16", "pq")
+
+
+class ReadOnlyIndexError(TypeError):
+    """Raised when vectors are upserted into or deleted from a CompactVectorIndex."""
+
+
+def _nearest_centroid(data, centroids):
+    # Squared euclidean distance without the constant ||x||^2 term
+    return np.argmin((centroids ** 2).sum(axis=1) - 2 * data @ centroids.T, axis=1)
+
+
+def _kmeans(data, n_clusters, iterations, rng):
+    centroids = data[rng.choice(len(data), size=n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest_centroid(data, centroids)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        filled = counts > 0
+        for dim in range(data.shape[1]):
+            sums = np.bincount(assignments, weights=data[:, dim], minlength=n_clusters)
+            centroids[filled, dim] = sums[filled] / counts[filled]
+    return centroids
+
+
+class ProductQuantizer:
+    """
+    Compresses vectors to one byte per subvector.
+
+    Every vector is split into `n_subvectors` equal parts and each part is
+    replaced by the id of its nearest centroid, learned with k-means per
+    subspace. To score a query it is compared with all centroids once (a
+    lookup table per subspace); afterwards every stored vector costs
+    `n_subvectors` table lookups instead of `dimension` multiplications.
+
+    Args:
+        n_subvectors (int): Number of subvectors, must divide the dimension.
+        n_centroids (int): Centroids per subspace, at most 256 so that codes fit into uint8.
+        iterations (int): Number of k-means iterations.
+        sample_size (int): Number of vectors used for training.
+        seed (int): Seed for sampling and initialization.
+    """
+
+    def __init__(self, n_subvectors=48, n_centroids=256, iterations=15, sample_size=20000, seed=0):
+        if n_centroids > 256:
+            raise ValueError("n_centroids must be at most 256 to fit into uint8 codes")
+        self.n_subvectors = n_subvectors
+        self.n_centroids = n_centroids
+        self.iterations = iterations
+        self.sample_size = sample_size
+        self.seed = seed
+        self.centroids = None
+
+    def fit(self, data):
+        """
+        Learns the centroids of every subspace from (a sample of) `data`.
+        """
+        n, dimension = data.shape
+        if dimension % self.n_subvectors:
+            raise ValueError(f"n_subvectors ({self.n_subvectors}) must divide the dimension ({dimension})")
+        rng = np.random.default_rng(self.seed)
+        sample = data[np.sort(rng.choice(n, size=min(n, self.sample_size), replace=False))]
+        sample = np.asarray(sample, dtype=np.float32)
+        n_centroids = min(self.n_centroids, len(sample))
+        sub = dimension // self.n_subvectors
+        self.centroids = np.stack([
+            _kmeans(sample[:, j * sub:(j + 1) * sub], n_centroids, self.iterations, rng)
+            for j in range(self.n_subvectors)
+        ])
+        return self
+
+    def encode(self, data):
+        """
+        Returns the uint8 codes of `data`, shape (len(data), n_subvectors).
+        """
+        data = np.asarray(data, dtype=np.float32)
+        sub = self.centroids.shape[2]
+        codes = np.empty((len(data), self.n_subvectors), dtype=np.uint8)
+        for j in range(self.n_subvectors):
+            codes[:, j] = _nearest_centroid(data[:, j * sub:(j + 1) * sub], self.centroids[j])
+        return codes
+
+    def lookup_table(self, query):
+        """
+        Inner products of each query subvector with the centroids of its subspace, shape (n_subvectors, n_centroids).
+        """
+        sub = self.centroids.shape[2]
+        return np.einsum("jkd,jd->jk", self.centroids, query.reshape(self.n_subvectors, sub))
+
+    def scores(self, codes, table):
+        """
+        Approximate inner products of the encoded vectors with the query of `table`.
+        """
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.n_subvectors):
+            scores += table[j][codes[:, j]]
+        return scores
+
+
+class CompactVectorIndex(VectorStore):
+    """
+    Read-only cosine index that searches compressed vectors and re-ranks the shortlist exactly.
+
+    The normalized float32 vectors are written to `vectors.f32` and memory-mapped,
+    so they cost disk space but almost no RAM: only the rows being re-ranked are
+    read. The search itself runs on one of three layouts:
+
+    - 'float32': the memory map itself; exact, nothing extra in RAM.
+    - 'float16': a half-precision copy in RAM, 2 bytes per dimension.
+    - 'pq': product-quantized codes in RAM, `n_subvectors` bytes per vector.
+
+    For the compressed layouts, the `rerank_factor * top_k` best approximate
+    matches are re-scored against the float32 vectors; 0 returns the
+    approximate scores directly. Use `build` to create and `load` to reopen an index.
+
+    Args:
+        path (str): Directory of the index.
+        ids (list): Vector ids, one per row.
+        metadata (list): Metadata dicts, one per row.
+        vectors (np.ndarray): Memory-mapped float32 vectors.
+        layout (str): One of LAYOUTS.
+        codes (np.ndarray): float16 vectors or uint8 PQ codes, None for 'float32'.
+        quantizer (ProductQuantizer): The fitted quantizer for 'pq'.
+        rerank_factor (int): Shortlist size as a multiple of `top_k`.
+        block_size (int): Rows scored at once, bounds the temporary memory of a query.
+    """
+
+    def __init__(self, path, ids, metadata, vectors, layout, codes=None, quantizer=None, rerank_factor=4,
+                 block_size=65536):
+        self.path = path
+        self.ids = ids
+        self.metadata = metadata
+        self.vectors = vectors
+        self.dimension = vectors.shape[1]
+        self.layout = layout
+        self.codes = codes
+        self.quantizer = quantizer
+        self.rerank_factor = rerank_factor
+        self.block_size = block_size
+
+    @classmethod
+    def build(cls, path, ids, embeddings, metadata=None, layout="float16", n_subvectors=48, n_centroids=256,
+              rerank_factor=4, block_size=65536):
+        """
+        Writes a compact index for `embeddings` to the directory `path` and opens it.
+
+        The embeddings are processed in blocks of `block_size` rows, so they may
+        themselves be a memory map larger than RAM. Like LocalVectorIndex, a
+        repeated id keeps only its last row.
+
+        Args:
+            path (str): Target directory.
+            ids (list): Vector ids, one per row.
+            embeddings (np.ndarray): Matrix of shape (len(ids), dimension).
+            metadata (list): Optional metadata dicts, one per row.
+            layout (str): One of LAYOUTS.
+            n_subvectors (int): Bytes per vector of the 'pq' layout.
+            n_centroids (int): Centroids per subspace of the 'pq' layout.
+            rerank_factor (int): See the class docstring.
+            block_size (int): Rows processed at once.
+
+        Returns:
+            CompactVectorIndex: The opened index.
+        """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout}, expected one of {LAYOUTS}")
+        os.makedirs(path, exist_ok=True)
+        # index.json marks a complete index, so an earlier one must not outlive a rebuild that fails halfway
+        index_path = os.path.join(path, "index.json")
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        ids = list(ids)
+        metadata = metadata if metadata is not None else [{}] * len(ids)
+        # Row of the last occurrence of every id, in the order of the first occurrence
+        last_rows = {}
+        for row, vector_id in enumerate(ids):
+            last_rows[vector_id] = row
+        rows = np.fromiter(last_rows.values(), dtype=np.int64, count=len(last_rows))
+        if len(rows) < len(ids):
+            ids = list(last_rows)
+            metadata = [metadata[row] for row in rows]
+        n, dimension = len(rows), embeddings.shape[1]
+        vectors = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="w+", shape=(n, dimension)) \
+            if n else np.empty((0, dimension), dtype=np.float32)
+        for start in range(0, n, block_size):
+            block = rows[start:start + block_size]
+            vectors[start:start + len(block)] = _normalize(np.asarray(embeddings[block], dtype=np.float32))
+        if n:
+            vectors.flush()
+
+        if layout == "float16":
+            codes = np.empty((n, dimension), dtype=np.float16)
+            for start in range(0, n, block_size):
+                codes[start:start + block_size] = vectors[start:start + block_size]
+            np.save(os.path.join(path, "codes.npy"), codes)
+        elif layout == "pq":
+            quantizer = ProductQuantizer(n_subvectors=n_subvectors, n_centroids=n_centroids).fit(vectors)
+            codes = np.concatenate([quantizer.encode(vectors[start:start + block_size])
+                                    for start in range(0, n, block_size)]) if n else \
+                np.empty((0, n_subvectors), dtype=np.uint8)
+            np.save(os.path.join(path, "codes.npy"), codes)
+            np.save(os.path.join(path, "pq_centroids.npy"), quantizer.centroids)
+        del vectors
+
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"layout": layout, "dimension": dimension, "ids": ids, "metadata": metadata}, f)
+        os.replace(index_path + ".tmp", index_path)
+        return cls.load(path, rerank_factor=rerank_factor, block_size=block_size)
+
+    @classmethod
+    def load(cls, path, rerank_factor=4, block_size=65536):
+        """
+        Opens an index written by `build`; the float32 vectors stay on disk, the codes are read into RAM.
+        """
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        n = len(data["ids"])
+        vectors = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r",
+                            shape=(n, data["dimension"])) if n else np.empty((0, data["dimension"]), np.float32)
+        codes = quantizer = None
+        if data["layout"] != "float32":
+            codes = np.load(os.path.join(path, "codes.npy"))
+        if data["layout"] == "pq":
+            centroids = np.load(os.path.join(path, "pq_centroids.npy"))
+            quantizer = ProductQuantizer(n_subvectors=centroids.shape[0], n_centroids=centroids.shape[1])
+            quantizer.centroids = centroids
+        return cls(path, data["ids"], data["metadata"], vectors, data["layout"], codes, quantizer,
+                   rerank_factor, block_size)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _approximate_scores(self, query):
+        if self.layout == "float32":
+            return np.asarray(self.vectors @ query, dtype=np.float32)
+        if self.layout == "float16":
+            # numpy has no fast float16 matmul; widen one block at a time instead
+            return np.concatenate([self.codes[start:start + self.block_size].astype(np.float32) @ query
+                                   for start in range(0, len(self.codes), self.block_size)])
+        table = self.quantizer.lookup_table(query)
+        return np.concatenate([self.quantizer.scores(self.codes[start:start + self.block_size], table)
+                               for start in range(0, len(self.codes), self.block_size)])
+
+    def query(self, vector, top_k=10, include_metadata=False, namespace=None, **kwargs):
+        """
+        Returns the `top_k` most similar vectors in the Pinecone response format.
+
+        Args:
+            vector (list): The query vector.
+            top_k (int): Number of matches to return.
+            include_metadata (bool): Whether to include the metadata of each match.
+
+        Returns:
+            dict: {"matches": [{"id", "score", "metadata"}, ...]}
+        """
+        if not self.ids:
+            return {"matches": []}
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        scores = self._approximate_scores(query)
+        if self.layout == "float32" or not self.rerank_factor:
+            rows = _top_k(scores, top_k)
+            row_scores = scores[rows]
+        else:
+            # Sorted rows keep the reads from the memory map sequential
+            shortlist = np.sort(_top_k(scores, max(top_k, self.rerank_factor * top_k)))
+            exact = self.vectors[shortlist] @ query
+            top = _top_k(exact, top_k)
+            rows, row_scores = shortlist[top], exact[top]
+        matches = []
+        for row, score in zip(rows, row_scores):
+            match = {"id": self.ids[row], "score": float(score)}
+            if include_metadata:
+                match["metadata"] = self.metadata[row]
+            matches.append(match)
+        return {"matches": matches}
+
+    def memory_bytes(self):
+        """
+        RAM needed for searching: the codes and PQ centroids; the memory-mapped float32 vectors are not counted.
+        """
+        size = self.codes.nbytes if self.codes is not None else 0
+        if self.quantizer is not None:
+            size += self.quantizer.centroids.nbytes
+        return size
+
+    def disk_bytes(self):
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name in os.listdir(self.path))
+
+    def describe_index_stats(self):
+        return {"total_vector_count": len(self.ids), "dimension": self.dimension, "layout": self.layout}
+
+    def upsert(self, vectors, namespace=None):
+        raise ReadOnlyIndexError("CompactVectorIndex is read-only, rebuild it with CompactVectorIndex.build")
+
+    def delete(self, ids, namespace=None):
+        raise ReadOnlyIndexError("CompactVectorIndex is read-only, rebuild it with CompactVectorIndex.build")
+
+
+def compare_layouts(ids, embeddings, query_vectors, path=None, layouts=LAYOUTS, top_k=10, rerank_factor=4,
+                    n_subvectors=48, metadata=None):
+    """
+    Builds one CompactVectorIndex per layout and compares memory, latency and recall@k.
+
+    Recall is measured against an exact in-RAM LocalVectorIndex. Every
+    compressed layout is also evaluated without re-ranking to show what the
+    exact second pass buys.
+
+    Args:
+        ids (list): Vector ids, one per row.
+        embeddings (np.ndarray): Matrix of shape (len(ids), dimension).
+        query_vectors (np.ndarray): Matrix of query embeddings.
+        path (str): Directory for the indexes, a temporary directory if None.
+        layouts (tuple): Layouts to compare.
+        top_k (int): Number of matches per query.
+        rerank_factor (int): Shortlist size as a multiple of `top_k`.
+        n_subvectors (int): Bytes per vector of the 'pq' layout.
+        metadata (list): Optional metadata dicts, one per row.
+
+    Returns:
+        list: One dict per configuration with latency, recall@k, RAM and disk size.
+    """
+    path = path or tempfile.mkdtemp(prefix="compact_index_")
+    reference = LocalVectorIndex.from_embeddings(ids, embeddings, metadata)
+    backends = {"float32 in RAM (exact)": reference}
+    for layout in layouts:
+        index = CompactVectorIndex.build(os.path.join(path, layout), ids, embeddings, metadata, layout=layout,
+                                         n_subvectors=n_subvectors, rerank_factor=rerank_factor)
+        if layout == "float32":
+            backends["float32 memmap"] = index
+            continue
+        backends[f"{layout} + re-rank"] = index
+        backends[f"{layout} only"] = CompactVectorIndex.load(index.path, rerank_factor=0)
+
+    rows = evaluate_backends(query_vectors, backends, reference="float32 in RAM (exact)", top_k=top_k)
+    for row in rows:
+        backend = backends[row["backend"]]
+        ram = backend.memory_bytes()
+        row["ram_mb"] = ram / 2 ** 20
+        row["ram_bytes_per_vector"] = ram / max(1, len(ids))
+        row["disk_mb"] = backend.disk_bytes() / 2 ** 20 if isinstance(backend, CompactVectorIndex) else 0.0
+    return rows
+
+
+def benchmark_layouts(corpus_path='data/filtered_articles.csv', embedder="hashing", top_k=10, query_count=200):
+    """
+    Runs `compare_layouts` on the chunks of the bundled corpus, with article headlines as queries.
+
+    Args:
+        corpus_path (str): Article CSV or CorpusStore directory.
+        embedder (str): 'hashing' for the offline stand-in, or a SentenceTransformer model name.
+        top_k (int): Number of matches per query.
+        query_count (int): Number of queries.
+
+    Returns:
+        list: As returned by `compare_layouts`.
+    """
+    from src.utils.corpus_loader import chunk_records, clean_records, iter_corpus, iter_records
+    from src.utils.embedding_pool import load_model
+
+    # Keyed by id: re-scraped versions of an article share their unchanged chunks
+    chunks = list({chunk["id"]: chunk for chunk in chunk_records(clean_records(iter_records(
+        iter_corpus(corpus_path, usecols=["headline", "content", "url"])
+    )))}.values())
+    model = load_model(embedder)
+    embeddings = model.encode([chunk["text"] for chunk in chunks])
+    headlines = list(dict.fromkeys(chunk["headline"] for chunk in chunks))[:query_count]
+    return compare_layouts([chunk["id"] for chunk in chunks], embeddings, model.encode(headlines), top_k=top_k)
+
+
+if __name__ == "__main__":
+    import sys
+
+    for row in benchmark_layouts(embedder=sys.argv[1] if len(sys.argv) > 1 else "hashing"):
+        print(row)
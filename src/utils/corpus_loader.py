@@ -0,0 +1,312 @@
+# src/utils/corpus_loader.py
+import os
+import re
+
+import pandas as pd
+
+from src.chunking.chunking import CORPUS_METHODS, chunk_by_recursive_character, chunk_corpus
+from src.utils.embedding_util import content_hash
+from src.utils.tracing import tracer
+
+# Placeholder the scraper stores when an article could not be downloaded
+FAILED_CONTENT = "Failed to retrieve the article content."
+
+
+def load_corpus(path, usecols=None, nrows=None):
+    """
+    Loads (part of) an article CSV or CorpusStore directory into a DataFrame.
+
+    Use this for small reads such as the first rows of a file or a few columns.
+    For whole-corpus processing use `iter_corpus` instead.
+
+    Args:
+        path (str): Path to the CSV file or CorpusStore directory.
+        usecols (list): Columns to parse, or None for all columns.
+        nrows (int): Number of rows to read, or None for all rows.
+
+    Returns:
+        pd.DataFrame: The articles without the stale `Unnamed: 0` index column.
+    """
+    if os.path.isdir(path):
+        if nrows is None:
+            return _open_store(path).read(columns=usecols)
+        # A batch ends at the end of a Parquet part, so keep reading until `nrows` rows are collected
+        frames, remaining = [], nrows
+        for frame in iter_corpus(path, chunksize=max(nrows, 1), usecols=usecols):
+            frames.append(frame.iloc[:remaining])
+            remaining -= len(frames[-1])
+            if remaining <= 0:
+                break
+        return pd.concat(frames) if frames else pd.DataFrame(columns=usecols)
+    return pd.read_csv(path, usecols=usecols, nrows=nrows).drop(columns=["Unnamed: 0"], errors="ignore")
+
+
+def iter_corpus(path, chunksize=500, usecols=None, since_version=0):
+    """
+    Streams an article CSV or CorpusStore directory in DataFrames of at most `chunksize` rows.
+
+    The row index continues across chunks, so it identifies an article by
+    its position in the file, just like the index of a full `pd.read_csv`.
+
+    Args:
+        path (str): Path to the CSV file or CorpusStore directory.
+        chunksize (int): Number of rows per chunk.
+        usecols (list): Columns to parse, or None for all columns.
+        since_version (int): For a CorpusStore, only stream articles ingested after this version.
+
+    Yields:
+        pd.DataFrame: The next chunk of articles.
+    """
+    if os.path.isdir(path):
+        yield from _open_store(path).iter_batches(columns=usecols, since_version=since_version, batch_size=chunksize)
+        return
+    with pd.read_csv(path, chunksize=chunksize, usecols=usecols) as reader:
+        for frame in reader:
+            yield frame.drop(columns=["Unnamed: 0"], errors="ignore")
+
+
+def _open_store(path):
+    # Imported here so that CSV-only users do not need pyarrow
+    from src.utils.corpus_store import CorpusStore
+    return CorpusStore(path)
+
+
+def article_uid(record):
+    """
+    Stable id of an article, derived from its URL instead of its row position.
+
+    Sorting, deduplicating or appending to the corpus does not change the id,
+    and a re-scraped article with edited content keeps it. Articles without a
+    URL fall back to a hash of headline and content.
+
+    Args:
+        record (dict): Article dict or DataFrame row with `url` (and `headline`, `content`).
+
+    Returns:
+        str: 16 hex characters.
+    """
+    url = record.get("url")
+    if isinstance(url, str) and url:
+        return content_hash(url)[:16]
+    return content_hash(f"{record.get('headline')}\n{record.get('content')}")[:16]
+
+
+def chunk_uid(article_id, text):
+    """
+    Stable id of a chunk: the article id plus a hash of the chunk text, e.g. '3f2a...-9c1b...'.
+    """
+    return f"{article_id}-{content_hash(text)[:12]}"
+
+
+def iter_records(frames):
+    """
+    Flattens DataFrame chunks into article dicts with a stable `article_id` field, see `article_uid`.
+
+    The frames should include the `url` column, otherwise the ids fall back to content hashes.
+    """
+    for frame in frames:
+        for record in frame.to_dict("records"):
+            record["article_id"] = article_uid(record)
+            yield record
+
+
+def scrape_time(record):
+    """
+    Scrape timestamp of an article record as pd.Timestamp; NaT if it is missing or unparsable.
+    """
+    return pd.to_datetime(record.get("timestamp"), errors="coerce")
+
+
+def is_newer(candidate, current):
+    """
+    Whether a version scraped at `candidate` replaces one scraped at `current`.
+
+    Versions without a timestamp (NaT) lose against every dated version; among
+    equal or missing timestamps the later row wins.
+    """
+    if pd.isna(candidate):
+        return pd.isna(current)
+    return pd.isna(current) or candidate >= current
+
+
+def latest_records(records):
+    """
+    Keeps one record per `article_id`: the version with the latest scrape timestamp.
+
+    A URL scraped more than once would otherwise give two articles with the
+    same id whose identical chunks collide. All records are held in memory,
+    so this is meant for corpora that are loaded completely anyway.
+
+    Returns:
+        list: The records in the order in which their ids first appear.
+    """
+    latest = {}
+    for record in records:
+        current = latest.get(record["article_id"])
+        if current is None or is_newer(scrape_time(record), scrape_time(current)):
+            latest[record["article_id"]] = record
+    return list(latest.values())
+
+
+def clean_text(text):
+    """
+    Collapses whitespace, removes spaces before punctuation and stray backslashes.
+    """
+    text = re.sub(r"\s+", " ", str(text))
+    text = re.sub(r'\s([?.!"](?:\s|$))', r"\1", text)
+    return text.replace("\\", "").strip()
+
+
+def clean_records(records):
+    """
+    Drops articles without content and cleans the content of the remaining ones.
+    """
+    for record in records:
+        content = record.get("content")
+        if not isinstance(content, str) or not content.strip() or content == FAILED_CONTENT:
+            continue
+        record["content"] = clean_text(content)
+        yield record
+
+
+def _record_chunks(record, texts):
+    seen = set()
+    for chunk in texts:
+        chunk_id = chunk_uid(record["article_id"], chunk)
+        if chunk_id in seen:
+            continue
+        seen.add(chunk_id)
+        yield {
+            "id": chunk_id,
+            "article_id": record["article_id"],
+            "text": chunk,
+            "headline": record.get("headline"),
+            "url": record.get("url"),
+        }
+
+
+def chunk_records(records, chunker=chunk_by_recursive_character, chunk_size=1000, chunk_overlap=200, n_jobs=None):
+    """
+    Splits every article into chunks.
+
+    The chunkers of `src.chunking.chunking` run through `chunk_corpus`, which
+    chunks large streams in worker processes; other chunkers are called once
+    per article.
+
+    Args:
+        records (iterable): Article dicts with `article_id`, `content`, `headline` and `url`.
+        chunker (callable): One of the functions in `src.chunking.chunking`, or any function with their signature.
+        chunk_size (int): Chunk size passed to the chunker.
+        chunk_overlap (int): Chunk overlap passed to the chunker.
+        n_jobs (int): Worker processes of `chunk_corpus`, see there.
+
+    Yields:
+        dict: One dict per chunk with `id` (see `chunk_uid`), `article_id`, `text`, `headline` and `url`.
+            Repeated chunk texts within an article are yielded once.
+    """
+    method = CORPUS_METHODS.get(chunker)
+    if method is None:
+        for record in records:
+            yield from _record_chunks(record, chunker(record["content"], chunk_size=chunk_size,
+                                                      chunk_overlap=chunk_overlap))
+        return
+
+    # Records read ahead by chunk_corpus, by position; spans arrive in document order
+    pending = {}
+
+    def documents():
+        for number, record in enumerate(records):
+            pending[number] = record
+            yield number, record["content"]
+
+    span = tracer.start_span(f"chunk.{method}")
+    try:
+        current, texts = None, []
+        for number, start, end in chunk_corpus(documents(), method, chunk_size, chunk_overlap, n_jobs=n_jobs):
+            if number != current:
+                if current is not None:
+                    yield from _record_chunks(pending.pop(current), texts)
+                # Records before this one produced no chunks
+                while next(iter(pending)) < number:
+                    del pending[next(iter(pending))]
+                current, texts = number, []
+                span.add("items")
+            texts.append(pending[number]["content"][start:end])
+        if current is not None:
+            yield from _record_chunks(pending.pop(current), texts)
+    except Exception as e:
+        span.fail(e)
+        raise
+    finally:
+        span.end()
+
+
+def embed_chunks(chunks, engine, batch_size=256):
+    """
+    Embeds chunks in batches.
+
+    Args:
+        chunks (iterable): Chunk dicts as produced by `chunk_records`.
+        engine (EmbeddingEngine): The embedding engine.
+        batch_size (int): Number of chunks embedded together.
+
+    Yields:
+        tuple: (id, values, metadata) ready for `upsert_vectors`.
+    """
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == batch_size:
+            yield from _embed_batch(batch, engine)
+            batch = []
+    if batch:
+        yield from _embed_batch(batch, engine)
+
+
+def _embed_batch(batch, engine):
+    vectors = engine.encode([chunk["text"] for chunk in batch])
+    for chunk, vector in zip(batch, vectors):
+        metadata = {
+            "headline": chunk["headline"],
+            "url": chunk["url"],
+            "article_id": chunk["article_id"],
+            "text": chunk["text"],
+        }
+        yield (chunk["id"], vector.tolist(), metadata)
+
+
+def index_corpus(path, index, engine, chunksize=500, chunker=chunk_by_recursive_character, chunk_size=1000,
+                 chunk_overlap=200, embed_batch_size=256, since_version=0, near_duplicates=None, **upsert_kwargs):
+    """
+    Streams an article corpus through the load, clean, chunk, embed and upsert stages.
+
+    Every stage is a generator, so only `chunksize` articles, one embedding batch
+    and the upsert batches in flight are held in memory at any time, independent
+    of the size of the corpus.
+
+    Args:
+        path (str): Path to the article CSV or CorpusStore directory.
+        index: A Pinecone index or any VectorStore.
+        engine (EmbeddingEngine): The embedding engine.
+        chunksize (int): Number of CSV rows read at once.
+        chunker (callable): One of the functions in `src.chunking.chunking`.
+        chunk_size (int): Chunk size passed to the chunker.
+        chunk_overlap (int): Chunk overlap passed to the chunker.
+        embed_batch_size (int): Number of chunks embedded together.
+        since_version (int): For a CorpusStore, only index articles ingested after this version.
+        near_duplicates (NearDuplicateIndex): Optional detector; only the canonical article of
+            each near-duplicate cluster is indexed.
+        **upsert_kwargs: Passed on to `upsert_vectors` (batch_size, max_workers, checkpoint_path, ...).
+
+    Returns:
+        dict: The upsert summary.
+    """
+    # Imported here so that loading a corpus does not pull in torch and the Pinecone client
+    from src.utils.pinecone_util import upsert_vectors
+
+    records = clean_records(iter_records(iter_corpus(path, chunksize, usecols=["headline", "content", "url"], since_version=since_version)))
+    if near_duplicates is not None:
+        from src.utils.near_duplicates import drop_near_duplicates
+        records = drop_near_duplicates(records, near_duplicates)
+    chunks = chunk_records(records, chunker=chunker, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return upsert_vectors(index, embed_chunks(chunks, engine, batch_size=embed_batch_size), **upsert_kwargs)
@@ -0,0 +1,207 @@
+# src/utils/corpus_store.py
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.utils.embedding_util import content_hash
+
+
+def _has_url(url):
+    return isinstance(url, str) and bool(url)
+
+
+class CorpusStore:
+    """
+    Append-only columnar article store.
+
+    Every ingest writes one Parquet part and appends one line to
+    `ingest_log.jsonl`; existing parts are never rewritten. The log is the
+    source of truth: its version numbers let downstream steps ask for the rows
+    added since a given version, and a part without a log entry (e.g. after a
+    crash) is ignored. Each row carries a `content_hash`, which is used to
+    drop duplicates on ingest instead of rewriting the corpus: a row is
+    skipped if its URL's newest stored row has the same hash. A re-scraped
+    URL with edited (or reverted) content is appended as a new row that
+    supersedes the older ones, and reads return only the newest row per URL.
+
+    Args:
+        path (str): Directory of the store, created if missing.
+    """
+
+    LOG_FILE = "ingest_log.jsonl"
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.log = []
+        log_path = os.path.join(path, self.LOG_FILE)
+        if os.path.exists(log_path):
+            with open(log_path, encoding="utf-8") as f:
+                self.log = [json.loads(line) for line in f if line.strip()]
+        self._hashes = None
+        self._latest = None
+
+    @property
+    def version(self):
+        """The version of the latest ingest, 0 for an empty store."""
+        return self.log[-1]["version"] if self.log else 0
+
+    def __len__(self):
+        return sum(entry["rows"] for entry in self.log)
+
+    @property
+    def hashes(self):
+        """Content hashes of all stored articles, read lazily from the hash column only. Dedups rows without URL."""
+        if self._hashes is None:
+            self._hashes = set()
+            for entry in self.log:
+                table = pq.read_table(os.path.join(self.path, entry["part"]), columns=["content_hash"])
+                self._hashes.update(table.column("content_hash").to_pylist())
+        return self._hashes
+
+    @property
+    def latest(self):
+        """(row position, content hash) of the newest row of every stored URL, read lazily from those columns."""
+        if self._latest is None:
+            self._latest = {}
+            for entry, offset in self._entries(0):
+                parquet_file = pq.ParquetFile(os.path.join(self.path, entry["part"]))
+                if "url" in parquet_file.schema_arrow.names:
+                    table = parquet_file.read(columns=["url", "content_hash"])
+                    self._track_urls(table.column("url").to_pylist(), table.column("content_hash").to_pylist(),
+                                     offset)
+        return self._latest
+
+    def _track_urls(self, urls, hashes, offset):
+        for position, (url, key) in enumerate(zip(urls, hashes), offset):
+            if _has_url(url):
+                self._latest[url] = (position, key)
+
+    def _is_latest(self, url, position):
+        return not _has_url(url) or self.latest.get(url, (None, None))[0] == position
+
+    def append(self, df, source=None):
+        """
+        Adds new articles to the store.
+
+        Of several rows for one URL in `df` the last is kept, and it is
+        skipped if it has the same content as the URL's newest stored row;
+        otherwise it replaces the stored article on read. Rows without URL
+        are skipped if their content is stored or repeats within `df`.
+
+        Args:
+            df (pd.DataFrame): Articles with at least a `content` column.
+            source (str): Optional description of where the articles came from.
+
+        Returns:
+            dict: The log entry of this ingest, or None if all rows were duplicates.
+        """
+        df = df.drop(columns=["Unnamed: 0"], errors="ignore").reset_index(drop=True)
+        hashes = df["content"].fillna("").map(content_hash)
+        latest = self.latest
+        if "url" in df.columns:
+            has_url = df["url"].map(_has_url).astype(bool)
+            changed = pd.Series([latest.get(url, (None, None))[1] != key for url, key in zip(df["url"], hashes)],
+                                index=df.index)
+            new = has_url & ~df["url"].where(has_url).duplicated(keep="last") & changed
+        else:
+            has_url = pd.Series(False, index=df.index)
+            new = has_url
+        if not has_url.all():
+            new |= ~has_url & ~hashes.isin(self.hashes) & ~hashes.where(~has_url).duplicated()
+        df = df[new].assign(content_hash=hashes[new])
+        if df.empty:
+            return None
+        replaced = int(df["url"].map(lambda url: url in latest).sum()) if "url" in df.columns else 0
+        offset = len(self)
+
+        version = self.version + 1
+        part = f"part-{version:06d}.parquet"
+        tmp_path = os.path.join(self.path, part + ".tmp")
+        df.assign(ingest_version=version).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.path, part))
+
+        entry = {
+            "version": version,
+            "part": part,
+            "rows": len(df),
+            "skipped": int((~new).sum()),
+            "replaced": replaced,
+            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "source": source,
+        }
+        with open(os.path.join(self.path, self.LOG_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.log.append(entry)
+        if self._hashes is not None:
+            self._hashes.update(df["content_hash"])
+        if "url" in df.columns:
+            self._track_urls(df["url"].tolist(), df["content_hash"].tolist(), offset)
+        return entry
+
+    def import_csv(self, csv_path):
+        """
+        Ingests a legacy article CSV such as `articles.csv`.
+        """
+        return self.append(pd.read_csv(csv_path), source=csv_path)
+
+    def _entries(self, since_version):
+        offset = 0
+        for entry in self.log:
+            if entry["version"] > since_version:
+                yield entry, offset
+            offset += entry["rows"]
+
+    def iter_batches(self, columns=None, since_version=0, batch_size=500):
+        """
+        Streams articles part by part without loading the whole corpus.
+
+        The row index is the position of an article in the store. Since the
+        store is append-only, this position never changes. Rows superseded by
+        a newer row for the same URL are left out.
+
+        Args:
+            columns (list): Columns to read, e.g. ['headline', 'url']; None reads all.
+            since_version (int): Only return articles ingested after this version.
+            batch_size (int): Maximum number of rows per yielded DataFrame.
+
+        Yields:
+            pd.DataFrame: The next batch of articles.
+        """
+        for entry, offset in self._entries(since_version):
+            parquet_file = pq.ParquetFile(os.path.join(self.path, entry["part"]))
+            has_url = "url" in parquet_file.schema_arrow.names
+            read_columns = columns
+            if has_url and columns is not None and "url" not in columns:
+                read_columns = list(columns) + ["url"]
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=read_columns):
+                frame = batch.to_pandas()
+                frame.index = pd.RangeIndex(offset, offset + len(frame))
+                offset += len(frame)
+                if has_url:
+                    frame = frame.loc[[self._is_latest(url, position) for position, url in zip(frame.index, frame["url"])]]
+                    if read_columns is not columns:
+                        frame = frame.drop(columns="url")
+                if not frame.empty:
+                    yield frame
+
+    def read(self, columns=None, since_version=0):
+        """
+        Loads articles into one DataFrame, reading only the requested columns.
+
+        Args:
+            columns (list): Columns to read, e.g. ['headline', 'url']; None reads all.
+            since_version (int): Only return articles ingested after this version.
+
+        Returns:
+            pd.DataFrame: The selected articles.
+        """
+        frames = list(self.iter_batches(columns=columns, since_version=since_version, batch_size=65536))
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames)
@@ -1,78 +1,311 @@
 # src/utils/data_preprocessor.py
-import pandas as pd
-from langchain_openai import ChatOpenAI
-from dotenv import load_dotenv
+import json
 import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+from src.utils.corpus_loader import article_uid, iter_corpus
+from src.utils.embedding_util import content_hash
+from src.utils.tracing import text_bytes, tracer
 
 # Load environment variables from .env file
 load_dotenv()
 
-def filter_articles_with_llm(file_path: str, output_path: str):
+# Articles mentioning none of these terms are not sent to the LLM when the prefilter is enabled.
+# Terms match whole words; a trailing * also matches longer words ("olympi*" matches "Olympics").
+RELEVANCE_KEYWORDS = (
+    "olympi*", "paralympi*", "paris 2024", "medal*", "ioc",
+    "election*", "presidential", "white house", "campaign*", "ballot*", "primary", "primaries",
+    "trump", "biden", "harris", "vance", "walz", "democrat*", "republican*", "gop", "swing state*",
+)
+
+
+@lru_cache(maxsize=8)
+def _keyword_pattern(keywords):
+    terms = [re.escape(keyword[:-1]) + r"\w*" if keyword.endswith("*") else re.escape(keyword)
+             for keyword in keywords]
+    return re.compile(r"\b(?:" + "|".join(terms) + r")\b")
+
+
+def keyword_prefilter(text, keywords=RELEVANCE_KEYWORDS):
     """
-    Filters articles using an LLM to identify those related to 'Olympia' or 'US Wahlkampf'.
+    Cheap check whether an article could be relevant at all.
 
     Args:
-        file_path (str): Path to the input CSV file containing articles.
-        output_path (str): Path to save the filtered articles CSV.
+        text (str): The content of the article.
+        keywords (tuple): Lower-case terms of which at least one must occur as a word, see RELEVANCE_KEYWORDS.
 
     Returns:
-        None
+        bool: False if the article is an obvious non-match, True if it needs the LLM.
     """
-    # Load the articles from the CSV file
-    try:
-        articles = pd.read_csv(file_path)
-    except FileNotFoundError:
-        raise Exception(f"File not found at {file_path}")
-    except Exception as e:
-        raise Exception(f"An error occurred while loading the file: {e}")
+    return _keyword_pattern(tuple(keywords)).search(str(text).lower()) is not None
+
+
+def load_verdict_cache(cache_path):
+    """
+    Loads the persisted relevance verdicts.
+
+    Args:
+        cache_path (str): Path to the JSON cache file.
+
+    Returns:
+        dict: Mapping of content hash to verdict (bool).
+    """
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_verdict_cache(cache_path, cache):
+    """
+    Atomically writes the relevance verdicts to `cache_path`.
+    """
+    if not cache_path:
+        return
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def _is_rate_limit(error):
+    return getattr(error, "status_code", None) == 429 or "RateLimit" in type(error).__name__
+
+
+def is_relevant(llm, article, max_chars=4000, max_retries=6, backoff=1.0):
+    """
+    Uses an LLM to determine if an article is relevant to 'Olympia' or 'US Wahlkampf'.
+
+    Only the first `max_chars` characters are sent, which is enough to judge the topic.
+    Rate-limit errors are retried with exponential backoff and jitter.
+
+    Args:
+        llm: A chat model with an `invoke(messages)` method.
+        article (str): The content of the article to check.
+        max_chars (int): Maximum number of characters of the article sent to the LLM.
+        max_retries (int): Number of retries after a rate-limit error.
+        backoff (float): Seconds to wait before the first retry.
+
+    Returns:
+        bool: True if the article is relevant, False otherwise.
+    """
+    # Prepare the chat format
+    messages = [
+        {"role": "system", "content": "You are an assistant that identifies relevant articles."},
+        {"role": "user", "content": f"Is the following article related to the Olympics ('Olympia') or US Presidential Election ('US Wahlkampf')? Please respond with 'Yes' or 'No'.\n\nArticle: {str(article)[:max_chars]}"}
+    ]
+
+    # Counted on the span of the calling stage, see classify_articles
+    tracer.add("llm_calls")
+    tracer.add("bytes", sum(text_bytes(message["content"]) for message in messages))
+    for attempt in range(max_retries + 1):
+        try:
+            # Use invoke to properly call the LLM
+            response = llm.invoke(messages)
+            break
+        except Exception as e:
+            if not _is_rate_limit(e) or attempt == max_retries:
+                raise
+            tracer.add("retries")
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+    # Access the content of the response correctly
+    if hasattr(response, 'content'):
+        return "yes" in response.content.lower()
+    else:
+        return False
 
-    # Initialize the LLM with the specified model
+
+def classify_articles(texts, llm, cache=None, max_concurrency=8, prefilter=None, max_chars=4000, on_verdict=None):
+    """
+    Classifies articles concurrently, reusing cached verdicts.
+
+    Args:
+        texts (list): Article contents.
+        llm: A chat model with an `invoke(messages)` method, or a callable returning one.
+            The callable is only invoked if at least one article needs the LLM.
+        cache (dict): Mapping of content hash to LLM verdict, updated in place. Prefilter
+            rejections are not stored, so the cache only ever holds LLM verdicts.
+        max_concurrency (int): Maximum number of LLM requests in flight.
+        prefilter (callable): Optional function returning False for obvious non-matches.
+        max_chars (int): Maximum number of characters of an article sent to the LLM.
+        on_verdict (callable): Called after every new LLM verdict, e.g. to persist the cache.
+
+    Returns:
+        tuple: (list of bool verdicts in input order, dict with counts of cached, prefiltered and classified articles)
+    """
+    cache = {} if cache is None else cache
+    keys = [content_hash(text) for text in texts]
+    stats = {"cached": 0, "prefiltered": 0, "classified": 0}
+
+    pending = {}
+    prefiltered = set()
+    for key, text in zip(keys, texts):
+        if key in cache or key in pending:
+            stats["cached"] += 1
+        elif prefilter is not None and not prefilter(text):
+            prefiltered.add(key)
+            stats["prefiltered"] += 1
+        else:
+            pending[key] = text
+
+    if pending:
+        if not hasattr(llm, "invoke"):
+            llm = llm()
+        lock = threading.Lock()
+        # Worker threads start without a span, so LLM calls and retries are attached to the caller's
+        parent_span = tracer.current_span()
+
+        def classify(key, text):
+            with tracer.attach(parent_span):
+                verdict = is_relevant(llm, text, max_chars=max_chars)
+            with lock:
+                cache[key] = verdict
+                stats["classified"] += 1
+                if on_verdict:
+                    on_verdict()
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            for future in [executor.submit(classify, key, text) for key, text in pending.items()]:
+                future.result()
+
+    tracer.add("items", len(texts))
+    tracer.add("cache_hits", stats["cached"])
+    tracer.add("prefiltered", stats["prefiltered"])
+    return [False if key in prefiltered else cache[key] for key in keys], stats
+
+
+def create_llm():
+    """
+    Creates the ChatOpenAI model used for relevance filtering.
+    """
     openai_api_key = os.getenv("OPENAI_API_KEY")  # Get the OpenAI API key from the environment
     if not openai_api_key:
         raise Exception("OpenAI API key is not set. Please check your .env file.")
 
+    # Imported here so that offline runs with a mock LLM do not need langchain_openai
+    from langchain_openai import ChatOpenAI
+
     # Initialize the ChatOpenAI with the custom model
-    llm = ChatOpenAI(
+    return ChatOpenAI(
         openai_api_key=openai_api_key,
         temperature=0.0,
         model_name="gpt-4o-mini"  # Using your specified model
     )
 
-    def is_relevant(article):
-        """
-        Uses an LLM to determine if an article is relevant to 'Olympia' or 'US Wahlkampf'.
-        
-        Args:
-            article (str): The content of the article to check.
-
-        Returns:
-            bool: True if the article is relevant, False otherwise.
-        """
-        # Prepare the chat format
-        messages = [
-            {"role": "system", "content": "You are an assistant that identifies relevant articles."},
-            {"role": "user", "content": f"Is the following article related to the Olympics ('Olympia') or US Presidential Election ('US Wahlkampf')? Please respond with 'Yes' or 'No'.\n\nArticle: {article}"}
-        ]
-        
-        # Use invoke to properly call the LLM
-        response = llm.invoke(messages)
-        
-        # Access the content of the response correctly
-        if hasattr(response, 'content'):
-            return "yes" in response.content.lower()
-        else:
-            return False
 
-    # Apply the filtering using the LLM
-    articles['relevant'] = articles['content'].apply(is_relevant)
-    filtered_articles = articles[articles['relevant']]
+@tracer.traced("filter")
+def filter_articles_with_llm(file_path: str, output_path: str, llm=None, cache_path: str = 'data/relevance_cache.json',
+                             max_concurrency: int = 8, use_prefilter: bool = False, max_chars: int = 4000,
+                             chunksize: int = 500, near_duplicates=None):
+    """
+    Filters articles using an LLM to identify those related to 'Olympia' or 'US Wahlkampf'.
+
+    The input is streamed in chunks of `chunksize` rows and relevant rows are
+    appended to the output, so memory use does not grow with the corpus.
+    Verdicts are cached by content hash in `cache_path`, so a rerun on a grown
+    articles file only sends the new articles to the LLM. With a
+    NearDuplicateIndex, near-duplicates of an earlier article (republished or
+    lightly edited stories) are dropped before they reach the LLM; only the
+    canonical article of each cluster is classified and written.
+
+    Args:
+        file_path (str): Path to the input CSV file containing articles.
+        output_path (str): Path to save the filtered articles CSV.
+        llm: Optional chat model, e.g. MockChatLLM for offline runs. Defaults to gpt-4o-mini.
+        cache_path (str): Path of the persistent verdict cache, or None to disable it.
+        max_concurrency (int): Maximum number of LLM requests in flight.
+        use_prefilter (bool): Skip the LLM for articles without any relevant keyword.
+        max_chars (int): Maximum number of characters of an article sent to the LLM.
+        chunksize (int): Number of rows read from the input at once.
+        near_duplicates (NearDuplicateIndex): Optional detector; articles are added to it on the way.
+
+    Returns:
+        None
+    """
+    if not os.path.exists(file_path):
+        raise Exception(f"File not found at {file_path}")
+
+    cache = load_verdict_cache(cache_path)
+    last_save = [time.monotonic()]
+
+    def checkpoint():
+        # Persist regularly so an interrupted run does not lose its verdicts
+        if time.monotonic() - last_save[0] > 10:
+            save_verdict_cache(cache_path, dict(cache))
+            last_save[0] = time.monotonic()
+
+    llms = []
+
+    def get_llm():
+        # Only create the client once, and only if some article actually needs the LLM
+        if not llms:
+            llms.append(llm if llm is not None else create_llm())
+        return llms[0]
+
+    totals = {"cached": 0, "prefiltered": 0, "classified": 0, "near_duplicates": 0}
+    tmp_output = output_path + ".tmp"
+    header = True
+    try:
+        # Load the articles from the CSV file chunk by chunk
+        for articles in iter_corpus(file_path, chunksize=chunksize):
+            if near_duplicates is not None:
+                # Keep only articles that are their own cluster's canonical representative
+                ids = [article_uid(record) for record in articles.to_dict("records")]
+                canonical = [near_duplicates.add(article_id, text) == article_id
+                             for article_id, text in zip(ids, articles['content'].fillna('').astype(str))]
+                totals["near_duplicates"] += len(canonical) - sum(canonical)
+                tracer.add("near_duplicates", len(canonical) - sum(canonical))
+                articles = articles[canonical].copy()
+            verdicts, stats = classify_articles(
+                articles['content'].fillna('').tolist(),
+                get_llm,
+                cache=cache,
+                max_concurrency=max_concurrency,
+                prefilter=keyword_prefilter if use_prefilter else None,
+                max_chars=max_chars,
+                on_verdict=checkpoint,
+            )
+            for key, count in stats.items():
+                totals[key] += count
+
+            # Apply the filtering using the LLM
+            articles['relevant'] = verdicts
+            filtered_articles = articles[articles['relevant']]
+            tracer.add("relevant", len(filtered_articles))
+            filtered_articles.to_csv(tmp_output, mode='w' if header else 'a', header=header, index=False)
+            header = False
+    finally:
+        save_verdict_cache(cache_path, cache)
+
+    if header:
+        # Not a single chunk was read, so there is nothing to replace the previous output with
+        print(f"No articles found in {file_path}")
+        return
 
     # Save the filtered articles
-    filtered_articles.to_csv(output_path, index=False)
+    os.replace(tmp_output, output_path)
+    print(f"Classified {totals['classified']} articles with the LLM ({totals['cached']} cached, {totals['prefiltered']} prefiltered)")
+    if near_duplicates is not None:
+        print(f"Dropped {totals['near_duplicates']} near-duplicate articles before classification")
     print(f"Filtered articles saved to {output_path}")
 
 # Example usage
 if __name__ == "__main__":
-    input_path = 'data/articles.csv'
+    input_path = 'data/corpus'
     output_path = 'data/filtered_articles.csv'
-    filter_articles_with_llm(input_path, output_path)
+    # The detector state is kept, so articles scraped later are compared against this run's as well
+    from src.utils.near_duplicates import DEFAULT_STATE, NearDuplicateIndex
+    near_duplicates = NearDuplicateIndex.open(DEFAULT_STATE)
+    filter_articles_with_llm(input_path, output_path, near_duplicates=near_duplicates)
+    near_duplicates.save(DEFAULT_STATE)
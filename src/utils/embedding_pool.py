@@ -0,0 +1,380 @@
+# src/utils/embedding_pool.py
+import importlib.util
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+VARIANTS = ("fp32", "int8", "onnx")
+
+# Optional packages each variant needs besides numpy
+VARIANT_DEPENDENCIES = {
+    "fp32": ("sentence_transformers",),
+    "int8": ("sentence_transformers", "torch"),
+    "onnx": ("sentence_transformers", "torch", "onnxruntime"),
+}
+
+_worker_model = None
+
+
+def available_cores():
+    """
+    Returns the CPU cores this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def load_model(model_name='all-MiniLM-L6-v2', variant="fp32", threads=None, onnx_dir='data/onnx_models'):
+    """
+    Loads an embedding model for CPU inference.
+
+    Args:
+        model_name (str): SentenceTransformer model name, or 'hashing' for the offline benchmark stand-in.
+        variant (str): 'fp32' (the unchanged model), 'int8' (dynamically quantized
+            Linear layers) or 'onnx' (transformer exported to ONNX and run with ONNX Runtime).
+        threads (int): Intra-op threads of the ONNX Runtime session.
+        onnx_dir (str): Where exported ONNX models are kept.
+
+    Returns:
+        A model with `encode` and `get_sentence_embedding_dimension` like a SentenceTransformer.
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown model variant: {variant}, expected one of {VARIANTS}")
+    if model_name == "hashing":
+        # Deterministic offline stand-in, identical for every variant
+        from src.utils.embedding_util import HashingEmbedder
+        return HashingEmbedder()
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name, device="cpu")
+    if variant == "int8":
+        import torch
+        # Weights of all Linear layers become int8, activations are quantized on the fly
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if variant == "onnx":
+        return OnnxEmbedder.from_sentence_transformer(model, model_name, onnx_dir, threads=threads)
+    return model
+
+
+def missing_dependencies(model_name='all-MiniLM-L6-v2', variant="fp32"):
+    """
+    Lists the optional packages `load_model` would need for a variant but cannot find.
+
+    Worker processes load the model in their initializer, where an ImportError
+    only surfaces as a BrokenProcessPool, so this is checked in the parent.
+    """
+    if model_name == "hashing":
+        return []
+    return [name for name in VARIANT_DEPENDENCIES[variant] if importlib.util.find_spec(name) is None]
+
+
+class OnnxEmbedder:
+    """
+    Runs the transformer of a SentenceTransformer model with ONNX Runtime.
+
+    Tokenization uses the model's own tokenizer; mean pooling and the optional
+    normalization are done in numpy, like the Pooling and Normalize modules of
+    the original model. onnxruntime is an optional dependency.
+
+    Args:
+        onnx_path (str): Path to the exported transformer.
+        tokenizer: The Hugging Face tokenizer of the model.
+        dimension (int): Embedding dimension.
+        normalize (bool): Whether to L2-normalize the pooled embeddings.
+        max_length (int): Maximum number of tokens per text.
+        threads (int): Intra-op threads of the session, None for the ONNX Runtime default.
+    """
+
+    def __init__(self, onnx_path, tokenizer, dimension, normalize=True, max_length=256, threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The 'onnx' variant needs onnxruntime: pip install onnxruntime") from e
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = tokenizer
+        self.dimension = dimension
+        self.normalize = normalize
+        self.max_length = max_length
+
+    @classmethod
+    def from_sentence_transformer(cls, model, model_name, onnx_dir='data/onnx_models', threads=None):
+        """
+        Exports the transformer of `model` once to `<onnx_dir>/<model_name>/model.onnx` and opens it.
+        """
+        onnx_path = os.path.join(onnx_dir, model_name.replace("/", "__"), "model.onnx")
+        if not os.path.exists(onnx_path):
+            cls.export(model, onnx_path)
+        normalize = any(type(module).__name__ == "Normalize" for module in model)
+        return cls(onnx_path, model.tokenizer, model.get_sentence_embedding_dimension(), normalize,
+                   model.max_seq_length, threads)
+
+    @staticmethod
+    def export(model, onnx_path):
+        """
+        Exports the transformer of a SentenceTransformer with dynamic batch and sequence axes.
+        """
+        import torch
+        transformer = model[0].auto_model.eval()
+        tokens = model.tokenizer(["An example sentence for the export."], return_tensors="pt")
+        # Graph inputs follow the order of the forward signature
+        names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in tokens]
+        axes = {name: {0: "batch", 1: "sequence"} for name in names + ["last_hidden_state"]}
+        os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+        with torch.no_grad():
+            torch.onnx.export(transformer, ({name: tokens[name] for name in names},), onnx_path, input_names=names,
+                              output_names=["last_hidden_state"], dynamic_axes=axes, opset_version=14)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors="np")
+            hidden = self.session.run(None, {name: tokens[name].astype(np.int64) for name in self.input_names})[0]
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors[start:start + len(pooled)] = pooled
+        return vectors[0] if single else vectors
+
+
+def _init_worker(model_name, variant, threads, core_sets):
+    global _worker_model
+    # Limit the thread pools before torch or onnxruntime create them
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    if core_sets is not None:
+        os.sched_setaffinity(0, core_sets.get())
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass
+    _worker_model = load_model(model_name, variant, threads=threads)
+
+
+def _encode_in_worker(texts, batch_size):
+    vectors = _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+class EmbeddingPool:
+    """
+    Multi-process CPU embedding backend with the interface of a SentenceTransformer model.
+
+    Every worker process loads its own copy of the model and is limited to
+    `threads_per_worker` intra-op threads, by default the available cores
+    divided by the number of workers, so the workers do not oversubscribe the
+    CPU. With `pin_cores` each worker is also bound to its own cores (Linux).
+    Texts are split into one slice per worker, at most `chunk_size` texts each,
+    that are encoded in parallel and returned in input order.
+
+    The workers start on first use; `close` stops them, and a closed pool
+    starts them again when it is used once more.
+
+    Pass a pool as `model` to `EmbeddingEngine` to combine it with the
+    content-hash cache; the engine's length sorting keeps each slice evenly
+    padded. Workers use the 'spawn' start method, so no torch state is
+    inherited from the parent process.
+
+    Args:
+        model_name (str): SentenceTransformer model name, or 'hashing'.
+        variant (str): 'fp32', 'int8' or 'onnx', see `load_model`.
+        n_workers (int): Number of worker processes, defaults to the number of available cores.
+        threads_per_worker (int): Threads per worker, defaults to cores // n_workers (at least 1).
+        pin_cores (bool): Bind every worker to its own set of cores where supported.
+        chunk_size (int): Maximum number of texts sent to a worker at once.
+    """
+
+    def __init__(self, model_name='all-MiniLM-L6-v2', variant="fp32", n_workers=None, threads_per_worker=None,
+                 pin_cores=True, chunk_size=256):
+        cores = available_cores()
+        self.model_name = model_name
+        self.variant = variant
+        self.n_workers = n_workers or len(cores)
+        self.threads_per_worker = threads_per_worker or max(1, len(cores) // self.n_workers)
+        self.chunk_size = chunk_size
+        self.pin_cores = pin_cores
+        self._cores = cores
+        self._dimension = None
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            core_sets = None
+            if self.pin_cores and hasattr(os, "sched_setaffinity"):
+                core_sets = context.Queue()
+                for worker in range(self.n_workers):
+                    first = worker * self.threads_per_worker
+                    core_sets.put({self._cores[(first + i) % len(self._cores)] for i in range(self.threads_per_worker)})
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.variant, self.threads_per_worker, core_sets),
+            )
+        return self._executor
+
+    def warm_up(self):
+        """
+        Starts all workers and loads the model in each, so later timings exclude start-up.
+        """
+        futures = [self._pool().submit(_encode_in_worker, ["warm up"], 1) for _ in range(self.n_workers)]
+        self._dimension = futures[0].result().shape[1]
+        for future in futures[1:]:
+            future.result()
+
+    def get_sentence_embedding_dimension(self):
+        if self._dimension is None:
+            self._dimension = self._pool().submit(_encode_in_worker, ["dimension"], 1).result().shape[1]
+        return self._dimension
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False):
+        single = isinstance(texts, str)
+        texts = [texts] if single else ["" if t is None else str(t) for t in texts]
+        if not texts:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        # At least one slice per worker, so a call with few texts still uses every worker
+        size = max(1, min(self.chunk_size, math.ceil(len(texts) / self.n_workers)))
+        pool = self._pool()
+        futures = [pool.submit(_encode_in_worker, texts[start:start + size], batch_size)
+                   for start in range(0, len(texts), size)]
+        vectors = np.concatenate([future.result() for future in futures])
+        return vectors[0] if single else vectors
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def cosine_agreement(baseline, candidate, top_k=10):
+    """
+    Compares the embeddings of a model variant with those of the fp32 baseline for the same texts.
+
+    Args:
+        baseline (np.ndarray): fp32 embeddings, one row per text.
+        candidate (np.ndarray): Embeddings of the variant for the same texts.
+        top_k (int): Neighbourhood size for the retrieval agreement.
+
+    Returns:
+        dict: Mean, 1st percentile and minimum of the row-wise cosine similarity,
+            and `neighbor_overlap`, the average share of each text's top_k nearest
+            neighbours in the corpus that both embeddings agree on.
+    """
+    a = baseline / np.clip(np.linalg.norm(baseline, axis=1, keepdims=True), 1e-12, None)
+    b = candidate / np.clip(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12, None)
+    cosine = np.sum(a * b, axis=1)
+    k = min(top_k, len(a) - 1)
+    overlap = 1.0
+    if k > 0:
+        # Neighbours among at most 2000 texts keep the similarity matrices small
+        a, b = a[:2000], b[:2000]
+        neighbours_a = np.argsort(-(a @ a.T), axis=1)[:, 1:k + 1]
+        neighbours_b = np.argsort(-(b @ b.T), axis=1)[:, 1:k + 1]
+        overlap = float(np.mean([len(set(x) & set(y)) / k for x, y in zip(neighbours_a, neighbours_b)]))
+    return {
+        "cosine_mean": float(cosine.mean()),
+        "cosine_p1": float(np.percentile(cosine, 1)),
+        "cosine_min": float(cosine.min()),
+        "neighbor_overlap": overlap,
+    }
+
+
+def benchmark_pool(corpus_path='data/filtered_articles.csv', model_name='all-MiniLM-L6-v2',
+                   variants=VARIANTS, worker_counts=None, batch_size=64):
+    """
+    Measures embedding throughput per variant and worker count on the corpus.
+
+    The first fp32 run is the quality baseline; every run reports its cosine
+    agreement with it and its speedup over the single-worker run of the same
+    variant. Variants whose optional dependencies are missing, or whose
+    workers fail to start, are reported with an `error` instead.
+
+    Args:
+        corpus_path (str): Article CSV or CorpusStore directory.
+        model_name (str): SentenceTransformer model name, or 'hashing'.
+        variants (tuple): Variants to compare, see `load_model`.
+        worker_counts (tuple): Worker counts, defaults to powers of two up to the number of cores.
+        batch_size (int): Texts per forward pass.
+
+    Returns:
+        list: One result dict per variant and worker count.
+    """
+    from src.utils.corpus_loader import load_corpus
+
+    texts = load_corpus(corpus_path, usecols=['content'])['content'].fillna('').tolist()
+    # Same order the EmbeddingEngine would use
+    texts.sort(key=len, reverse=True)
+    cores = len(available_cores())
+    if worker_counts is None:
+        worker_counts = sorted({2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores} | {cores})
+
+    results = []
+    baseline = None
+    for variant in variants:
+        missing = missing_dependencies(model_name, variant)
+        if missing:
+            results.append({"variant": variant, "workers": None, "error": f"not installed: {', '.join(missing)}"})
+            continue
+        single_worker_rate = None
+        for n_workers in worker_counts:
+            try:
+                with EmbeddingPool(model_name, variant, n_workers=n_workers) as pool:
+                    pool.warm_up()
+                    start = time.perf_counter()
+                    vectors = pool.encode(texts, batch_size=batch_size)
+                    seconds = time.perf_counter() - start
+            except BrokenProcessPool as e:
+                # The model could not be loaded in the workers, e.g. a failed ONNX export
+                results.append({"variant": variant, "workers": n_workers, "error": f"workers failed: {e}"})
+                break
+            docs_per_sec = len(texts) / seconds
+            single_worker_rate = single_worker_rate or docs_per_sec
+            if baseline is None and variant == "fp32":
+                baseline = vectors
+            result = {
+                "variant": variant,
+                "workers": n_workers,
+                "threads_per_worker": pool.threads_per_worker,
+                "docs": len(texts),
+                "seconds": seconds,
+                "docs_per_sec": docs_per_sec,
+                "speedup": docs_per_sec / single_worker_rate,
+            }
+            if baseline is not None:
+                result.update(cosine_agreement(baseline, vectors))
+            results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    model_name = sys.argv[1] if len(sys.argv) > 1 else 'all-MiniLM-L6-v2'
+    for result in benchmark_pool(model_name=model_name):
+        print(result)
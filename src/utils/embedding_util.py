@@ -0,0 +1,200 @@
+# src/utils/embedding_util.py
+import hashlib
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+
+
+def content_hash(text):
+    """
+    Computes a stable hash of an article or chunk text.
+
+    Args:
+        text (str): The text to hash.
+
+    Returns:
+        str: The hex SHA-1 digest of the UTF-8 encoded text.
+    """
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by content hash.
+
+    Every call to `put_many` writes a new shard consisting of a float32 `.npy`
+    matrix and a `.keys` file with one content hash per row. Shards are opened
+    memory-mapped, so a large cache costs almost no RAM until rows are read.
+    The keys file is written last and acts as the commit marker of a shard.
+    """
+
+    def __init__(self, cache_dir, model_name):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.path = os.path.join(cache_dir, slug)
+        os.makedirs(self.path, exist_ok=True)
+        self._shards = []
+        self._lookup = {}
+        for keys_file in sorted(f for f in os.listdir(self.path) if f.endswith(".keys")):
+            self._open_shard(os.path.join(self.path, keys_file[:-len(".keys")]))
+
+    def _open_shard(self, prefix):
+        with open(prefix + ".keys", encoding="utf-8") as f:
+            keys = f.read().split()
+        vectors = np.load(prefix + ".npy", mmap_mode="r")
+        shard_id = len(self._shards)
+        self._shards.append(vectors)
+        for row, key in enumerate(keys):
+            self._lookup[key] = (shard_id, row)
+
+    def __len__(self):
+        return len(self._lookup)
+
+    def __contains__(self, key):
+        return key in self._lookup
+
+    def get(self, key):
+        """
+        Returns the cached vector for a content hash, or None if it is unknown.
+        """
+        location = self._lookup.get(key)
+        if location is None:
+            return None
+        shard_id, row = location
+        return np.asarray(self._shards[shard_id][row], dtype=np.float32)
+
+    def put_many(self, keys, vectors):
+        """
+        Stores a batch of vectors as a new shard.
+
+        Args:
+            keys (list): Content hashes, one per row of `vectors`.
+            vectors (np.ndarray): A float32 matrix of shape (len(keys), dim).
+        """
+        if len(keys) == 0:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        prefix = os.path.join(self.path, f"shard-{len(self._shards):05d}")
+        np.save(prefix + ".npy", vectors)
+        tmp_keys = prefix + ".keys.tmp"
+        with open(tmp_keys, "w", encoding="utf-8") as f:
+            f.write("\n".join(keys))
+        os.replace(tmp_keys, prefix + ".keys")
+        self._open_shard(prefix)
+
+
+class HashingEmbedder:
+    """
+    Deterministic offline stand-in for a SentenceTransformer model.
+
+    Words are hashed into a fixed number of buckets and the counts are
+    L2-normalized. The vectors carry enough lexical signal for retrieval
+    benchmarks, cost no model download and are identical on every machine.
+
+    Args:
+        dimension (int): Embedding dimension, 384 like all-MiniLM-L6-v2.
+    """
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False):
+        single = isinstance(texts, str)
+        texts = [texts] if single else texts
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1.0, norms)
+        return vectors[0] if single else vectors
+
+
+class EmbeddingEngine:
+    """
+    Batched, cached text embedding on top of a SentenceTransformer model.
+
+    Texts are deduplicated by content hash, looked up in the optional on-disk
+    cache and only the misses are encoded. Misses are sorted by length so
+    that each batch holds texts of similar size and padding is minimal. The
+    result is always a float32 matrix in the order of the input texts.
+
+    Args:
+        model (SentenceTransformer): The loaded embedding model.
+        model_name (str): Name of the model, used to separate cache entries.
+        batch_size (int): Number of texts per forward pass.
+        cache_dir (str): Directory of the embedding cache, or None to disable caching.
+        flush_every (int): Number of encoded texts after which a cache shard is written.
+    """
+
+    def __init__(self, model, model_name, batch_size=64, cache_dir=None, flush_every=1024):
+        self.model = model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.flush_every = flush_every
+        self.cache = EmbeddingCache(cache_dir, model_name) if cache_dir else None
+        self.dimension = model.get_sentence_embedding_dimension()
+        self.last_stats = {}
+
+    def _encode_batch(self, texts):
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+    def encode(self, texts):
+        """
+        Embeds a list of texts.
+
+        Args:
+            texts (list): The texts to embed.
+
+        Returns:
+            np.ndarray: A float32 matrix of shape (len(texts), dimension).
+        """
+        start = time.perf_counter()
+        texts = ["" if t is None else str(t) for t in texts]
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        # Rows sharing the same content are encoded once
+        rows_by_key = {}
+        for row, text in enumerate(texts):
+            rows_by_key.setdefault(content_hash(text), []).append(row)
+
+        missing = []
+        cache_hits = 0
+        for key, rows in rows_by_key.items():
+            vector = self.cache.get(key) if self.cache is not None else None
+            if vector is None:
+                missing.append(key)
+            else:
+                embeddings[rows] = vector
+                cache_hits += len(rows)
+
+        # Longest first keeps similarly sized texts in the same batch
+        missing.sort(key=lambda k: len(texts[rows_by_key[k][0]]), reverse=True)
+        for offset in range(0, len(missing), self.flush_every):
+            keys = missing[offset:offset + self.flush_every]
+            vectors = self._encode_batch([texts[rows_by_key[k][0]] for k in keys])
+            for key, vector in zip(keys, vectors):
+                embeddings[rows_by_key[key]] = vector
+            if self.cache is not None:
+                self.cache.put_many(keys, vectors)
+
+        seconds = time.perf_counter() - start
+        self.last_stats = {
+            "docs": len(texts),
+            "cache_hits": cache_hits,
+            "encoded": len(missing),
+            "seconds": seconds,
+            "docs_per_sec": len(texts) / seconds if seconds > 0 else float("inf"),
+        }
+        return embeddings
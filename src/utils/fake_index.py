@@ -0,0 +1,146 @@
+# src/utils/fake_index.py
+import random
+import threading
+import time
+
+import numpy as np
+
+
+class FakeIndexError(Exception):
+    """Raised by FakeIndex to simulate a failed request."""
+
+
+class FakeIndex:
+    """
+    In-memory stand-in for a Pinecone index.
+
+    Implements the subset of the Pinecone `Index` API used in this project
+    (`upsert`, `query`, `delete`, `fetch`, `describe_index_stats`) and simulates
+    a network round trip per call plus random request failures, so that upsert
+    throughput and retry behaviour can be measured offline.
+
+    Args:
+        latency (float): Seconds of simulated round-trip time per request.
+        per_vector_latency (float): Additional seconds per vector in a request.
+        failure_rate (float): Probability that a request fails with FakeIndexError.
+        max_batch_size (int): Largest number of vectors accepted per upsert.
+        seed (int): Seed for the failure simulation.
+    """
+
+    def __init__(self, latency=0.05, per_vector_latency=0.0, failure_rate=0.0, max_batch_size=1000, seed=None):
+        self.latency = latency
+        self.per_vector_latency = per_vector_latency
+        self.failure_rate = failure_rate
+        self.max_batch_size = max_batch_size
+        self.vectors = {}
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _round_trip(self, n_vectors=0):
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        time.sleep(self.latency + self.per_vector_latency * n_vectors)
+        if fail:
+            raise FakeIndexError("Simulated request failure")
+
+    def upsert(self, vectors, namespace=None):
+        if len(vectors) > self.max_batch_size:
+            raise FakeIndexError(f"Batch of {len(vectors)} vectors exceeds the limit of {self.max_batch_size}")
+        self._round_trip(len(vectors))
+        with self._lock:
+            for vector_id, values, metadata in vectors:
+                self.vectors[vector_id] = (np.asarray(values, dtype=np.float32), metadata)
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids, namespace=None):
+        self._round_trip()
+        with self._lock:
+            for vector_id in ids:
+                self.vectors.pop(vector_id, None)
+        return {}
+
+    def fetch(self, ids, namespace=None):
+        self._round_trip()
+        with self._lock:
+            found = {i: self.vectors[i] for i in ids if i in self.vectors}
+        return {"vectors": {i: {"id": i, "values": v.tolist(), "metadata": m} for i, (v, m) in found.items()}}
+
+    def query(self, vector, top_k=10, include_metadata=False, namespace=None, **kwargs):
+        self._round_trip()
+        with self._lock:
+            ids = list(self.vectors)
+            if not ids:
+                return {"matches": []}
+            matrix = np.stack([self.vectors[i][0] for i in ids])
+            metadata = [self.vectors[i][1] for i in ids]
+        query = np.asarray(vector, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+        top = np.argsort(-scores)[:top_k]
+        matches = []
+        for i in top:
+            match = {"id": ids[i], "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = metadata[i]
+            matches.append(match)
+        return {"matches": matches}
+
+    def describe_index_stats(self):
+        with self._lock:
+            return {"total_vector_count": len(self.vectors)}
+
+
+def benchmark_upsert(n_vectors=2000, dimension=384, latency=0.05, failure_rate=0.05,
+                     configs=((1, 1), (100, 1), (100, 4), (100, 8), (250, 8))):
+    """
+    Measures upsert throughput against a FakeIndex for several batch/concurrency settings.
+
+    Args:
+        n_vectors (int): Number of random vectors to upsert.
+        dimension (int): Dimension of the vectors.
+        latency (float): Simulated round-trip time per request.
+        failure_rate (float): Probability of a simulated request failure.
+        configs (tuple): Pairs of (batch_size, max_workers) to compare.
+
+    Returns:
+        list: One result dict per configuration.
+    """
+    import pandas as pd
+    from src.utils.pinecone_util import upsert_data_to_pinecone
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "headline": [f"Headline {i}" for i in range(n_vectors)],
+        "url": [f"https://www.bbc.com/news/articles/{i}" for i in range(n_vectors)],
+    })
+    df["content_embedding"] = list(rng.standard_normal((n_vectors, dimension), dtype=np.float32))
+
+    results = []
+    for batch_size, max_workers in configs:
+        index = FakeIndex(latency=latency, failure_rate=failure_rate, seed=0)
+        summary = upsert_data_to_pinecone(index, df, batch_size=batch_size, max_workers=max_workers, backoff=0.01)
+        results.append({
+            "batch_size": batch_size,
+            "max_workers": max_workers,
+            "requests": index.requests,
+            "failures": index.failures,
+            "upserted": summary["upserted"],
+            "failed": len(summary["failed_ids"]),
+            "seconds": summary["seconds"],
+            "vectors_per_sec": summary["vectors_per_sec"],
+        })
+    return results
+
+
+if __name__ == "__main__":
+    for result in benchmark_upsert():
+        print(
+            f"batch_size={result['batch_size']:>4} workers={result['max_workers']:>2} "
+            f"requests={result['requests']:>5} failures={result['failures']:>3} "
+            f"failed={result['failed']:>3} {result['vectors_per_sec']:>9.1f} vectors/sec"
+        )
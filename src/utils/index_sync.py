@@ -0,0 +1,281 @@
+# src/utils/index_sync.py
+import argparse
+import json
+import os
+import sys
+import time
+
+from src.chunking.chunking import chunk_by_recursive_character
+from src.utils.corpus_loader import (chunk_records, clean_records, embed_chunks, is_newer, iter_corpus, iter_records,
+                                     scrape_time)
+from src.utils.embedding_util import content_hash
+
+DEFAULT_MANIFEST = 'data/index_manifest.json'
+
+
+def load_manifest(path):
+    """
+    Reads the manifest of indexed articles, or returns an empty one if `path` does not exist.
+
+    The manifest maps every indexed article id to the hash of its content, its
+    headline and the ids of its chunk vectors, plus the chunking and embedding
+    configuration the vectors were built with.
+    """
+    if not path or not os.path.exists(path):
+        return {"config": None, "articles": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path):
+    """
+    Writes the manifest atomically, so an interrupted sync leaves the previous one intact.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def sync_config(model_name, chunker=chunk_by_recursive_character, chunk_size=1000, chunk_overlap=200):
+    """
+    Describes what the vectors depend on besides the article; a change re-indexes every article.
+    """
+    return {"model": model_name, "chunker": chunker.__name__, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+
+
+def _iter_clean_records(path, chunksize):
+    columns = ["headline", "content", "url", "timestamp"]
+    return clean_records(iter_records(iter_corpus(path, chunksize, usecols=columns)))
+
+
+def plan_sync(path, manifest, config, chunksize=500, near_duplicates=None):
+    """
+    Diffs the corpus against the manifest without embedding anything.
+
+    Only the headline, the scrape timestamp and a hash of the cleaned content
+    are kept per article. If a URL was scraped more than once, the version
+    with the latest timestamp wins, independent of the row order; rows
+    without a timestamp only win if no version of the URL has one. With a
+    NearDuplicateIndex, articles that are near-duplicates of another article
+    are left out, so their vectors are removed like those of deleted articles.
+
+    Args:
+        path (str): Article CSV or CorpusStore directory.
+        manifest (dict): As returned by `load_manifest`.
+        config (dict): As returned by `sync_config`.
+        chunksize (int): Number of rows read at once.
+        near_duplicates (NearDuplicateIndex): Optional detector; articles are added to it on the way.
+
+    Returns:
+        dict: `current` (article id -> {content, headline}), the sorted
+            article ids that are `new`, `changed`, `removed` or `unchanged`,
+            and the ids of the `near_duplicates` left out.
+    """
+    current = {}
+    scraped = {}
+    duplicates = set()
+    for record in _iter_clean_records(path, chunksize):
+        article = record["article_id"]
+        # The detector keeps the first version of an id, later versions get the same answer
+        if near_duplicates is not None and near_duplicates.add(article, record["content"]) != article:
+            duplicates.add(article)
+            continue
+        timestamp = scrape_time(record)
+        if article in scraped and not is_newer(timestamp, scraped[article]):
+            continue
+        scraped[article] = timestamp
+        current[article] = {"content": content_hash(record["content"]), "headline": record.get("headline")}
+
+    previous = manifest["articles"]
+    # A different model or chunker invalidates every vector, not just those of edited articles
+    reindex_all = manifest.get("config") not in (None, config)
+    new, changed, unchanged = [], [], []
+    for article, state in current.items():
+        if article not in previous:
+            new.append(article)
+        elif reindex_all or {k: previous[article][k] for k in ("content", "headline")} != state:
+            changed.append(article)
+        else:
+            unchanged.append(article)
+    removed = [article for article in previous if article not in current]
+    return {
+        "current": current,
+        "new": sorted(new),
+        "changed": sorted(changed),
+        "removed": sorted(removed),
+        "unchanged": sorted(unchanged),
+        "reindex_all": reindex_all,
+        "near_duplicates": sorted(duplicates),
+    }
+
+
+def sync_index(path, index, engine, manifest_path=DEFAULT_MANIFEST, chunksize=500, chunker=chunk_by_recursive_character,
+               chunk_size=1000, chunk_overlap=200, embed_batch_size=256, delete_batch_size=1000, near_duplicates=None,
+               query_cache=None, **upsert_kwargs):
+    """
+    Brings a vector index in line with the corpus at the cost of the changes only.
+
+    Vector ids are derived from the article URL and the chunk text (see
+    `article_uid` and `chunk_uid`), so reordering or deduplicating the corpus
+    changes nothing. New and edited articles are chunked; only chunks whose id
+    is not indexed yet are embedded and upserted. Chunks that no longer exist,
+    including all chunks of removed articles, are deleted. Articles with failed
+    upserts keep their previous content hash and are retried on the next sync;
+    their chunks that did get upserted are added to the manifest entry, so the
+    retry reuses them and a later removal deletes them.
+    Upserts are idempotent, so an interrupted sync can simply be run again.
+    Cached results built from changed or removed articles are dropped from
+    `query_cache`, so they are not served after the sync.
+
+    Args:
+        path (str): Article CSV or CorpusStore directory.
+        index: A Pinecone index or any VectorStore.
+        engine (EmbeddingEngine): The embedding engine; its `model_name` is part of the config.
+        manifest_path (str): Manifest file, created on the first sync.
+        chunksize (int): Number of rows read at once.
+        chunker (callable): One of the functions in `src.chunking.chunking`.
+        chunk_size (int): Chunk size passed to the chunker.
+        chunk_overlap (int): Chunk overlap passed to the chunker.
+        embed_batch_size (int): Number of chunks embedded together.
+        delete_batch_size (int): Number of ids per delete call (Pinecone accepts at most 1000).
+        near_duplicates (NearDuplicateIndex): Optional detector, see `plan_sync`.
+        query_cache (QueryCache): Optional cache whose entries of stale articles are invalidated.
+        **upsert_kwargs: Passed on to `upsert_vectors` (batch_size, max_workers, ...).
+
+    Returns:
+        dict: Article counts per state, `upserted`, `reused` and `deleted` chunk
+            counts, `failed_ids`, `stale_articles` (ids of changed and removed
+            articles), the number of `invalidated` cache entries and `seconds`.
+    """
+    # Imported here so that planning a sync does not pull in torch and the Pinecone client
+    from src.utils.pinecone_util import upsert_vectors
+
+    start = time.perf_counter()
+    manifest = load_manifest(manifest_path)
+    config = sync_config(engine.model_name, chunker, chunk_size, chunk_overlap)
+    plan = plan_sync(path, manifest, config, chunksize, near_duplicates=near_duplicates)
+    current, previous = plan["current"], manifest["articles"]
+    to_index = set(plan["new"]) | set(plan["changed"])
+
+    chunk_ids = {}
+    reused = 0
+
+    def pending_chunks():
+        nonlocal reused
+        for record in _iter_clean_records(path, chunksize):
+            article = record["article_id"]
+            # Only the version of the article the plan was made for, and only once
+            if article not in to_index or article in chunk_ids or \
+                    content_hash(record["content"]) != current[article]["content"]:
+                continue
+            old = previous.get(article, {})
+            # Unchanged chunk texts of an edited article are already indexed with the right metadata
+            indexed = set(old.get("chunks", ())) \
+                if not plan["reindex_all"] and old.get("headline") == record.get("headline") else set()
+            chunk_ids[article] = []
+            for chunk in chunk_records([record], chunker=chunker, chunk_size=chunk_size, chunk_overlap=chunk_overlap):
+                chunk_ids[article].append(chunk["id"])
+                if chunk["id"] in indexed:
+                    reused += 1
+                else:
+                    yield chunk
+
+    upsert_summary = upsert_vectors(index, embed_chunks(pending_chunks(), engine, batch_size=embed_batch_size),
+                                    **upsert_kwargs)
+    failed_ids = set(upsert_summary["failed_ids"])
+    failed_articles = {vector_id.rsplit("-", 1)[0] for vector_id in failed_ids}
+    # Articles that vanished between the two passes are treated like failed ones
+    failed_articles |= to_index - set(chunk_ids)
+
+    stale_ids = []
+    for article in plan["removed"]:
+        stale_ids.extend(previous[article]["chunks"])
+    for article in plan["changed"]:
+        if article not in failed_articles:
+            stale_ids.extend(set(previous[article]["chunks"]) - set(chunk_ids[article]))
+    for i in range(0, len(stale_ids), delete_batch_size):
+        index.delete(ids=stale_ids[i:i + delete_batch_size])
+
+    articles = {}
+    for article, state in current.items():
+        if article in to_index and article not in failed_articles:
+            articles[article] = dict(state, chunks=chunk_ids[article])
+            continue
+        # Without a content hash a new article counts as changed on the next sync
+        old = previous.get(article, {"content": None, "headline": None, "chunks": []})
+        written = [chunk for chunk in chunk_ids.get(article, ()) if chunk not in failed_ids]
+        if article in previous or written:
+            articles[article] = dict(old, chunks=list(dict.fromkeys(old["chunks"] + written)))
+    save_manifest({"config": config, "articles": articles}, manifest_path)
+
+    stale_articles = plan["changed"] + plan["removed"]
+    invalidated = query_cache.invalidate_articles(stale_articles) if query_cache is not None else 0
+
+    return {
+        "articles": len(current),
+        "new": len(plan["new"]),
+        "changed": len(plan["changed"]),
+        "removed": len(plan["removed"]),
+        "unchanged": len(plan["unchanged"]),
+        "upserted": upsert_summary["upserted"],
+        "reused": reused,
+        "deleted": len(stale_ids),
+        "near_duplicates": len(plan["near_duplicates"]),
+        "failed_ids": upsert_summary["failed_ids"],
+        "stale_articles": stale_articles,
+        "invalidated": invalidated,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally sync the chunk index with the article corpus.")
+    parser.add_argument("--corpus", default='data/filtered_articles.csv')
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--index-name", default='news-chunks-index')
+    parser.add_argument("--model", default='all-MiniLM-L6-v2')
+    parser.add_argument("--cache-dir", default='data/embedding_cache')
+    parser.add_argument("--dedup-state", default=None,
+                        help="near-duplicate detector state, e.g. data/near_duplicates.npz; only canonical articles are indexed")
+    parser.add_argument("--dry-run", action="store_true", help="only print what would change")
+    args = parser.parse_args(argv)
+
+    near_duplicates = None
+    if args.dedup_state:
+        from src.utils.near_duplicates import NearDuplicateIndex
+        near_duplicates = NearDuplicateIndex.open(args.dedup_state)
+
+    if args.dry_run:
+        plan = plan_sync(args.corpus, load_manifest(args.manifest), sync_config(args.model),
+                         near_duplicates=near_duplicates)
+        print(f"{len(plan['current'])} articles: {len(plan['new'])} new, {len(plan['changed'])} changed, "
+              f"{len(plan['removed'])} removed, {len(plan['unchanged'])} unchanged, "
+              f"{len(plan['near_duplicates'])} near-duplicates left out")
+        return 0
+
+    from sentence_transformers import SentenceTransformer
+    from src.utils.embedding_util import EmbeddingEngine
+    from src.utils.pinecone_util import initialize_pinecone
+
+    api_key = os.getenv('PINECONE_API_KEY')
+    if not api_key:
+        raise Exception("Pinecone API key is not set. Please check your .env file.")
+    index = initialize_pinecone(api_key, "us-east-1", args.index_name)
+    engine = EmbeddingEngine(SentenceTransformer(args.model), args.model, cache_dir=args.cache_dir)
+    summary = sync_index(args.corpus, index, engine, manifest_path=args.manifest, near_duplicates=near_duplicates)
+    if near_duplicates is not None:
+        near_duplicates.save(args.dedup_state)
+    print(f"{summary['articles']} articles: {summary['new']} new, {summary['changed']} changed, "
+          f"{summary['removed']} removed, {summary['unchanged']} unchanged, "
+          f"{summary['near_duplicates']} near-duplicates left out")
+    print(f"{summary['upserted']} chunks upserted, {summary['reused']} reused, {summary['deleted']} deleted "
+          f"in {summary['seconds']:.1f}s")
+    return 1 if summary["failed_ids"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
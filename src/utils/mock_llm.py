@@ -0,0 +1,54 @@
+# src/utils/mock_llm.py
+import threading
+import time
+
+
+class MockMessage:
+    """Mimics the AIMessage returned by LangChain chat models."""
+
+    def __init__(self, content):
+        self.content = content
+
+
+class MockRateLimitError(Exception):
+    """Simulates the 429 error raised by the OpenAI API."""
+
+    status_code = 429
+
+
+class MockChatLLM:
+    """
+    Offline stand-in for `ChatOpenAI` that answers relevance questions by keyword.
+
+    Answers "Yes" if the article part of the last user message contains one
+    of `keywords`, "No" otherwise. A fixed latency and periodic rate-limit
+    errors can be simulated to exercise concurrency and backoff without
+    network access.
+
+    Args:
+        keywords (tuple): Lower-case keywords that make an article relevant.
+        latency (float): Seconds each call sleeps before answering.
+        rate_limit_every (int): Raise MockRateLimitError on every n-th call, or None.
+    """
+
+    def __init__(self, keywords=("olympi", "election", "trump", "biden", "harris"), latency=0.0, rate_limit_every=None):
+        self.keywords = keywords
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.calls = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if self.rate_limit_every and call % self.rate_limit_every == 0:
+            raise MockRateLimitError("Rate limit reached")
+        time.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        with self._lock:
+            self.prompts.append(prompt)
+        article = prompt.rsplit("Article:", 1)[-1].lower()
+        relevant = any(keyword in article for keyword in self.keywords)
+        return MockMessage("Yes" if relevant else "No")
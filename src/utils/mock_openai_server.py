@@ -0,0 +1,156 @@
+# src/utils/mock_openai_server.py
+import json
+import re
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def default_reply(messages):
+    """
+    Builds a deterministic answer from the first sentences of the context in the last message.
+    """
+    prompt = messages[-1]["content"]
+    context = prompt.split("\n\n", 1)[-1].rsplit("\n\nFrage:", 1)[0]
+    words = context.split()[:60]
+    return "Based on the provided articles: " + " ".join(words)
+
+
+class MockChatCompletionsHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST /v1/chat/completions like the OpenAI API, as a server-sent
+    event stream of chat.completion.chunk objects if `stream` is set.
+    """
+
+    def __init__(self, *args, mock=None, **kwargs):
+        self.mock = mock
+        super().__init__(*args, **kwargs)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.mock.record(body)
+
+        reply = self.mock.reply(body.get("messages", []))
+        # One "token" per word including its trailing whitespace, capped like max_tokens
+        pieces = re.findall(r"\S+\s*", reply)[:body.get("max_tokens") or None]
+        created = int(time.time())
+        model = body.get("model", "mock")
+        time.sleep(self.mock.first_token_latency)
+
+        if not body.get("stream"):
+            self._send_json({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(pieces)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(pieces), "total_tokens": len(pieces)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": piece} for piece in pieces]
+        for position, delta in enumerate(deltas):
+            if position > 1:
+                time.sleep(self.mock.token_latency)
+            self._send_event(self._chunk(created, model, delta, None))
+        self._send_event(self._chunk(created, model, {}, "stop"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    @staticmethod
+    def _chunk(created, model, delta, finish_reason):
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    def _send_event(self, payload):
+        self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockOpenAIServer:
+    """
+    Local stand-in for the OpenAI chat completions endpoint, usable as a context manager.
+
+    Point an `openai.OpenAI(base_url=server.base_url, api_key="test")` client
+    at it to exercise streaming generation offline. Received request bodies
+    are kept in `requests`, so the prompt sent by the client can be checked.
+
+    Args:
+        reply (str or callable): Fixed answer, or a function of the messages returning the answer.
+        first_token_latency (float): Seconds before the first token is sent.
+        token_latency (float): Seconds between subsequent tokens.
+        port (int): Port to listen on, 0 picks a free port.
+    """
+
+    def __init__(self, reply=default_reply, first_token_latency=0.2, token_latency=0.02, port=0):
+        self._reply = reply
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.requests = []
+        self._lock = threading.Lock()
+        handler = partial(MockChatCompletionsHandler, mock=self)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def reply(self, messages):
+        return self._reply(messages) if callable(self._reply) else self._reply
+
+    def record(self, body):
+        with self._lock:
+            self.requests.append(body)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Serve until interrupted, e.g. for the app with OPENAI_BASE_URL set to the printed URL
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    with MockOpenAIServer(port=port) as mock:
+        print(f"Mock OpenAI API at {mock.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,366 @@
+# src/utils/near_duplicates.py
+import os
+import random
+import re
+import time
+import tracemalloc
+import zlib
+
+import numpy as np
+
+DEFAULT_STATE = 'data/near_duplicates.npz'
+
+
+def _token_hashes(text):
+    tokens = re.findall(r"\w+", str(text).lower())
+    return np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64, count=len(tokens))
+
+
+def shingle_hashes(text, shingle_size=5):
+    """
+    Hashes the overlapping word n-grams ("shingles") of a text to unique 32-bit values.
+
+    Case and punctuation are ignored. Texts shorter than `shingle_size`
+    words are treated as a single shingle.
+    """
+    hashes = _token_hashes(text)
+    if len(hashes) == 0:
+        return hashes
+    if len(hashes) < shingle_size:
+        shingle_size = len(hashes)
+    n_shingles = len(hashes) - shingle_size + 1
+    combined = np.zeros(n_shingles, dtype=np.uint64)
+    # Polynomial combination of the word hashes, wrapping around at 2**64
+    for offset in range(shingle_size):
+        combined = combined * np.uint64(1000003) + hashes[offset:offset + n_shingles]
+    return np.unique((combined ^ (combined >> np.uint64(32))) & np.uint64(0xFFFFFFFF))
+
+
+def jaccard(a, b, shingle_size=5):
+    """
+    Exact Jaccard similarity of the shingle sets of two texts.
+    """
+    a, b = shingle_hashes(a, shingle_size), shingle_hashes(b, shingle_size)
+    union = len(np.union1d(a, b))
+    return len(np.intersect1d(a, b, assume_unique=True)) / union if union else 1.0
+
+
+class NearDuplicateIndex:
+    """
+    Streaming near-duplicate detector for article texts based on MinHash and LSH.
+
+    Every text is reduced to a MinHash signature of `num_perm` 32-bit values;
+    the share of equal values estimates the Jaccard similarity of the word
+    shingles of two texts. Signatures are split into `bands` bands, and only
+    texts sharing at least one band are compared, so adding an article costs
+    the same regardless of how many articles were seen before.
+
+    Articles are added one at a time as they arrive. An article whose
+    estimated similarity to the canonical article of an earlier cluster
+    reaches `threshold` joins that cluster; the first article of a cluster
+    stays its canonical representative, so ids derived from it never change. Adding an id again
+    returns its recorded cluster, which makes reruns over a grown corpus
+    idempotent.
+
+    Args:
+        threshold (float): Minimum estimated Jaccard similarity of a near-duplicate.
+        num_perm (int): Signature length.
+        bands (int): Number of LSH bands; must divide `num_perm`. More bands find
+            pairs of lower similarity at the cost of more candidate comparisons.
+        shingle_size (int): Number of words per shingle.
+        seed (int): Seed of the hash permutations; indexes are only comparable with the same seed.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, bands=16, shingle_size=5, seed=0):
+        if num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash functions (a * x + b mod 2**64) >> 32 with odd a, cheaper than a prime modulus
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self.ids = []
+        self._positions = {}
+        self._canonical = np.empty(0, dtype=np.int32)
+        self._buckets = [{} for _ in range(bands)]
+        self.comparisons = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def signature(self, text):
+        """
+        Computes the MinHash signature of a text.
+        """
+        shingles = shingle_hashes(text, self.shingle_size)
+        if len(shingles) == 0:
+            # All empty texts share this signature and end up in one cluster
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        # The shift is monotonic, so it is applied to the minimum only
+        hashed = np.outer(self._a, shingles) + self._b[:, None]
+        return (hashed.min(axis=1) >> np.uint64(32)).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        # One 64-bit key per band, wrapping around like the shingle hashes
+        bands = signature.astype(np.uint64).reshape(self.bands, self.rows)
+        return [int(key) for key in (bands * self._band_mix).sum(axis=1)]
+
+    def _reserve(self, n_new):
+        needed = len(self.ids) + n_new
+        if needed > len(self._signatures):
+            capacity = max(needed, 2 * len(self._signatures), 64)
+            signatures = np.empty((capacity, self.num_perm), dtype=np.uint32)
+            signatures[:len(self.ids)] = self._signatures[:len(self.ids)]
+            canonical = np.empty(capacity, dtype=np.int32)
+            canonical[:len(self.ids)] = self._canonical[:len(self.ids)]
+            self._signatures, self._canonical = signatures, canonical
+
+    def _candidates(self, keys):
+        candidates = set()
+        for bucket, key in zip(self._buckets, keys):
+            members = bucket.get(key)
+            if members is not None:
+                candidates.update(members)
+        return candidates
+
+    def _best_match(self, signature, keys):
+        candidates = self._candidates(keys)
+        if not candidates:
+            return None, 0.0
+        # Compared with the canonical article of each candidate's cluster, so clusters cannot drift
+        # through chains of articles that are each similar only to the previous one
+        positions = np.unique(self._canonical[np.fromiter(candidates, dtype=np.int64, count=len(candidates))])
+        self.comparisons += len(positions)
+        similarities = (self._signatures[positions] == signature).mean(axis=1)
+        best = int(np.argmax(similarities))
+        return int(positions[best]), float(similarities[best])
+
+    def query(self, text):
+        """
+        Finds the most similar canonical article without adding the text.
+
+        Returns:
+            tuple: (id, estimated similarity) of the best match at or above
+                `threshold`, or (None, similarity of the best candidate).
+        """
+        signature = self.signature(text)
+        position, similarity = self._best_match(signature, self._band_keys(signature))
+        if position is None or similarity < self.threshold:
+            return None, similarity
+        return self.ids[position], similarity
+
+    def add(self, doc_id, text):
+        """
+        Adds an article and assigns it to a cluster.
+
+        Args:
+            doc_id (str): Stable article id, e.g. from `article_uid`.
+            text (str): The article content.
+
+        Returns:
+            str: The id of the cluster's canonical article; `doc_id` itself
+                if the article is not a near-duplicate of an earlier one.
+        """
+        position = self._positions.get(doc_id)
+        if position is not None:
+            return self.ids[self._canonical[position]]
+
+        signature = self.signature(text)
+        keys = self._band_keys(signature)
+        match, similarity = self._best_match(signature, keys)
+        position = len(self.ids)
+        self._reserve(1)
+        self._signatures[position] = signature
+        self._canonical[position] = match if match is not None and similarity >= self.threshold else position
+        self.ids.append(doc_id)
+        self._positions[doc_id] = position
+        # Duplicates are bucketed too, so later copies that drifted further from the original still match
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(position)
+        return self.ids[self._canonical[position]]
+
+    def canonical(self, doc_id):
+        """
+        Returns the canonical id of an indexed article.
+        """
+        return self.ids[self._canonical[self._positions[doc_id]]]
+
+    def clusters(self, min_size=2):
+        """
+        Returns the clusters with at least `min_size` articles as {canonical id: [member ids]}.
+        """
+        members = {}
+        for position, doc_id in enumerate(self.ids):
+            members.setdefault(self.ids[self._canonical[position]], []).append(doc_id)
+        return {canonical: ids for canonical, ids in members.items() if len(ids) >= min_size}
+
+    def stats(self):
+        n = len(self.ids)
+        canonical = int((self._canonical[:n] == np.arange(n)).sum())
+        return {
+            "articles": n,
+            "clusters": canonical,
+            "duplicates": n - canonical,
+            "comparisons": self.comparisons,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    def memory_bytes(self):
+        """
+        Approximate memory held by the signatures, cluster assignments and LSH buckets.
+        """
+        n = len(self.ids)
+        # A bucket entry costs a dict slot, an int key and a list with one pointer per member
+        bucket_bytes = sum(len(bucket) * (8 + 3 * 8 + 28 + 56) for bucket in self._buckets) + self.bands * n * 8
+        return self._signatures[:n].nbytes + self._canonical[:n].nbytes + bucket_bytes
+
+    def save(self, path):
+        """
+        Writes the index atomically to an .npz file; the LSH buckets are rebuilt on load.
+        """
+        n = len(self.ids)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, signatures=self._signatures[:n], canonical=self._canonical[:n],
+                 ids=np.array(self.ids, dtype=str),
+                 params=np.array([self.num_perm, self.bands, self.shingle_size, self.seed]),
+                 threshold=np.array(self.threshold))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            num_perm, bands, shingle_size, seed = (int(value) for value in data["params"])
+            index = cls(float(data["threshold"]), num_perm, bands, shingle_size, seed)
+            signatures, canonical, ids = data["signatures"], data["canonical"], data["ids"].tolist()
+        index._reserve(len(ids))
+        index._signatures[:len(ids)] = signatures
+        index._canonical[:len(ids)] = canonical
+        index.ids = ids
+        index._positions = {doc_id: position for position, doc_id in enumerate(ids)}
+        for position, signature in enumerate(signatures):
+            for bucket, key in zip(index._buckets, index._band_keys(signature)):
+                bucket.setdefault(key, []).append(position)
+        return index
+
+    @classmethod
+    def open(cls, path=DEFAULT_STATE, **kwargs):
+        """
+        Loads the index from `path` if it exists, otherwise creates an empty one with `kwargs`.
+        """
+        return cls.load(path) if path and os.path.exists(path) else cls(**kwargs)
+
+
+def drop_near_duplicates(records, index, on_duplicate=None):
+    """
+    Passes on only the canonical articles of a stream of article records.
+
+    Args:
+        records (iterable): Article dicts with `article_id` and `content`, e.g. from `clean_records`.
+        index (NearDuplicateIndex): The detector; articles are added to it on the way.
+        on_duplicate (callable): Called with each dropped record and its canonical id.
+
+    Yields:
+        dict: Records that are not near-duplicates of an earlier article.
+    """
+    for record in records:
+        canonical = index.add(record["article_id"], record["content"])
+        if canonical == record["article_id"]:
+            yield record
+        elif on_duplicate is not None:
+            on_duplicate(record, canonical)
+
+
+def _edit(text, rng, edit_rate):
+    # Simulates a republished story: a few words replaced, one sentence dropped, one appended
+    words = text.split()
+    for position in rng.sample(range(len(words)), int(len(words) * edit_rate)):
+        words[position] = rng.choice(("reportedly", "also", "now", "said", "further", "updated"))
+    sentences = re.split(r"(?<=[.!?])\s+", " ".join(words))
+    if len(sentences) > 3:
+        del sentences[rng.randrange(1, len(sentences))]
+    sentences.append("This article has been updated with new information.")
+    return " ".join(sentences)
+
+
+def benchmark_near_duplicates(corpus_path='data/filtered_articles.csv', duplicate_share=0.3, edit_rate=0.005,
+                              threshold=0.8, num_perm=128, bands=16, seed=0):
+    """
+    Measures throughput, memory and accuracy of the detector on the bundled corpus.
+
+    Lightly edited copies of a share of the articles are mixed into the
+    stream, like republished stories. Recall is the share of copies assigned
+    to their original's cluster; false positives are flagged pairs whose
+    exact shingle Jaccard is below `threshold` minus 0.1.
+
+    Returns:
+        dict: Detector statistics and the metrics of the run.
+    """
+    from src.utils.corpus_loader import article_uid, clean_records, iter_corpus, iter_records
+
+    rng = random.Random(seed)
+    # One version per URL; re-scraped versions of the same URL share an id and are not near-duplicates
+    articles = {}
+    for article in clean_records(iter_records(iter_corpus(corpus_path, usecols=["headline", "content", "url"]))):
+        articles.setdefault(article["article_id"], article)
+    articles = list(articles.values())
+    stream = [(article["article_id"], article["content"]) for article in articles]
+    originals = {}
+    for article in rng.sample(articles, int(len(articles) * duplicate_share)):
+        copy_id = article_uid({"url": article["url"] + "?republished"})
+        originals[copy_id] = article["article_id"]
+        stream.append((copy_id, _edit(article["content"], rng, edit_rate)))
+    rng.shuffle(stream)
+    texts = dict(stream)
+
+    index = NearDuplicateIndex(threshold, num_perm, bands, seed=seed)
+    start = time.perf_counter()
+    canonical = {doc_id: index.add(doc_id, text) for doc_id, text in stream}
+    seconds = time.perf_counter() - start
+
+    # Memory of a second pass, traced separately so that tracing does not distort the throughput
+    tracemalloc.start()
+    try:
+        traced = NearDuplicateIndex(threshold, num_perm, bands, seed=seed)
+        for doc_id, text in stream:
+            traced.add(doc_id, text)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+    found = sum(canonical[copy_id] == canonical[original] for copy_id, original in originals.items())
+    flagged = [(doc_id, root) for doc_id, root in canonical.items() if doc_id != root]
+    false_positives = sum(jaccard(texts[doc_id], texts[root], index.shingle_size) < threshold - 0.1
+                          for doc_id, root in flagged)
+    natural = sum(doc_id not in originals for doc_id, _ in flagged)
+    return {
+        **index.stats(),
+        "docs_per_sec": len(stream) / seconds,
+        "seconds": seconds,
+        "peak_mb": peak_mb,
+        "bytes_per_doc": index.memory_bytes() / len(stream),
+        "synthetic_duplicates": len(originals),
+        "recall": found / len(originals) if originals else 1.0,
+        "false_positives": false_positives,
+        "corpus_duplicates": natural,
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark_near_duplicates()
+    print(f"{result['articles']} articles ({result['synthetic_duplicates']} edited copies) in "
+          f"{result['seconds']:.2f}s: {result['docs_per_sec']:.0f} docs/sec, {result['comparisons']} comparisons")
+    print(f"{result['clusters']} clusters, {result['duplicates']} near-duplicates collapsed "
+          f"({result['corpus_duplicates']} already in the corpus), recall {result['recall']:.2%}, "
+          f"{result['false_positives']} false positives")
+    print(f"Index {result['memory_bytes'] / 2 ** 20:.2f} MB ({result['bytes_per_doc']:.0f} bytes per article), "
+          f"peak {result['peak_mb']:.1f} MB while indexing")
@@ -1,7 +1,12 @@
+import hashlib
 import os
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone, ServerlessSpec
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+from src.utils.corpus_loader import article_uid, load_corpus
+from src.utils.embedding_pool import EmbeddingPool
+from src.utils.embedding_util import EmbeddingEngine
+from src.utils.tracing import text_bytes, tracer
 
 def initialize_pinecone(api_key, environment, index_name, dimension=384):
     """
@@ -16,6 +21,9 @@ def initialize_pinecone(api_key, environment, index_name, dimension=384):
     Returns:
     - index (Index): Der Pinecone-Index, der verwendet wird.
     """
+    # Erst hier importiert, damit der Import des Moduls den Pinecone-Client nicht lädt
+    from pinecone import Pinecone, ServerlessSpec
+
     # Erstelle eine Instanz der Pinecone-Klasse
     pc = Pinecone(api_key=api_key)
     
@@ -41,30 +49,222 @@ def initialize_pinecone(api_key, environment, index_name, dimension=384):
     
     return index
 
-def load_and_preprocess_data(csv_file, model_name='all-MiniLM-L6-v2'):
+@tracer.traced("embed")
+def load_and_preprocess_data(csv_file, model_name='all-MiniLM-L6-v2', batch_size=64, cache_dir='data/embedding_cache', model=None,
+                             n_workers=1, variant='fp32'):
     """
     Lädt die Daten aus einer CSV-Datei und verarbeitet sie mit einem SentenceTransformer-Modell.
+
+    Die Artikel werden gebündelt und nach Länge sortiert eingebettet. Bereits berechnete
+    Embeddings werden über den Content-Hash aus dem Cache in `cache_dir` gelesen, sodass
+    unveränderte Artikel nicht erneut kodiert werden. Mit `n_workers` > 1 oder einer anderen
+    `variant` wird ein EmbeddingPool mit mehreren CPU-Prozessen verwendet.
     
     Args:
     - csv_file (str): Pfad zur CSV-Datei.
     - model_name (str): Der Name des SentenceTransformer-Modells.
+    - batch_size (int): Anzahl der Texte pro Batch.
+    - cache_dir (str): Verzeichnis des Embedding-Caches, None deaktiviert den Cache.
+    - model (SentenceTransformer): Optional ein bereits geladenes Modell, sonst wird `model_name` geladen.
+    - n_workers (int): Anzahl der Worker-Prozesse zum Einbetten, None für alle Kerne.
+    - variant (str): 'fp32', 'int8' (quantisiert) oder 'onnx' (ONNX Runtime).
     
     Returns:
-    - df (pd.DataFrame): Das DataFrame mit den ursprünglichen Daten und den neuen Vektor-Embeddings.
+    - df (pd.DataFrame): Das DataFrame mit den ursprünglichen Daten und den neuen Vektor-Embeddings (float32).
     - model (SentenceTransformer): Das geladene SentenceTransformer-Modell.
     """
-    df = pd.read_csv(csv_file)
-    model = SentenceTransformer(model_name)
-    df['content_embedding'] = df['content'].apply(lambda x: model.encode(x).tolist())
+    df = load_corpus(csv_file)
+    pool = None
+    if model is None:
+        if n_workers == 1 and variant == 'fp32':
+            # Erst hier importiert, damit torch nur geladen wird, wenn wirklich eingebettet wird
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+        else:
+            model = pool = EmbeddingPool(model_name, variant, n_workers=n_workers)
+    # Quantisierte Varianten liefern leicht andere Vektoren und bekommen eigene Cache-Einträge
+    cache_name = model_name if variant == 'fp32' else f"{model_name}-{variant}"
+    texts = df['content'].fillna('').tolist()
+    try:
+        engine = EmbeddingEngine(model, cache_name, batch_size=batch_size, cache_dir=cache_dir)
+        embeddings = engine.encode(texts)
+    finally:
+        # Die Worker-Prozesse eines eigenen Pools werden beendet; der zurückgegebene Pool startet sie bei Bedarf neu
+        if pool is not None:
+            pool.close()
+    df['content_embedding'] = list(embeddings)
+
+    stats = engine.last_stats
+    tracer.add("items", stats['docs'])
+    tracer.add("bytes", sum(text_bytes(text) for text in texts))
+    tracer.add("cache_hits", stats['cache_hits'])
+    print(f"{stats['docs']} Embeddings in {stats['seconds']:.1f}s ({stats['docs_per_sec']:.1f} docs/sec, "
+          f"{stats['cache_hits']} aus dem Cache)")
     return df, model
 
-def upsert_data_to_pinecone(index, df):
+def _iter_vectors(df):
+    for _, row in df.iterrows():
+        # Aus der URL abgeleitete ID statt der Zeilenposition, damit Sortieren oder Deduplizieren
+        # der CSV den Index nicht ungültig macht
+        vector_id = article_uid(row)
+        values = np.asarray(row['content_embedding'], dtype=np.float32).tolist()
+        yield (vector_id, values, {"headline": row['headline'], "url": row['url']})
+
+def _iter_batches(vectors, batch_size):
+    batch = []
+    for vector in vectors:
+        batch.append(vector)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _upsert_batch(index, batch, max_retries, backoff, span=None):
+    """
+    Schickt einen Batch an den Index und wiederholt fehlgeschlagene Versuche mit exponentiellem Backoff.
+    Gibt den Batch zurück, damit der Aufrufer die IDs als erledigt markieren kann.
+    Wiederholungen werden auf `span` gezählt, da der Worker-Thread keinen aktuellen Span hat.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            index.upsert(vectors=batch)
+            return batch
+        except Exception:
+            if attempt == max_retries:
+                raise
+            if span is not None:
+                span.add("retries")
+            time.sleep(backoff * (2 ** attempt))
+
+def vector_fingerprint(values):
+    """
+    Hash der float32-Werte eines Vektors; ändert sich der Inhalt eines Artikels, ändert sich auch sein Embedding.
+    """
+    return hashlib.sha1(np.asarray(values, dtype=np.float32).tobytes()).hexdigest()[:16]
+
+def load_upserted_ids(checkpoint_path):
+    """
+    Liest die Vektoren, die laut Checkpoint-Datei bereits erfolgreich hochgeladen wurden.
+    
+    Args:
+    - checkpoint_path (str): Pfad zur Checkpoint-Datei (eine Zeile "<id>\t<fingerprint>" pro Vektor).
+    
+    Returns:
+    - done (set): Die bereits hochgeladenen (id, fingerprint)-Paare, siehe `vector_fingerprint`.
+    """
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, encoding='utf-8') as f:
+        # Zeilen ohne Fingerprint (ältere Checkpoints) passen auf keinen Vektor und werden erneut hochgeladen
+        return {tuple(line.strip().split('\t', 1)) for line in f if '\t' in line}
+
+@tracer.traced("upsert")
+def upsert_vectors(index, vectors, batch_size=100, max_workers=4, max_retries=3, backoff=0.5, checkpoint_path=None):
+    """
+    Lädt einen Strom von (id, values, metadata)-Tupeln gebündelt und parallel in den Index.
+
+    Die Vektoren werden in Batches gepackt, von denen bis zu `max_workers` gleichzeitig
+    unterwegs sind. Fehlgeschlagene Batches werden bis zu `max_retries` Mal wiederholt.
+    Mit `checkpoint_path` werden erfolgreich hochgeladene IDs samt Fingerprint ihrer Werte
+    protokolliert und bei einem erneuten Aufruf übersprungen, sodass ein abgebrochener Upload
+    fortgesetzt werden kann; ein seither geänderter Vektor wird erneut hochgeladen.
+    `vectors` darf ein Generator sein; es werden nie mehr als 2 * `max_workers` Batches vorgehalten.
+    
+    Args:
+    - index (Index): Der Pinecone-Index.
+    - vectors (iterable): Die hochzuladenden (id, values, metadata)-Tupel.
+    - batch_size (int): Anzahl der Vektoren pro Upsert-Aufruf.
+    - max_workers (int): Anzahl gleichzeitig laufender Batches.
+    - max_retries (int): Anzahl der Wiederholungen pro fehlgeschlagenem Batch.
+    - backoff (float): Wartezeit in Sekunden vor der ersten Wiederholung.
+    - checkpoint_path (str): Optionale Datei, in der erledigte Vektoren gespeichert werden.
+    
+    Returns:
+    - summary (dict): Anzahl hochgeladener, übersprungener und fehlgeschlagener Vektoren sowie der Durchsatz.
+    """
+    start = time.perf_counter()
+    done_ids = load_upserted_ids(checkpoint_path)
+    upserted = 0
+    skipped = 0
+    failed_ids = []
+    checkpoint = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path else None
+
+    def remaining():
+        nonlocal skipped
+        for vector in vectors:
+            if done_ids and (vector[0], vector_fingerprint(vector[1])) in done_ids:
+                skipped += 1
+            else:
+                yield vector
+
+    def collect(futures):
+        nonlocal upserted
+        for future in futures:
+            try:
+                batch = future.result()
+            except Exception:
+                failed_ids.extend(pending[future])
+                continue
+            upserted += len(batch)
+            # Nutzlast der float32-Vektoren
+            tracer.add("bytes", sum(4 * len(values) for _, values, _ in batch))
+            if checkpoint:
+                checkpoint.write("".join(f"{vector_id}\t{vector_fingerprint(values)}\n"
+                                         for vector_id, values, _ in batch))
+                checkpoint.flush()
+
+    pending = {}
+    span = tracer.current_span()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch in _iter_batches(remaining(), batch_size):
+                # Höchstens zwei Batches pro Worker vorhalten, damit der Speicher begrenzt bleibt
+                if len(pending) >= 2 * max_workers:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                    for future in finished:
+                        del pending[future]
+                future = executor.submit(_upsert_batch, index, batch, max_retries, backoff, span)
+                pending[future] = [vector_id for vector_id, _, _ in batch]
+            finished, _ = wait(pending)
+            collect(finished)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    seconds = time.perf_counter() - start
+    tracer.add("items", upserted)
+    tracer.add("skipped", skipped)
+    tracer.add("failed", len(failed_ids))
+    summary = {
+        "upserted": upserted,
+        "skipped": skipped,
+        "failed_ids": failed_ids,
+        "seconds": seconds,
+        "vectors_per_sec": upserted / seconds if seconds > 0 else float("inf"),
+    }
+    if failed_ids:
+        print(f"{len(failed_ids)} Vektoren konnten nicht hochgeladen werden.")
+    return summary
+
+def upsert_data_to_pinecone(index, df, batch_size=100, max_workers=4, max_retries=3, backoff=0.5, checkpoint_path=None):
     """
     Fügt die verarbeiteten Daten in den Pinecone-Index ein oder aktualisiert sie.
+
+    Die Zeilen werden über `upsert_vectors` gebündelt und parallel hochgeladen.
     
     Args:
     - index (Index): Der Pinecone-Index.
     - df (pd.DataFrame): Das DataFrame mit den Daten und Vektor-Embeddings.
+    - batch_size (int): Anzahl der Vektoren pro Upsert-Aufruf.
+    - max_workers (int): Anzahl gleichzeitig laufender Batches.
+    - max_retries (int): Anzahl der Wiederholungen pro fehlgeschlagenem Batch.
+    - backoff (float): Wartezeit in Sekunden vor der ersten Wiederholung.
+    - checkpoint_path (str): Optionale Datei, in der erledigte Vektoren gespeichert werden.
+    
+    Returns:
+    - summary (dict): Anzahl hochgeladener, übersprungener und fehlgeschlagener Vektoren sowie der Durchsatz.
     """
-    for idx, row in df.iterrows():
-        index.upsert(vectors=[(str(idx), row['content_embedding'], {"headline": row['headline'], "url": row['url']})])
+    return upsert_vectors(index, _iter_vectors(df), batch_size=batch_size, max_workers=max_workers,
+                          max_retries=max_retries, backoff=backoff, checkpoint_path=checkpoint_path)
@@ -0,0 +1,371 @@
+# src/utils/query_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.utils.rag_util import DEFAULT_CHAT_MODEL, article_key, generate_response, retrieve_articles
+from src.utils.tracing import tracer
+
+
+def normalize_query(query):
+    """
+    Lower-cases a query and reduces it to its words, so "Who won?" and "who  won" share a cache entry.
+    """
+    return " ".join(re.findall(r"\w+", str(query).lower()))
+
+
+def article_overlap(cached, current):
+    """
+    Jaccard overlap of two sets of article keys, 1.0 if both are empty.
+    """
+    cached, current = set(cached), set(current)
+    union = cached | current
+    return len(cached & current) / len(union) if union else 1.0
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class QueryCache:
+    """
+    Two-level cache for query results such as retrieved matches or generated answers.
+
+    The first level is an exact lookup on the normalized query text and
+    costs no model call. On a miss the query is embedded once and compared
+    with the embeddings of all cached queries in the same namespace; if the
+    best cosine similarity reaches `similarity_threshold`, that entry is
+    reused. Otherwise the embedding is handed back so the caller can reuse
+    it for retrieval.
+
+    Similar queries can still ask for different things ("men's 100m final"
+    and "women's 100m final" are close in MiniLM space), so results that
+    must not be shared across such queries, like generated answers, should
+    be looked up with `current_articles`: a semantic hit is then only served
+    if the articles of a fresh retrieval overlap the cached entry's articles
+    by at least `min_article_overlap`.
+
+    Entries are evicted least recently used beyond `max_entries` and expire
+    after `ttl` seconds. Every entry remembers the articles its result was
+    built from, so `invalidate_articles` drops exactly the stale results
+    when articles are re-indexed or deleted.
+
+    Args:
+        model: SentenceTransformer-like model with `encode`, or None for the exact level only.
+        similarity_threshold (float): Minimum cosine similarity for a semantic hit.
+        min_article_overlap (float): Minimum Jaccard overlap of the articles for a verified semantic hit.
+        max_entries (int): Maximum number of cached results.
+        ttl (float): Seconds an entry stays valid, None for no expiry.
+        clock (callable): Time source, replaceable in tests.
+    """
+
+    def __init__(self, model=None, similarity_threshold=0.97, min_article_overlap=0.8, max_entries=1024, ttl=3600.0,
+                 clock=time.monotonic):
+        self.model = model
+        self.similarity_threshold = similarity_threshold
+        self.min_article_overlap = min_article_overlap
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._by_article = {}
+        self._namespaces = {}
+        # One embedding row per slot; unused slots have namespace id -1
+        self._embeddings = None
+        self._slot_namespace = np.full(max_entries, -1, dtype=np.int32)
+        self._slot_keys = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.rejected_semantic_hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def embed(self, query):
+        """
+        Embeds a query with the cache's model.
+        """
+        return self.model.encode(query)
+
+    def lookup(self, query, namespace="default", embedding=None, current_articles=None):
+        """
+        Looks a query up, first exactly and then semantically.
+
+        Args:
+            query (str): The user query.
+            namespace (hashable): Separates results that depend on different parameters, e.g. top_k.
+            embedding (np.ndarray): Precomputed query embedding, computed here if needed and None.
+            current_articles (callable): Called with the query embedding when a semantic candidate is
+                found; returns the article keys a fresh retrieval finds for the query. None serves
+                semantic candidates without this check.
+
+        Returns:
+            tuple: (value, info). `value` is None on a miss. `info` holds the
+                `level` ('exact', 'semantic' or None), the `similarity`, the
+                cached `query` on a hit, the article `overlap` of a verified
+                semantic candidate and the query `embedding` if one was computed.
+        """
+        key = (namespace, normalize_query(query))
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                self.saved_ms += entry["compute_ms"]
+                tracer.add("cache_hits")
+                return entry["value"], {"level": "exact", "similarity": 1.0, "query": entry["query"],
+                                        "embedding": embedding, "saved_ms": entry["compute_ms"]}
+
+        if self.model is None:
+            with self._lock:
+                self.misses += 1
+            tracer.add("cache_misses")
+            return None, {"level": None, "similarity": None, "embedding": embedding}
+
+        if embedding is None:
+            embedding = self.embed(query)
+        unit = _unit(embedding)
+        with self._lock:
+            best_key, similarity = self._nearest(unit, namespace)
+            entry = None
+            if best_key is not None and similarity >= self.similarity_threshold:
+                entry = self._entries[best_key]
+
+        overlap = None
+        if entry is not None and current_articles is not None:
+            # Retrieval may be slow, so the candidate is verified outside of the lock
+            overlap = article_overlap(entry["articles"], (str(article) for article in current_articles(embedding)))
+            if overlap < self.min_article_overlap:
+                with self._lock:
+                    self.rejected_semantic_hits += 1
+                entry = None
+
+        with self._lock:
+            if entry is not None and self._entries.get(best_key) is entry:
+                self._entries.move_to_end(best_key)
+                self.semantic_hits += 1
+                self.saved_ms += entry["compute_ms"]
+                tracer.add("cache_hits")
+                return entry["value"], {"level": "semantic", "similarity": similarity, "query": entry["query"],
+                                        "overlap": overlap, "embedding": embedding, "saved_ms": entry["compute_ms"]}
+            self.misses += 1
+        tracer.add("cache_misses")
+        return None, {"level": None, "similarity": similarity, "overlap": overlap, "embedding": embedding}
+
+    def store(self, query, value, articles=(), compute_ms=0.0, namespace="default", embedding=None):
+        """
+        Caches the result of a query.
+
+        Args:
+            query (str): The user query.
+            value: The result to cache.
+            articles (iterable): Keys of the articles the result depends on, see `article_key`.
+            compute_ms (float): What computing the result cost; every hit adds it to `saved_ms`.
+            namespace (hashable): See `lookup`.
+            embedding (np.ndarray): Query embedding for the semantic level, computed here if needed and None.
+        """
+        key = (namespace, normalize_query(query))
+        if embedding is None and self.model is not None:
+            embedding = self.embed(query)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            slot = self._free_slots.pop()
+            now = self._clock()
+            if embedding is not None:
+                unit = _unit(embedding)
+                if self._embeddings is None:
+                    self._embeddings = np.zeros((self.max_entries, len(unit)), dtype=np.float32)
+                self._embeddings[slot] = unit
+                self._slot_namespace[slot] = self._namespaces.setdefault(namespace, len(self._namespaces))
+            self._slot_keys[slot] = key
+            articles = frozenset(str(article) for article in articles)
+            self._entries[key] = {
+                "query": query,
+                "value": value,
+                "slot": slot,
+                "created": now,
+                "compute_ms": compute_ms,
+                "articles": articles,
+            }
+            for article in articles:
+                self._by_article.setdefault(article, set()).add(key)
+
+    def get_or_compute(self, query, compute, namespace="default", articles_of=None, embedding=None,
+                       current_articles=None):
+        """
+        Returns the cached result for a query, computing and storing it on a miss.
+
+        Args:
+            query (str): The user query.
+            compute (callable): Called with the query embedding (or None) on a miss.
+            namespace (hashable): See `lookup`.
+            articles_of (callable): Maps a result to the keys of the articles it depends on.
+            embedding (np.ndarray): Precomputed query embedding.
+            current_articles (callable): Verifies semantic hits, see `lookup`.
+
+        Returns:
+            tuple: (value, info) as returned by `lookup`, with `compute_ms` on a miss.
+        """
+        value, info = self.lookup(query, namespace, embedding=embedding, current_articles=current_articles)
+        if info["level"] is not None:
+            return value, info
+        start = time.perf_counter()
+        value = compute(info["embedding"])
+        info["compute_ms"] = (time.perf_counter() - start) * 1000
+        self.store(query, value, articles_of(value) if articles_of else (), info["compute_ms"], namespace,
+                   embedding=info["embedding"])
+        return value, info
+
+    def invalidate_articles(self, article_keys):
+        """
+        Drops every entry built from one of the given articles.
+
+        Returns:
+            int: Number of removed entries.
+        """
+        with self._lock:
+            keys = set()
+            for article in article_keys:
+                keys |= self._by_article.get(str(article), set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def invalidate(self, namespace=None):
+        """
+        Drops all entries, or only those of one namespace.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if namespace is None or key[0] == namespace]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+
+    def stats(self):
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "lookups": lookups,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "rejected_semantic_hits": self.rejected_semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "exact_hit_rate": self.exact_hits / lookups if lookups else 0.0,
+            "semantic_hit_rate": self.semantic_hits / lookups if lookups else 0.0,
+            "saved_ms": self.saved_ms,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def _nearest(self, unit, namespace):
+        namespace_id = self._namespaces.get(namespace)
+        if namespace_id is None or self._embeddings is None:
+            return None, None
+        similarities = self._embeddings @ unit
+        similarities[self._slot_namespace != namespace_id] = -np.inf
+        slot = int(np.argmax(similarities))
+        if not np.isfinite(similarities[slot]):
+            return None, None
+        return self._slot_keys[slot], float(similarities[slot])
+
+    def _expire(self):
+        if self.ttl is None or not self._entries:
+            return
+        deadline = self._clock() - self.ttl
+        expired = [key for key, entry in self._entries.items() if entry["created"] < deadline]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._slot_namespace[entry["slot"]] = -1
+        self._slot_keys[entry["slot"]] = None
+        self._free_slots.append(entry["slot"])
+        for article in entry["articles"]:
+            keys = self._by_article.get(article)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_article[article]
+
+
+def cached_retrieve_articles(cache, query, model, index, top_k=3, embedding=None):
+    """
+    `retrieve_articles` behind a QueryCache; a miss reuses the embedding computed for the lookup.
+
+    Returns:
+        tuple: (matches, info) with `info` as returned by `QueryCache.lookup`.
+    """
+    return cache.get_or_compute(
+        query,
+        lambda query_embedding: retrieve_articles(query, model, index, top_k=top_k, query_embedding=query_embedding),
+        namespace=("retrieve", top_k),
+        articles_of=lambda matches: {article_key(match) for match in matches},
+        embedding=embedding,
+    )
+
+
+def answer_query(cache, query, model, index, top_k=3, **generation_kwargs):
+    """
+    Retrieves and answers a query with both steps behind the cache.
+
+    An exact hit on the answer level skips embedding, retrieval and
+    generation. A semantic answer hit is only served if a fresh retrieval
+    finds (nearly) the same articles the cached answer was generated from;
+    that retrieval is reused for generation on a miss. The query is embedded
+    at most once.
+
+    Args:
+        cache (QueryCache): The cache, usually one per index.
+        query (str): The user query.
+        model: SentenceTransformer used for retrieval.
+        index: Pinecone index or LocalVectorIndex.
+        top_k (int): Number of retrieved matches.
+        **generation_kwargs: Passed to `generate_response`.
+
+    Returns:
+        tuple: ({'answer', 'matches'}, info) with `info` of the answer level.
+    """
+    namespace = ("answer", top_k, generation_kwargs.get("model", DEFAULT_CHAT_MODEL),
+                 generation_kwargs.get("max_context_tokens", 1500))
+
+    retrieved = {}
+
+    def retrieve(query_embedding):
+        if "matches" not in retrieved:
+            retrieved["matches"] = retrieve_articles(query, model, index, top_k=top_k,
+                                                     query_embedding=query_embedding)
+        return retrieved["matches"]
+
+    def compute(query_embedding):
+        matches = retrieve(query_embedding)
+        return {"answer": generate_response(query, matches, **generation_kwargs), "matches": matches}
+
+    return cache.get_or_compute(
+        query,
+        compute,
+        namespace=namespace,
+        articles_of=lambda result: {article_key(match) for match in result["matches"]},
+        current_articles=lambda query_embedding: {article_key(match) for match in retrieve(query_embedding)},
+    )
@@ -1,25 +1,212 @@
-import openai
+import time
+
+from src.utils.tracing import tracer
+
+DEFAULT_CHAT_MODEL = "gpt-4o-mini"
 
 
 def set_openai_api_key(api_key):
+    # openai wird erst bei Bedarf importiert, damit die Retrieval-Funktionen schnell laden
+    import openai
     openai.api_key = api_key
 
-def retrieve_articles(query, model, index, top_k=3):
-    query_embedding = model.encode(query).tolist()
-    result = index.query(query_embedding, top_k=top_k, include_metadata=True)
+@tracer.traced("retrieve")
+def retrieve_articles(query, model, index, top_k=3, query_embedding=None):
+    # index kann ein Pinecone-Index oder ein LocalVectorIndex sein, beide haben dieselbe query-Signatur;
+    # ein bereits berechnetes Embedding (z. B. aus dem Query-Cache) wird wiederverwendet
+    tracer.set(top_k=top_k, index=type(index).__name__)
+    if query_embedding is None:
+        with tracer.span("retrieve.embed"):
+            query_embedding = model.encode(query)
+    result = index.query(vector=query_embedding.tolist(), top_k=top_k, include_metadata=True)
+    tracer.add("items", len(result['matches']))
     return result['matches']
 
-def generate_response(query, articles):
-    # Kombinieren der abgerufenen Artikel
-    context = "\n\n".join([f"{article['metadata']['headline']}: {article['metadata']['url']}" for article in articles])
-    prompt = f"Hier ist eine Zusammenfassung der relevantesten Informationen:\n\n{context}\n\nFrage: {query}\nAntwort:"
-    
-    response = openai.Completion.create(
-        engine="text-davinci-003",  # GPT-4 Engine
-        prompt=prompt,
-        max_tokens=150,
-        n=1,
-        stop=None,
-        temperature=0.7,
-    )
-    return response.choices[0].text.strip()
\ No newline at end of file
+@tracer.traced("retrieve.bm25")
+def retrieve_articles_bm25(query, bm25_index, top_k=3):
+    # Lexische Suche über den invertierten Index, trifft exakte Namen und Begriffe
+    matches = bm25_index.search(query, top_k=top_k)['matches']
+    tracer.add("items", len(matches))
+    return matches
+
+def reciprocal_rank_fusion(result_lists, top_k=3, k=60):
+    # Reciprocal Rank Fusion: jeder Treffer bekommt 1 / (k + Rang) pro Ergebnisliste,
+    # so lassen sich Scores aus unterschiedlichen Verfahren ohne Normalisierung kombinieren;
+    # taucht eine ID in einer Liste mehrfach auf, zählt nur ihr bester Rang
+    fused = {}
+    for matches in result_lists:
+        seen = set()
+        for rank, match in enumerate(matches, start=1):
+            if match['id'] in seen:
+                continue
+            seen.add(match['id'])
+            entry = fused.setdefault(match['id'], {'id': match['id'], 'score': 0.0, 'metadata': match.get('metadata', {})})
+            entry['score'] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda m: m['score'], reverse=True)[:top_k]
+
+@tracer.traced("retrieve.hybrid")
+def retrieve_articles_hybrid(query, model, index, bm25_index, top_k=3, candidates=20, k=60):
+    # Dichte und lexische Kandidaten abrufen und per RRF zusammenführen
+    dense = retrieve_articles(query, model, index, top_k=candidates)
+    sparse = retrieve_articles_bm25(query, bm25_index, top_k=candidates)
+    matches = reciprocal_rank_fusion([dense, sparse], top_k=top_k, k=k)
+    tracer.add("items", len(matches))
+    return matches
+
+def _encoding_for_model(model):
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Unbekanntes Modell (z. B. hinter einem kompatiblen Server): Kodierung der aktuellen Chat-Modelle verwenden
+        return tiktoken.get_encoding("o200k_base")
+
+def count_tokens(text, encoding):
+    return len(encoding.encode_ordinary(text))
+
+def article_key(match):
+    metadata = match.get('metadata') or {}
+    if metadata.get('article_id') is not None:
+        return str(metadata['article_id'])
+    # Chunk-IDs haben die Form "<article_id>-<hash>", Artikel-Vektoren nur "<article_id>"
+    return str(match['id']).rsplit('-', 1)[0]
+
+def build_context(matches, encoding, max_tokens=1500):
+    # Treffer nach Artikel gruppieren (Reihenfolge des besten Treffers), Überschrift und URL nur einmal,
+    # identische Chunk-Texte (z. B. aus dichter und lexikalischer Suche) nur einmal
+    articles = {}
+    duplicates = 0
+    for match in matches:
+        metadata = match.get('metadata') or {}
+        article = articles.setdefault(article_key(match), {
+            'header': f"{metadata.get('headline', '')}: {metadata.get('url', '')}",
+            'texts': [],
+            'ids': [],
+        })
+        text = (metadata.get('text') or '').strip()
+        if not text:
+            continue
+        if text in article['texts']:
+            duplicates += 1
+        else:
+            article['texts'].append(text)
+            article['ids'].append(match['id'])
+
+    # Kontext blockweise bis zum Token-Budget füllen, der letzte Chunk wird auf das Restbudget gekürzt;
+    # `sources` hält die IDs der Chunks fest, die (ganz oder angeschnitten) im Kontext gelandet sind
+    parts = []
+    sources = []
+    used = 0
+    articles_used = 0
+    chunks = 0
+    truncated = False
+    for article in articles.values():
+        for position, piece in enumerate([article['header']] + article['texts']):
+            piece = ("\n\n" if position == 0 else "\n") + piece if parts else piece
+            tokens = encoding.encode_ordinary(piece)
+            if used + len(tokens) > max_tokens:
+                # Ein Artikel-Kopf ohne Text lohnt sich nicht, Chunks werden angeschnitten;
+                # bleibt vom Chunk nichts (oder nur der Trenner) übrig, fehlt er auch in `sources`
+                head = encoding.decode(tokens[:max_tokens - used]) if position > 0 else ''
+                if head.strip():
+                    parts.append(head)
+                    sources.append(article['ids'][position - 1])
+                    chunks += 1
+                truncated = True
+                break
+            parts.append(piece)
+            if position > 0:
+                sources.append(article['ids'][position - 1])
+            used += len(tokens)
+            articles_used += position == 0
+            chunks += position > 0
+        if truncated:
+            break
+
+    # Die Summe der Einzelteile kann an den Nahtstellen minimal abweichen, daher das Ergebnis exakt nachzählen
+    context = "".join(parts)
+    tokens = encoding.encode_ordinary(context)
+    while len(tokens) > max_tokens:
+        context = encoding.decode(tokens[:max_tokens])
+        tokens = encoding.encode_ordinary(context)
+    info = {
+        'context_tokens': len(tokens),
+        'articles': articles_used,
+        'chunks': chunks,
+        'duplicates': duplicates,
+        'truncated': truncated,
+        'sources': sources,
+    }
+    return context, info
+
+def build_messages(query, context):
+    return [
+        {"role": "system", "content": "Beantworte die Frage nur mit den Informationen aus dem Kontext. "
+                                      "Wenn der Kontext die Antwort nicht enthält, sag das."},
+        {"role": "user", "content": f"Hier ist eine Zusammenfassung der relevantesten Informationen:\n\n{context}"
+                                    f"\n\nFrage: {query}\nAntwort:"},
+    ]
+
+def stream_response(query, articles, client=None, model=DEFAULT_CHAT_MODEL, max_context_tokens=1500,
+                    max_tokens=300, temperature=0.7, encoding=None, metrics=None):
+    # Liefert die Antwort Stück für Stück, sobald das Modell sie erzeugt; `metrics` wird mit
+    # Time-to-first-Token, Gesamtlatenz und Token-Zahlen gefüllt
+    metrics = {} if metrics is None else metrics
+    # Der Span wird nicht aktuell gesetzt, da der Generator abwechselnd mit dem Aufrufer läuft
+    span = tracer.start_span("generate", model=model, max_context_tokens=max_context_tokens)
+    start = None
+    answer = []
+    try:
+        encoding = encoding or _encoding_for_model(model)
+        context, info = build_context(articles, encoding, max_context_tokens)
+        messages = build_messages(query, context)
+        metrics.update(info)
+        metrics['prompt_tokens'] = sum(count_tokens(message['content'], encoding) for message in messages)
+        metrics['ttft_ms'] = None
+
+        # Ohne eigenen Client den modulweiten verwenden, der den Schlüssel aus set_openai_api_key nutzt
+        if client is None:
+            import openai
+            client = openai
+        start = time.perf_counter()
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+        )
+        for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            if metrics['ttft_ms'] is None:
+                metrics['ttft_ms'] = (time.perf_counter() - start) * 1000
+            answer.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+    except Exception as e:
+        span.fail(e)
+        raise
+    finally:
+        if start is not None:
+            metrics['total_ms'] = (time.perf_counter() - start) * 1000
+            metrics['completion_tokens'] = count_tokens("".join(answer), encoding)
+        span.set(**{key: metrics[key] for key in ('ttft_ms', 'total_ms', 'context_tokens', 'articles', 'chunks',
+                                                  'duplicates', 'truncated', 'sources') if key in metrics})
+        span.add("items", len(articles))
+        span.add("prompt_tokens", metrics.get('prompt_tokens', 0))
+        span.add("completion_tokens", metrics.get('completion_tokens', 0))
+        span.end()
+
+def generate_response(query, articles, **kwargs):
+    # Blockierende Variante: sammelt den Stream, Parameter wie bei stream_response
+    return "".join(stream_response(query, articles, **kwargs)).strip()
+
+def attribute_answer(answer, matches):
+    # Einfache Erklärung, welche Chunks die Antwort getragen haben: Anteil der Inhaltswörter der Antwort,
+    # die im jeweiligen Chunk vorkommen (ohne Stoppwörter, wie bei BM25)
+    from src.utils.bm25_index import tokenize
+    answer_terms = set(tokenize(answer))
+    if not answer_terms:
+        return [0.0] * len(matches)
+    return [len(answer_terms & set(tokenize((match.get('metadata') or {}).get('text') or ''))) / len(answer_terms)
+            for match in matches]
@@ -0,0 +1,489 @@
+# src/utils/tracing.py
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of the latency histogram buckets in seconds, the defaults of the Prometheus clients
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """
+    One timed call of a pipeline stage.
+
+    Attributes describe the call (top_k, model, ...); counters add up what
+    the stage processed, e.g. items, bytes, prompt_tokens, cache_hits or
+    retries. Counters may be incremented from worker threads.
+
+    Args:
+        tracer (Tracer): The tracer the span reports to when it ends.
+        name (str): Stage name, e.g. 'retrieve' or 'chunk.recursive'.
+        parent (Span): The enclosing span, None for the root of a trace.
+        attributes (dict): Initial attributes.
+    """
+
+    def __init__(self, tracer, name, parent=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.attributes = dict(attributes or {})
+        self.counters = {}
+        self.status = "ok"
+        self.error = None
+        self.start_time = time.time()
+        self.duration_ms = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def add(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def fail(self, error):
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+        self.add("errors")
+
+    def end(self):
+        """
+        Stops the clock and hands the span to its tracer; later calls do nothing.
+        """
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self._start) * 1000
+            self.tracer._finish(self)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "depth": self.depth,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "counters": dict(self.counters),
+        }
+
+
+def text_bytes(text):
+    """
+    Returns the UTF-8 size of a text, without encoding it when it is pure ASCII.
+    """
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def _trace_record(root, spans):
+    return {
+        "trace_id": root.trace_id,
+        "name": root.name,
+        "start_time": root.start_time,
+        "duration_ms": root.duration_ms,
+        "spans": [span.to_dict() for span in sorted(spans, key=lambda span: (span.start_time, span.span_id))],
+    }
+
+
+def _metric_name(text):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", text)
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Counters and latency histograms per stage, rendered in the Prometheus text format.
+
+    Every finished span increments `<namespace>_stage_calls_total`, adds its
+    duration to the `<namespace>_stage_seconds` histogram and each of its
+    counters to `<namespace>_stage_<counter>_total`, all labelled with the stage.
+
+    Args:
+        namespace (str): Prefix of all metric names.
+        buckets (tuple): Upper bounds of the latency buckets in seconds.
+        window (int): Number of recent durations kept per stage for percentiles.
+    """
+
+    def __init__(self, namespace="rag", buckets=LATENCY_BUCKETS, window=1000):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self.window = window
+        self._counters = {}
+        self._histograms = {}
+        self._recent = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (_metric_name(name), tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.setdefault(stage, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["buckets"][position] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+            self._recent.setdefault(stage, deque(maxlen=self.window)).append(seconds * 1000)
+
+    def record_span(self, span):
+        self.inc("stage_calls_total", stage=span.name, status=span.status)
+        self.observe(span.name, span.duration_ms / 1000)
+        for counter, amount in list(span.counters.items()):
+            self.inc(f"stage_{counter}_total", amount, stage=span.name)
+
+    def stage_summary(self):
+        """
+        Returns one row per stage with calls, errors, mean/p50/p95 latency and the counter totals.
+        """
+        with self._lock:
+            rows = {}
+            for stage, histogram in self._histograms.items():
+                recent = sorted(self._recent[stage])
+                rows[stage] = {
+                    "stage": stage,
+                    "calls": histogram["count"],
+                    "mean_ms": histogram["sum"] * 1000 / histogram["count"],
+                    "p50_ms": recent[len(recent) // 2],
+                    "p95_ms": recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+                }
+            for (name, labels), value in self._counters.items():
+                labels = dict(labels)
+                row = rows.get(labels.get("stage"))
+                if row is None or name == "stage_calls_total":
+                    continue
+                row[name[len("stage_"):-len("_total")]] = value
+        return sorted(rows.values(), key=lambda row: row["stage"])
+
+    def render(self):
+        """
+        Renders all metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        prefix = _metric_name(self.namespace)
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((stage, dict(h, buckets=list(h["buckets"]))) for stage, h in self._histograms.items())
+
+        if histograms:
+            name = f"{prefix}_stage_seconds"
+            lines += [f"# HELP {name} Latency of pipeline stages.", f"# TYPE {name} histogram"]
+            for stage, histogram in histograms:
+                stage = _label_value(stage)
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram["count"]}')
+
+        previous = None
+        for (metric, labels), value in counters:
+            name = f"{prefix}_{metric}"
+            if metric != previous:
+                lines += [f"# HELP {name} Total {metric[len('stage_'):-len('_total')]} of pipeline stages.",
+                          f"# TYPE {name} counter"]
+                previous = metric
+            label_text = ",".join(f'{key}="{_label_value(value)}"' for key, value in labels)
+            lines.append(f"{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._recent.clear()
+
+
+class Tracer:
+    """
+    Collects spans of the pipeline stages and aggregates them into metrics.
+
+    Spans opened with `span` nest through a context variable, so a query
+    that retrieves and generates produces one trace with a child span per
+    stage. Worker threads start without a current span; `attach` makes a
+    span current there. The most recent `max_spans` finished spans are kept
+    in memory for `trace`/`traces`; with `export_path` every finished trace
+    is also appended to that file as one JSON line. The spans of a running
+    trace are collected as they end, and finished traces are buffered and
+    written every `flush_every` traces or `flush_interval` seconds and at exit.
+    Spans that end after the root of their trace are not exported.
+
+    Args:
+        max_spans (int): Number of finished spans kept in memory.
+        export_path (str): Optional JSON lines file for finished traces.
+        namespace (str): Prefix of the metric names.
+        flush_every (int): Number of finished traces buffered before they are written.
+        flush_interval (float): Seconds after which buffered traces are written anyway.
+    """
+
+    def __init__(self, max_spans=10000, export_path=None, namespace="rag", flush_every=100, flush_interval=5.0):
+        self.metrics = Metrics(namespace)
+        self.export_path = export_path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        # Finished spans of the running traces and the buffered JSON lines of finished ones
+        self._open_traces = {}
+        self._export_lines = []
+        self._last_flush = time.monotonic()
+        if export_path:
+            atexit.register(self.flush)
+
+    def start_span(self, name, parent=None, **attributes):
+        """
+        Starts a span without making it current; it must be ended with `Span.end`.
+
+        Used for generators, whose body runs interleaved with the caller.
+        """
+        span = Span(self, name, parent if parent is not None else _current_span.get(), attributes)
+        if span.parent_id is None and self.export_path:
+            with self._lock:
+                self._open_traces[span.trace_id] = []
+        return span
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Times the enclosed block as a span, current for the block; exceptions mark it as failed.
+        """
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.fail(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def traced(self, name=None):
+        """
+        Decorator that runs every call of a function in a span named `name` (default: the function name).
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def attach(self, span):
+        """
+        Makes `span` current for the enclosed block, e.g. inside a worker thread.
+        """
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    def current_span(self):
+        return _current_span.get()
+
+    def add(self, counter, amount=1):
+        """
+        Increments a counter of the current span; does nothing outside of a span.
+        """
+        span = _current_span.get()
+        if span is not None:
+            span.add(counter, amount)
+
+    def set(self, **attributes):
+        """
+        Sets attributes of the current span; does nothing outside of a span.
+        """
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def _finish(self, span):
+        self.metrics.record_span(span)
+        with self._lock:
+            self._spans.append(span)
+            spans = self._open_traces.get(span.trace_id)
+            if spans is None:
+                return
+            spans.append(span)
+            if span.parent_id is not None:
+                return
+            del self._open_traces[span.trace_id]
+            self._export_lines.append(json.dumps(_trace_record(span, spans), default=str))
+            if (len(self._export_lines) >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def flush(self):
+        """
+        Writes the buffered finished traces to `export_path`.
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        lines, self._export_lines = self._export_lines, []
+        self._last_flush = time.monotonic()
+        if lines:
+            _append_lines(self.export_path, lines)
+
+    def trace(self, trace_id):
+        """
+        Returns the finished spans of one trace in start order.
+        """
+        with self._lock:
+            spans = [span for span in self._spans if span.trace_id == trace_id]
+        return sorted(spans, key=lambda span: (span.start_time, span.span_id))
+
+    def traces(self, name=None, limit=20):
+        """
+        Returns the most recent root spans, optionally only those named `name`.
+        """
+        with self._lock:
+            roots = [span for span in self._spans if span.parent_id is None and (name is None or span.name == name)]
+        return roots[::-1][:limit]
+
+    def export(self, path, trace_id=None):
+        """
+        Appends finished traces to a JSON lines file, one line per trace.
+
+        Args:
+            path (str): Output file, created if needed.
+            trace_id (int): Only export this trace, otherwise all traces in memory.
+        """
+        with self._lock:
+            spans = list(self._spans)
+        by_trace = {}
+        for span in spans:
+            if trace_id is None or span.trace_id == trace_id:
+                by_trace.setdefault(span.trace_id, []).append(span)
+        roots = [span for span in spans if span.parent_id is None and span.trace_id in by_trace]
+        _append_lines(path, [json.dumps(_trace_record(root, by_trace[root.trace_id]), default=str) for root in roots])
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._open_traces.clear()
+            self._export_lines.clear()
+        self.metrics.reset()
+
+
+def _append_lines(path, lines):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(line + "\n" for line in lines)
+
+
+# Process-wide tracer used by the pipeline modules; RAG_TRACE_FILE enables the JSON lines export
+tracer = Tracer(export_path=os.getenv("RAG_TRACE_FILE"))
+
+
+def write_prometheus(path, metrics=None):
+    """
+    Writes the metrics atomically in the Prometheus text format, e.g. for node_exporter's textfile collector.
+    """
+    metrics = metrics or tracer.metrics
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(metrics.render())
+    os.replace(tmp_path, path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Serves GET /metrics in the Prometheus text format and GET /traces as JSON.
+    """
+
+    def __init__(self, *args, tracer=None, **kwargs):
+        self.tracer = tracer
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/metrics":
+            body = self.tracer.metrics.render().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/traces":
+            body = json.dumps([[span.to_dict() for span in self.tracer.trace(root.trace_id)]
+                               for root in self.tracer.traces()], default=str).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """
+    Prometheus scrape endpoint for a tracer, served from a background thread.
+
+    Usable as a context manager, or started once with `start` for the
+    lifetime of the process (e.g. the Streamlit app).
+
+    Args:
+        tracer (Tracer): The tracer to expose, defaults to the process-wide one.
+        port (int): Port to listen on, 0 picks a free port.
+        host (str): Interface to listen on.
+    """
+
+    def __init__(self, tracer=tracer, port=0, host="127.0.0.1"):
+        self.tracer = tracer
+        handler = partial(MetricsHandler, tracer=self.tracer)
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,325 @@
+# src/utils/vector_store.py
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class VectorStore(ABC):
+    """
+    Interface shared by all vector store backends.
+
+    The method names and return shapes follow the Pinecone `Index` API, so a
+    Pinecone index returned by `initialize_pinecone` can be used wherever a
+    VectorStore is expected, and vice versa.
+    """
+
+    @abstractmethod
+    def upsert(self, vectors, namespace=None):
+        """Inserts or replaces vectors given as (id, values, metadata) tuples."""
+
+    @abstractmethod
+    def query(self, vector, top_k=10, include_metadata=False, namespace=None, **kwargs):
+        """Returns {"matches": [{"id", "score", "metadata"}, ...]} for the `top_k` most similar vectors."""
+
+    @abstractmethod
+    def delete(self, ids, namespace=None):
+        """Removes vectors by id."""
+
+    @abstractmethod
+    def describe_index_stats(self):
+        """Returns at least `total_vector_count` and `dimension`."""
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _top_k(scores, top_k):
+    if top_k >= len(scores):
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, top_k)[:top_k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class LocalVectorIndex(VectorStore):
+    """
+    In-process cosine similarity index over a float32 matrix.
+
+    Vectors are stored L2-normalized, so a query is a single matrix-vector
+    product followed by a partial sort. A saved index is reopened as a
+    read-only memory map and is only copied into RAM on the first write.
+    For larger corpora `build_ivf` adds an inverted-file index (k-means
+    clusters) so that a query only scores the vectors of the closest clusters.
+
+    Args:
+        dimension (int): Dimension of the stored vectors.
+    """
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.ids = []
+        self.metadata = []
+        self._positions = {}
+        self._matrix = np.empty((0, dimension), dtype=np.float32)
+        self._size = 0
+        self.centroids = None
+        self.assignments = None
+        self.n_probe = None
+
+    @classmethod
+    def from_embeddings(cls, ids, embeddings, metadata=None):
+        """
+        Builds an index from a list of ids and an embedding matrix.
+
+        Args:
+            ids (list): Vector ids, one per row.
+            embeddings (np.ndarray): Matrix of shape (len(ids), dimension).
+            metadata (list): Optional metadata dicts, one per row.
+
+        Returns:
+            LocalVectorIndex: The filled index.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        index = cls(embeddings.shape[1])
+        metadata = metadata if metadata is not None else [{}] * len(ids)
+        index.upsert(list(zip(ids, embeddings, metadata)))
+        return index
+
+    @property
+    def matrix(self):
+        return self._matrix[:self._size]
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, n_new):
+        needed = self._size + n_new
+        if needed <= self._matrix.shape[0] and self._matrix.flags.writeable:
+            return
+        capacity = max(needed, 2 * self._matrix.shape[0], 1024)
+        grown = np.empty((capacity, self.dimension), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def upsert(self, vectors, namespace=None):
+        """
+        Inserts or replaces vectors given as (id, values, metadata) tuples.
+        """
+        new_rows = []
+        # `vectors` may be a generator, so it is counted while iterating
+        count = 0
+        for vector_id, values, metadata in vectors:
+            count += 1
+            position = self._positions.get(vector_id)
+            if position is None:
+                position = self._size + len(new_rows)
+                self._positions[vector_id] = position
+                self.ids.append(vector_id)
+                self.metadata.append(metadata)
+                new_rows.append(values)
+            elif position >= self._size:
+                # Id repeated within the same call
+                new_rows[position - self._size] = values
+                self.metadata[position] = metadata
+            else:
+                self._reserve(0)
+                self._matrix[position] = _normalize(np.asarray(values, dtype=np.float32))
+                self.metadata[position] = metadata
+                if self.centroids is not None:
+                    self.assignments[position] = self._assign(self._matrix[position:position + 1])[0]
+        if new_rows:
+            rows = _normalize(np.asarray(new_rows, dtype=np.float32).reshape(len(new_rows), self.dimension))
+            self._reserve(len(rows))
+            self._matrix[self._size:self._size + len(rows)] = rows
+            self._size += len(rows)
+            if self.centroids is not None:
+                self.assignments = np.concatenate([self.assignments, self._assign(rows)])
+        return {"upserted_count": count}
+
+    def delete(self, ids, namespace=None):
+        """
+        Removes vectors by id. The remaining rows are compacted in place.
+        """
+        drop = {self._positions[i] for i in ids if i in self._positions}
+        if not drop:
+            return {}
+        keep = np.array([p for p in range(self._size) if p not in drop], dtype=np.int64)
+        self._matrix = np.ascontiguousarray(self.matrix[keep])
+        self.ids = [self.ids[p] for p in keep]
+        self.metadata = [self.metadata[p] for p in keep]
+        self._positions = {vector_id: p for p, vector_id in enumerate(self.ids)}
+        self._size = len(keep)
+        if self.centroids is not None:
+            self.assignments = self.assignments[keep]
+        return {}
+
+    def describe_index_stats(self):
+        return {"total_vector_count": self._size, "dimension": self.dimension}
+
+    def memory_bytes(self):
+        """
+        RAM used by the vectors and the IVF structures; 0 for vectors still memory-mapped from disk.
+        """
+        size = 0 if isinstance(self._matrix, np.memmap) else self.matrix.nbytes
+        if self.centroids is not None:
+            size += self.centroids.nbytes + self.assignments.nbytes
+        return size
+
+    def build_ivf(self, n_lists=None, n_probe=8, iterations=10, seed=0):
+        """
+        Clusters the stored vectors with spherical k-means for approximate search.
+
+        Args:
+            n_lists (int): Number of clusters, defaults to sqrt(number of vectors).
+            n_probe (int): Number of closest clusters scored per query.
+            iterations (int): Number of k-means iterations.
+            seed (int): Seed for the initial centroid choice.
+        """
+        data = self.matrix
+        n_lists = n_lists or max(1, int(np.sqrt(len(data))))
+        n_lists = min(n_lists, len(data))
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(len(data), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            for cluster in range(n_lists):
+                members = data[assignments == cluster]
+                if len(members):
+                    centroids[cluster] = members.sum(axis=0)
+            centroids = _normalize(centroids)
+        self.centroids = centroids
+        self.assignments = self._assign(data)
+        self.n_probe = n_probe
+
+    def drop_ivf(self):
+        """Removes the approximate index so that queries are exact again."""
+        self.centroids = None
+        self.assignments = None
+        self.n_probe = None
+
+    def _assign(self, rows):
+        return np.argmax(rows @ self.centroids.T, axis=1)
+
+    def query(self, vector, top_k=10, include_metadata=False, namespace=None, exact=False, **kwargs):
+        """
+        Returns the `top_k` most similar vectors in the Pinecone response format.
+
+        Args:
+            vector (list): The query vector.
+            top_k (int): Number of matches to return.
+            include_metadata (bool): Whether to include the metadata of each match.
+            exact (bool): Ignore the IVF index and score every vector.
+
+        Returns:
+            dict: {"matches": [{"id", "score", "metadata"}, ...]}
+        """
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        if self._size == 0:
+            return {"matches": []}
+        if self.centroids is None or exact:
+            candidates = None
+            scores = self.matrix @ query
+        else:
+            probe = _top_k(self.centroids @ query, min(self.n_probe, len(self.centroids)))
+            candidates = np.flatnonzero(np.isin(self.assignments, probe))
+            scores = self.matrix[candidates] @ query
+        top = _top_k(scores, top_k)
+        rows = top if candidates is None else candidates[top]
+        matches = []
+        for row, score in zip(rows, scores[top]):
+            match = {"id": self.ids[row], "score": float(score)}
+            if include_metadata:
+                match["metadata"] = self.metadata[row]
+            matches.append(match)
+        return {"matches": matches}
+
+    def save(self, path):
+        """
+        Writes the index to a directory: `vectors.f32` (raw float32 matrix) and `index.json`.
+
+        Files are written next to their target and renamed into place, so an
+        index loaded from `path` (and still memory-mapped from it) can be saved
+        back to the same directory.
+        """
+        os.makedirs(path, exist_ok=True)
+        if self._size:
+            vectors_path = os.path.join(path, "vectors.f32")
+            mapped = np.memmap(vectors_path + ".tmp", dtype=np.float32, mode="w+", shape=(self._size, self.dimension))
+            mapped[:] = self.matrix
+            mapped.flush()
+            del mapped
+            os.replace(vectors_path + ".tmp", vectors_path)
+        index_path = os.path.join(path, "index.json")
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"dimension": self.dimension, "ids": self.ids, "metadata": self.metadata}, f)
+        os.replace(index_path + ".tmp", index_path)
+        centroids_path = os.path.join(path, "centroids.npy")
+        if self.centroids is not None:
+            np.save(centroids_path, self.centroids)
+        elif os.path.exists(centroids_path):
+            # Otherwise load would restore the IVF index of an earlier save
+            os.remove(centroids_path)
+
+    @classmethod
+    def load(cls, path, n_probe=8):
+        """
+        Opens an index written by `save`; the vectors are memory-mapped read-only.
+        """
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data["dimension"])
+        index.ids = data["ids"]
+        index.metadata = data["metadata"]
+        index._positions = {vector_id: p for p, vector_id in enumerate(index.ids)}
+        index._size = len(index.ids)
+        if index._size:
+            index._matrix = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r",
+                                      shape=(index._size, index.dimension))
+        centroids_path = os.path.join(path, "centroids.npy")
+        if os.path.exists(centroids_path):
+            index.centroids = np.load(centroids_path)
+            index.assignments = index._assign(index.matrix)
+            index.n_probe = n_probe
+        return index
+
+
+def evaluate_backends(query_vectors, backends, reference, top_k=5):
+    """
+    Compares query latency and recall@k of several vector store backends.
+
+    Args:
+        query_vectors (np.ndarray): Matrix of query embeddings.
+        backends (dict): Mapping of display name to VectorStore (or Pinecone index).
+        reference (str): Name of the backend whose results count as ground truth.
+        top_k (int): Number of matches per query.
+
+    Returns:
+        list: One dict per backend with mean/p95 latency in ms and recall@k.
+    """
+    results = {}
+    for name, backend in backends.items():
+        latencies = []
+        matches = []
+        for vector in query_vectors:
+            start = time.perf_counter()
+            response = backend.query(vector=np.asarray(vector, dtype=np.float32).tolist(), top_k=top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            matches.append([m["id"] for m in response["matches"]])
+        results[name] = (latencies, matches)
+
+    truth = results[reference][1]
+    rows = []
+    for name, (latencies, matches) in results.items():
+        hits = sum(len(set(found) & set(expected)) for found, expected in zip(matches, truth))
+        total = sum(len(expected) for expected in truth)
+        rows.append({
+            "backend": name,
+            "mean_ms": float(np.mean(latencies)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            f"recall@{top_k}": hits / total if total else 1.0,
+        })
+    return rows
@@ -0,0 +1,362 @@
+# src/utils/warm_server.py
+import argparse
+import os
+import secrets
+import stat
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+DEFAULT_ADDRESS = ("127.0.0.1", 6123)
+
+
+def parse_address(text):
+    """
+    Parses "host:port" (or just a port) into a Listener address.
+    """
+    host, _, port = str(text).rpartition(":")
+    return host or DEFAULT_ADDRESS[0], int(port)
+
+
+def default_address():
+    """
+    The address of the warm server, taken from the RAG_WARM_SERVER environment variable if set.
+    """
+    text = os.getenv("RAG_WARM_SERVER")
+    return parse_address(text) if text else DEFAULT_ADDRESS
+
+
+def key_file():
+    """
+    Path of the key shared by the warm server and its clients, taken from RAG_WARM_SERVER_KEY_FILE if set.
+    """
+    default = os.path.join(os.path.expanduser("~"), ".cache", "rag-warm-server.key")
+    return os.getenv("RAG_WARM_SERVER_KEY_FILE", default)
+
+
+def _authkey(create=False):
+    """
+    Returns the key that authenticates connections to the warm server.
+
+    Messages are unpickled, so whoever knows the key can run code in the
+    server process. RAG_WARM_SERVER_KEY is used if set; otherwise the server
+    creates a random key in `key_file()` that only the current user can read,
+    and clients read it from there.
+
+    Args:
+        create (bool): Create the key file if it does not exist (server side).
+
+    Returns:
+        bytes: The key, or None if there is none (client side).
+    """
+    if os.getenv("RAG_WARM_SERVER_KEY"):
+        return os.getenv("RAG_WARM_SERVER_KEY").encode("utf-8")
+    path = key_file()
+    if create and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+    if not os.path.exists(path):
+        return None
+    if os.stat(path).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise PermissionError(f"{path} must only be accessible by its owner (chmod 600)")
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip().encode("utf-8")
+
+
+def _response_dict(response):
+    # Pinecone returns QueryResponse objects, which are reduced to plain, picklable matches
+    return {"matches": [
+        {"id": match["id"], "score": float(match["score"]), "metadata": match.get("metadata")}
+        for match in response["matches"]
+    ]}
+
+
+class WarmServer:
+    """
+    Long-lived process that keeps the embedding model and index clients loaded.
+
+    Streamlit re-runs the app script on every interaction and a restart of
+    the app pays for importing torch and loading the model again. The warm
+    server pays this once; the app connects to it over a local socket and
+    only imports the standard library for it. Every client connection is
+    served by its own thread.
+
+    Requests are tuples of an operation and its arguments:
+    - ("ping",): model name, embedding dimension and uptime.
+    - ("encode", texts, batch_size): embeddings as a float32 array.
+    - ("query", index, vector, top_k, include_metadata): matches like a Pinecone query.
+    - ("stats",): number of requests and time spent per operation.
+
+    Indexes are named "pinecone:<index name>" (needs PINECONE_API_KEY) or
+    "local:<path>" for a saved LocalVectorIndex. Pinecone indexes are opened
+    on first use; local indexes only if they were preloaded, so clients
+    cannot make the server read arbitrary files.
+
+    Connections are authenticated with the key from `_authkey`.
+
+    Args:
+        model_name (str): SentenceTransformer model name, or 'hashing' for the offline stand-in.
+        address (tuple): (host, port) to listen on.
+        variant (str): Model variant, see `load_model`.
+        preload_indexes (iterable): Index names to open at startup.
+    """
+
+    def __init__(self, model_name='all-MiniLM-L6-v2', address=DEFAULT_ADDRESS, variant="fp32", preload_indexes=()):
+        self.model_name = model_name
+        self.address = address
+        self.variant = variant
+        self.preload_indexes = list(preload_indexes)
+        self.model = None
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.started = time.time()
+        self.load_seconds = None
+
+    def load(self):
+        """
+        Loads the model and the preloaded indexes; called by `serve_forever`.
+        """
+        from src.utils.embedding_pool import load_model
+
+        start = time.perf_counter()
+        self.model = load_model(self.model_name, self.variant)
+        # The first encode call initializes lazily created buffers, so it is not left to the first user
+        self.model.encode(["warm up"])
+        for name in self.preload_indexes:
+            self.index(name)
+        self.load_seconds = time.perf_counter() - start
+
+    def index(self, name, remote=False):
+        with self._lock:
+            if name not in self._indexes:
+                kind, _, target = name.partition(":")
+                if remote and kind == "local":
+                    raise ValueError(f"Local index {target} was not preloaded with --index")
+                if kind == "pinecone":
+                    from src.utils.pinecone_util import initialize_pinecone
+                    api_key = os.getenv('PINECONE_API_KEY')
+                    if not api_key:
+                        raise ValueError("PINECONE_API_KEY is not set on the warm server")
+                    self._indexes[name] = initialize_pinecone(api_key, "us-east-1", target)
+                elif kind == "local":
+                    from src.utils.vector_store import LocalVectorIndex
+                    self._indexes[name] = LocalVectorIndex.load(target)
+                else:
+                    raise ValueError(f"Unknown index: {name}, expected 'pinecone:<name>' or 'local:<path>'")
+            return self._indexes[name]
+
+    def handle(self, request):
+        operation, *args = request
+        if operation == "ping":
+            return {
+                "model": self.model_name,
+                "variant": self.variant,
+                "dimension": self.model.get_sentence_embedding_dimension(),
+                "uptime": time.time() - self.started,
+                "load_seconds": self.load_seconds,
+            }
+        if operation == "encode":
+            texts, batch_size = args
+            return np.asarray(self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                                show_progress_bar=False), dtype=np.float32)
+        if operation == "query":
+            name, vector, top_k, include_metadata = args
+            vector = np.asarray(vector, dtype=np.float32).tolist()
+            return _response_dict(self.index(name, remote=True).query(vector=vector, top_k=top_k,
+                                                                      include_metadata=include_metadata))
+        if operation == "stats":
+            with self._lock:
+                return {op: dict(counts) for op, counts in self._stats.items()}
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def _record(self, operation, seconds):
+        with self._lock:
+            counts = self._stats.setdefault(operation, {"requests": 0, "seconds": 0.0})
+            counts["requests"] += 1
+            counts["seconds"] += seconds
+
+    def _serve_connection(self, connection):
+        with connection:
+            while True:
+                try:
+                    request = connection.recv()
+                except (EOFError, OSError):
+                    return
+                start = time.perf_counter()
+                try:
+                    response = ("ok", self.handle(request))
+                except Exception as e:
+                    response = ("error", f"{type(e).__name__}: {e}")
+                self._record(request[0] if isinstance(request, tuple) and request else "invalid",
+                             time.perf_counter() - start)
+                try:
+                    connection.send(response)
+                except (EOFError, OSError):
+                    return
+
+    def serve_forever(self, ready=None):
+        """
+        Loads everything and serves until interrupted.
+
+        Args:
+            ready (threading.Event): Set once the server accepts connections.
+        """
+        authkey = _authkey(create=True)
+        self.load()
+        with Listener(self.address, authkey=authkey) as listener:
+            self.address = listener.address
+            print(f"Warm server for {self.model_name} listening on {self.address[0]}:{self.address[1]} "
+                  f"(loaded in {self.load_seconds:.1f}s)")
+            if ready is not None:
+                ready.set()
+            while True:
+                try:
+                    connection = listener.accept()
+                except (AuthenticationError, EOFError, OSError):
+                    # Failed handshakes, e.g. a client with the wrong key, do not stop the server
+                    continue
+                threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+
+class WarmClient:
+    """
+    Connection to a WarmServer that can be used in place of the embedding model.
+
+    It offers `encode` and `get_sentence_embedding_dimension` like a
+    SentenceTransformer, so EmbeddingEngine, QueryCache and the retrieval
+    functions accept it unchanged. The connection is shared by Streamlit's
+    script threads under a lock and re-opened once if the server restarted.
+
+    Args:
+        address (tuple): (host, port) of the server.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.address = address
+        self._authkey = _authkey()
+        if self._authkey is None:
+            raise PermissionError("No warm server key: set RAG_WARM_SERVER_KEY or start the server to create "
+                                  f"{key_file()}")
+        self._lock = threading.Lock()
+        self._connection = Client(address, authkey=self._authkey)
+        self.info = self.call("ping")
+        self.model_name = self.info["model"]
+
+    def call(self, operation, *args):
+        with self._lock:
+            try:
+                self._connection.send((operation, *args))
+                status, result = self._connection.recv()
+            except (EOFError, OSError):
+                self._connection = Client(self.address, authkey=self._authkey)
+                self._connection.send((operation, *args))
+                status, result = self._connection.recv()
+        if status == "error":
+            raise RuntimeError(f"Warm server error: {result}")
+        return result
+
+    def get_sentence_embedding_dimension(self):
+        return self.info["dimension"]
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False):
+        return self.call("encode", texts, batch_size)
+
+    def index(self, name):
+        """
+        Returns a handle for querying an index held by the server, see `WarmServer`.
+        """
+        return RemoteIndex(self, name)
+
+    def stats(self):
+        return self.call("stats")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class RemoteIndex:
+    """
+    Query-only handle for an index held by the warm server.
+    """
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def query(self, vector, top_k=10, include_metadata=False, namespace=None, **kwargs):
+        return self.client.call("query", self.name, vector, top_k, include_metadata)
+
+
+def connect(address=None):
+    """
+    Connects to the warm server.
+
+    Returns:
+        WarmClient: The client, or None if no server is listening at `address`.
+    """
+    try:
+        return WarmClient(address or default_address())
+    except (AuthenticationError, EOFError, OSError):
+        return None
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_model(model_name='all-MiniLM-L6-v2', address=None):
+    """
+    Returns the embedding model for the app.
+
+    If a warm server serving `model_name` is reachable, a WarmClient for it is
+    returned and nothing heavy is imported. Otherwise the model is loaded into
+    this process once and kept by `cached_resource`. A missing server is only
+    looked for once per process.
+
+    Args:
+        model_name (str): SentenceTransformer model name.
+        address (tuple): Address of the warm server, see `default_address`.
+    """
+    address = address or default_address()
+    with _clients_lock:
+        if address not in _clients:
+            _clients[address] = connect(address)
+        client = _clients[address]
+    if client is not None and client.model_name == model_name:
+        return client
+
+    from src.utils.cache_util import cached_resource
+    from src.utils.embedding_pool import load_model
+    return cached_resource(('model', model_name), lambda: load_model(model_name))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the embedding model and index clients loaded for the app.")
+    parser.add_argument("--model", default='all-MiniLM-L6-v2')
+    parser.add_argument("--variant", default="fp32")
+    parser.add_argument("--address", default=None, help="host:port, default RAG_WARM_SERVER or 127.0.0.1:6123")
+    parser.add_argument("--index", action="append", default=[],
+                        help="index to open at startup, e.g. pinecone:news-articles-index (repeatable)")
+    args = parser.parse_args(argv)
+
+    address = parse_address(args.address) if args.address else default_address()
+    server = WarmServer(args.model, address, variant=args.variant, preload_indexes=args.index)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# tests/test_bm25_index.py
+from src.utils.bm25_index import BM25Index, tokenize
+from src.utils.rag_util import reciprocal_rank_fusion
+
+DOCS = [
+    ("swim", "Swimmer wins Olympic gold medal in the relay", {"topic": "olympics"}),
+    ("vote", "Voters in swing states head to the polls", {"topic": "election"}),
+    ("track", "Sprinter wins silver medal in the 100m final", {"topic": "olympics"}),
+]
+
+
+def build():
+    index = BM25Index()
+    index.add_many(DOCS)
+    return index
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("The Gold medal, in Paris!") == ["gold", "medal", "paris"]
+
+
+def test_search_ranks_by_bm25():
+    matches = build().search("olympic gold medal", top_k=3)["matches"]
+    assert [m["id"] for m in matches] == ["swim", "track"]
+    assert matches[0]["score"] > matches[1]["score"]
+    assert matches[0]["metadata"] == {"topic": "olympics"}
+
+
+def test_search_without_hits_or_documents():
+    assert build().search("weather")["matches"] == []
+    assert BM25Index().search("gold")["matches"] == []
+
+
+def test_adding_an_existing_id_replaces_the_document():
+    index = build()
+    index.add("swim", "Rowing crew takes bronze", {"topic": "rowing"})
+    assert len(index) == 3
+    assert index.search("swimmer relay")["matches"] == []
+    matches = index.search("rowing bronze medal", top_k=5)["matches"]
+    assert [m["id"] for m in matches] == ["swim", "track"]
+    assert matches[0]["metadata"] == {"topic": "rowing"}
+    assert index.total_length == sum(index.doc_lengths)
+
+    fresh = BM25Index()
+    fresh.add_many([("swim", "Rowing crew takes bronze", {"topic": "rowing"})] + DOCS[1:])
+    assert fresh.search("medal")["matches"][0]["score"] == index.search("medal")["matches"][0]["score"]
+
+
+def test_reciprocal_rank_fusion_counts_an_id_once_per_list():
+    dense = [{"id": "a"}, {"id": "b"}, {"id": "a"}]
+    sparse = [{"id": "b"}, {"id": "c"}]
+    fused = reciprocal_rank_fusion([dense, sparse], top_k=3, k=60)
+    scores = {m["id"]: m["score"] for m in fused}
+    assert [m["id"] for m in fused] == ["b", "a", "c"]
+    assert scores["a"] == 1 / 61
+    assert scores["b"] == 1 / 62 + 1 / 61
@@ -0,0 +1,72 @@
+# tests/test_cache_util.py
+import os
+import threading
+
+import pandas as pd
+
+import src.utils.cache_util as cache_util
+from src.utils.cache_util import ResultCache, load_corpus_cached, precompute_chunk_grid
+
+
+def test_lru_eviction_and_stats():
+    cache = ResultCache(max_entries=2)
+    calls = []
+
+    def compute(key):
+        return lambda: calls.append(key) or key.upper()
+
+    assert cache.get_or_compute("a", compute("a")) == "A"
+    cache.get_or_compute("b", compute("b"))
+    assert cache.get_or_compute("a", compute("a")) == "A"
+    cache.get_or_compute("c", compute("c"))
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert calls == ["a", "b", "c"]
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 3, "hit_rate": 0.25}
+    cache.get_or_compute("a", compute("a"), count=False)
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidate_with_predicate():
+    cache = ResultCache()
+    for key in [("x", 1), ("x", 2), ("y", 1)]:
+        cache.get_or_compute(key, lambda: 0)
+    cache.invalidate(lambda key: key[0] == "x")
+    assert len(cache) == 1 and ("y", 1) in cache
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_load_corpus_cached_reloads_modified_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_util, "corpus_cache", ResultCache())
+    path = str(tmp_path / "articles.csv")
+    pd.DataFrame({"headline": ["a"], "content": ["first"]}).to_csv(path, index=False)
+
+    first = load_corpus_cached(path)
+    assert load_corpus_cached(path) is first
+    assert cache_util.corpus_cache.stats()["hits"] == 1
+
+    pd.DataFrame({"headline": ["a", "b"], "content": ["first", "second"]}).to_csv(path, index=False)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_corpus_cached(path)["content"].tolist() == ["first", "second"]
+    # The entry of the old version is dropped, not kept next to the new one
+    assert len(cache_util.corpus_cache) == 1
+
+
+def test_precompute_chunk_grid_runs_once_per_text(monkeypatch):
+    monkeypatch.setattr(cache_util, "chunk_cache", ResultCache())
+    monkeypatch.setattr(cache_util, "_precompute_started", set())
+    text = "word " * 50
+
+    assert precompute_chunk_grid(text, ["character"], [10, 20], [0, 10, 20])
+    assert not precompute_chunk_grid(text, ["character"], [10, 20], [0, 10, 20])
+    for thread in threading.enumerate():
+        if thread.name == "chunk-precompute":
+            thread.join(5)
+
+    # Only the combinations with overlap < size are computed
+    assert sorted(key[:3] for key in cache_util.chunk_cache._entries) == [
+        ("character", 10, 0), ("character", 20, 0), ("character", 20, 10),
+    ]
+    assert cache_util.chunk_cache.stats()["misses"] == 0
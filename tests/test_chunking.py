@@ -0,0 +1,81 @@
+# tests/test_chunking.py
+import re
+
+import pytest
+
+import src.chunking.chunking as chunking
+from src.chunking.chunking import (
+    character_spans, chunk_by_character, chunk_by_recursive_character, chunk_corpus, recursive_character_spans,
+    span_text, token_spans
+)
+from src.utils.corpus_loader import article_uid, chunk_records
+
+TEXT = " ".join(f"Sentence number {n} about the Olympic games in Paris." for n in range(80))
+
+
+def test_recursive_spans_match_the_splitter():
+    spans = recursive_character_spans(TEXT, chunk_size=200, chunk_overlap=50)
+    assert [TEXT[start:end] for start, end in spans] == chunk_by_recursive_character(TEXT, 200, 50)
+    assert all(start >= 0 for start, _ in spans)
+
+
+def test_recursive_spans_reject_chunks_missing_from_the_text(monkeypatch):
+    class Splitter:
+        def split_text(self, text):
+            return ["not in the text"]
+
+    monkeypatch.setattr(chunking, "_recursive_splitter", lambda chunk_size, chunk_overlap: Splitter())
+    with pytest.raises(ValueError, match="not found"):
+        recursive_character_spans(TEXT)
+
+
+def test_character_spans_overlap():
+    assert character_spans("abcdefghij", chunk_size=4, chunk_overlap=1) == [(0, 4), (3, 7), (6, 10), (9, 10)]
+    with pytest.raises(ValueError):
+        character_spans("abc", chunk_size=2, chunk_overlap=2)
+
+
+class WordOffsetEncoding:
+    """Offline tokenizer stand-in: one token per word, whose id is the word's character offset."""
+
+    def encode_ordinary_batch(self, texts, num_threads=1):
+        return [[match.start() for match in re.finditer(r"\S+\s*", text)] for text in texts]
+
+    def decode_with_offsets(self, tokens):
+        return None, list(tokens)
+
+
+def test_token_spans_cut_token_windows(monkeypatch):
+    monkeypatch.setattr(chunking, "_encoding", lambda name="gpt2": WordOffsetEncoding())
+    text = "a b c d e f g"
+    spans, empty = token_spans([text, ""], chunk_size=3, chunk_overlap=1)
+
+    assert [text[start:end] for start, end in spans] == ["a b c ", "c d e ", "e f g"]
+    assert empty == []
+    with pytest.raises(ValueError):
+        token_spans([text], chunk_size=2, chunk_overlap=2)
+
+
+def test_chunk_records_match_the_per_document_chunkers():
+    records = [{"article_id": article_uid({"url": f"https://x/{n}"}), "content": TEXT[n * 500:], "headline": "h",
+                "url": f"https://x/{n}"} for n in range(4)]
+    records.insert(1, dict(records[0], article_id="empty", content=""))
+    for chunker in (chunk_by_recursive_character, chunk_by_character):
+        per_document = lambda text, chunk_size, chunk_overlap: chunker(text, chunk_size, chunk_overlap)
+        chunks = list(chunk_records(records, chunker, chunk_size=300, chunk_overlap=50))
+        assert chunks == list(chunk_records(records, per_document, chunk_size=300, chunk_overlap=50))
+        assert "empty" not in {chunk["article_id"] for chunk in chunks}
+
+
+def test_chunk_corpus_runs_small_corpora_inline(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("small corpora must not start a process pool")
+
+    monkeypatch.setattr(chunking, "ProcessPoolExecutor", no_pool)
+    texts = {doc_id: TEXT[doc_id * 100:] for doc_id in range(5)}
+    spans = list(chunk_corpus(texts.items(), method="character", chunk_size=300, chunk_overlap=50, batch_size=2))
+
+    assert [doc_id for doc_id, _, _ in spans] == sorted(doc_id for doc_id, _, _ in spans)
+    for doc_id, text in texts.items():
+        chunks = [span_text(texts, span) for span in spans if span[0] == doc_id]
+        assert chunks == [text[start:end] for start, end in character_spans(text, 300, 50)]
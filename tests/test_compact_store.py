@@ -0,0 +1,74 @@
+# tests/test_compact_store.py
+import os
+
+import numpy as np
+import pytest
+
+import src.utils.compact_store as compact_store
+from src.utils.compact_store import CompactVectorIndex, ReadOnlyIndexError
+from src.utils.vector_store import LocalVectorIndex
+
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(0).normal(size=(300, 32)).astype(np.float32)
+
+
+@pytest.mark.parametrize("layout", ["float16", "pq"])
+def test_compact_index_agrees_with_exact_search(tmp_path, embeddings, layout):
+    ids = [f"doc-{i}" for i in range(len(embeddings))]
+    exact = LocalVectorIndex.from_embeddings(ids, embeddings)
+    compact = CompactVectorIndex.build(str(tmp_path / layout), ids, embeddings, layout=layout, n_subvectors=8,
+                                       n_centroids=16, rerank_factor=10)
+    for query in embeddings[:20]:
+        expected = [m["id"] for m in exact.query(query, top_k=5)["matches"]]
+        assert [m["id"] for m in compact.query(query, top_k=5)["matches"]] == expected
+
+    reopened = CompactVectorIndex.load(str(tmp_path / layout))
+    assert reopened.query(embeddings[3], top_k=1)["matches"][0]["id"] == "doc-3"
+
+
+def test_repeated_ids_keep_their_last_row(tmp_path, embeddings):
+    ids = ["a", "b", "a", "c"]
+    metadata = [{"v": 0}, {"v": 1}, {"v": 2}, {"v": 3}]
+    compact = CompactVectorIndex.build(str(tmp_path / "dup"), ids, embeddings[:4], metadata, block_size=3)
+    exact = LocalVectorIndex.from_embeddings(ids, embeddings[:4], metadata)
+    assert len(compact) == len(exact) == 3
+
+    matches = compact.query(embeddings[2], top_k=3, include_metadata=True)["matches"]
+    assert len({m["id"] for m in matches}) == 3
+    assert matches[0]["id"] == "a"
+    assert matches[0]["metadata"] == {"v": 2}
+    for query in embeddings[:4]:
+        assert [m["id"] for m in compact.query(query, top_k=3)["matches"]] == \
+            [m["id"] for m in exact.query(query, top_k=3)["matches"]]
+
+
+def test_empty_index(tmp_path):
+    compact = CompactVectorIndex.build(str(tmp_path / "empty"), [], np.empty((0, 8), dtype=np.float32))
+    assert compact.query(np.ones(8), top_k=3)["matches"] == []
+
+
+def test_index_is_read_only(tmp_path, embeddings):
+    compact = CompactVectorIndex.build(str(tmp_path / "ro"), ["a"], embeddings[:1])
+    with pytest.raises(ReadOnlyIndexError):
+        compact.upsert([("b", embeddings[1], {})])
+    with pytest.raises(ReadOnlyIndexError):
+        compact.delete(["a"])
+    assert len(compact) == 1
+
+
+def test_failed_rebuild_leaves_no_index_json(tmp_path, embeddings, monkeypatch):
+    path = str(tmp_path / "rebuild")
+    CompactVectorIndex.build(path, ["a", "b"], embeddings[:2])
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(compact_store.json, "dump", fail)
+    with pytest.raises(OSError):
+        CompactVectorIndex.build(path, ["c"], embeddings[2:3])
+    # The half-written rebuild is not mistaken for a complete index
+    assert not os.path.exists(os.path.join(path, "index.json"))
+
+    monkeypatch.undo()
+    assert CompactVectorIndex.build(path, ["c"], embeddings[2:3]).ids == ["c"]
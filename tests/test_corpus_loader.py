@@ -0,0 +1,50 @@
+# tests/test_corpus_loader.py
+import pandas as pd
+
+from src.utils.corpus_loader import article_uid, chunk_records, is_newer, latest_records, load_corpus
+from src.utils.corpus_store import CorpusStore
+
+
+def record(content, timestamp, url="https://www.bbc.com/news/articles/a"):
+    return {"content": content, "timestamp": timestamp, "url": url, "headline": "Headline",
+            "article_id": article_uid({"url": url})}
+
+
+def test_article_uid_depends_on_the_url_only():
+    assert article_uid({"url": "https://x/1", "content": "a"}) == article_uid({"url": "https://x/1", "content": "b"})
+    assert article_uid({"url": None, "headline": "h", "content": "a"}) != article_uid({"headline": "h", "content": "b"})
+
+
+def test_is_newer_puts_missing_timestamps_last():
+    dated = pd.Timestamp("2024-08-01")
+    assert is_newer(pd.Timestamp("2024-08-02"), dated)
+    assert not is_newer(pd.NaT, dated)
+    assert is_newer(dated, pd.NaT)
+    assert is_newer(pd.NaT, pd.NaT)
+
+
+def test_latest_records_keeps_one_version_per_url():
+    records = [
+        record("new", "2024-08-02 10:00:00"),
+        record("other", "2024-08-01 10:00:00", url="https://www.bbc.com/news/articles/b"),
+        record("undated", float("nan")),
+        record("old", "2024-08-01 10:00:00"),
+    ]
+    latest = latest_records(records)
+    assert [r["content"] for r in latest] == ["new", "other"]
+
+    chunks = list(chunk_records(latest_records(records + [record("new", "2024-08-03 10:00:00")])))
+    assert len({chunk["id"] for chunk in chunks}) == len(chunks)
+
+
+def test_load_corpus_reads_nrows_across_store_parts(tmp_path):
+    store = CorpusStore(str(tmp_path / "corpus"))
+    for part in range(3):
+        store.append(pd.DataFrame({"url": [f"https://x/{part}-{n}" for n in range(2)],
+                                   "content": [f"article {part}-{n}" for n in range(2)]}))
+
+    df = load_corpus(store.path, nrows=5)
+    assert df["content"].tolist() == ["article 0-0", "article 0-1", "article 1-0", "article 1-1", "article 2-0"]
+    assert df.index.tolist() == [0, 1, 2, 3, 4]
+    assert len(load_corpus(store.path, nrows=50)) == 6
+    assert load_corpus(store.path, nrows=0).empty
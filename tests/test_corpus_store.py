@@ -0,0 +1,67 @@
+# tests/test_corpus_store.py
+import pandas as pd
+
+from src.utils.corpus_store import CorpusStore
+
+
+def articles(*rows):
+    return pd.DataFrame([{"url": url, "headline": "Headline", "content": content} for url, content in rows])
+
+
+def test_append_skips_known_and_repeated_content(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    entry = store.append(articles(("https://x/1", "gold"), ("https://x/2", "silver"), ("https://x/2", "silver")))
+    assert (entry["version"], entry["rows"], entry["skipped"]) == (1, 2, 1)
+    assert store.append(articles(("https://x/1", "gold"))) is None
+
+    reopened = CorpusStore(str(tmp_path))
+    assert reopened.version == 1
+    assert reopened.read()["content"].tolist() == ["gold", "silver"]
+
+
+def test_edited_article_replaces_the_stored_row(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    store.append(articles(("https://x/1", "gold"), ("https://x/2", "silver")))
+    entry = store.append(articles(("https://x/1", "gold, updated")))
+    assert entry["replaced"] == 1
+
+    for current in (store, CorpusStore(str(tmp_path))):
+        df = current.read()
+        assert df["content"].tolist() == ["silver", "gold, updated"]
+        assert df.index.tolist() == [1, 2]
+        assert current.read(columns=["content"]).columns.tolist() == ["content"]
+        assert current.read(since_version=1)["content"].tolist() == ["gold, updated"]
+
+
+def test_last_row_per_url_wins_within_one_append(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    entry = store.append(articles(("https://x/1", "draft"), ("https://x/1", "final")))
+    assert (entry["rows"], entry["skipped"]) == (1, 1)
+    assert store.read()["content"].tolist() == ["final"]
+
+
+def test_iter_batches_keeps_positions(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    store.append(articles(*[(f"https://x/{n}", f"article {n}") for n in range(5)]))
+    frames = list(store.iter_batches(columns=["headline"], batch_size=2))
+    assert [frame.index.tolist() for frame in frames] == [[0, 1], [2, 3], [4]]
+    assert all(frame.columns.tolist() == ["headline"] for frame in frames)
+
+
+def test_reverted_article_replaces_the_edited_version(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    store.append(articles(("https://x/1", "gold")))
+    store.append(articles(("https://x/1", "gold, corrected")))
+    assert store.append(articles(("https://x/1", "gold, corrected"))) is None
+
+    # The correction is withdrawn and the original text is scraped again
+    entry = store.append(articles(("https://x/1", "gold")))
+    assert entry["replaced"] == 1
+    assert CorpusStore(str(tmp_path)).read()["content"].tolist() == ["gold"]
+
+
+def test_rows_without_url_are_deduplicated_by_content(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    store.append(pd.DataFrame({"url": [None, None, "https://x/1"], "content": ["a", "a", "a"]}))
+    assert store.append(pd.DataFrame({"url": [None], "content": ["a"]})) is None
+    assert store.read()["content"].tolist() == ["a", "a"]
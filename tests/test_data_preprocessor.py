@@ -0,0 +1,151 @@
+# tests/test_data_preprocessor.py
+import os
+
+import pandas as pd
+import pytest
+
+from src.utils.corpus_store import CorpusStore
+from src.utils.data_preprocessor import (classify_articles, filter_articles_with_llm, is_relevant, keyword_prefilter,
+                                         load_verdict_cache)
+from src.utils.mock_llm import MockChatLLM, MockRateLimitError
+
+ARTICLES = pd.DataFrame({
+    "headline": ["Games", "Weather", "Vote", "Markets"],
+    "content": [
+        "The Olympic swimming final was won in Paris.",
+        "Rain is expected across the north tomorrow.",
+        "Harris and Trump meet for the first debate.",
+        "Shares fell sharply in early trading.",
+    ],
+    "url": [f"https://www.bbc.com/news/articles/{i}" for i in range(4)],
+})
+
+
+class FailingLLM:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        raise self.error
+
+
+def test_keyword_prefilter():
+    assert keyword_prefilter("Biden leaves the race")
+    assert keyword_prefilter("The Paralympics open in Paris")
+    assert not keyword_prefilter("Rain is expected tomorrow")
+    # Keywords match whole words only, not "ioc" in "Voice" or "gop" in "Gopher"
+    assert not keyword_prefilter("Voice actors and gophers")
+
+
+def test_is_relevant_retries_rate_limits():
+    llm = MockChatLLM(rate_limit_every=2)
+    assert is_relevant(llm, "Olympic medal table")
+    # The second call is rate limited and retried
+    assert not is_relevant(llm, "Rain tomorrow", backoff=0)
+    assert llm.calls == 3
+
+
+def test_is_relevant_gives_up_after_max_retries():
+    llm = MockChatLLM(rate_limit_every=1)
+    with pytest.raises(MockRateLimitError):
+        is_relevant(llm, "Olympic medal table", max_retries=2, backoff=0)
+    assert llm.calls == 3
+
+
+def test_is_relevant_does_not_retry_other_errors():
+    llm = FailingLLM(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        is_relevant(llm, "Olympic medal table", backoff=0)
+    assert llm.calls == 1
+
+
+def test_is_relevant_truncates_article():
+    llm = MockChatLLM()
+    is_relevant(llm, "x" * 100 + " olympic", max_chars=50)
+    assert llm.prompts[0].endswith("x" * 50)
+
+
+def test_classify_articles_reuses_cache_and_duplicates():
+    llm = MockChatLLM()
+    cache = {}
+    texts = ARTICLES["content"].tolist()
+    verdicts, stats = classify_articles(texts + texts[:1], llm, cache=cache, max_concurrency=2)
+    assert verdicts == [True, False, True, False, True]
+    assert stats == {"cached": 1, "prefiltered": 0, "classified": 4}
+
+    verdicts, stats = classify_articles(texts, llm, cache=cache)
+    assert verdicts == [True, False, True, False]
+    assert stats["cached"] == 4
+    assert llm.calls == 4
+
+
+def test_classify_articles_only_creates_llm_when_needed():
+    def create():
+        raise AssertionError("LLM created although every article was prefiltered")
+
+    verdicts, stats = classify_articles(["Rain tomorrow"], create, prefilter=keyword_prefilter)
+    assert verdicts == [False]
+    assert stats["prefiltered"] == 1
+
+
+def test_prefilter_rejections_are_not_cached(tmp_path):
+    cache = {}
+    verdicts, _ = classify_articles(["Rain tomorrow", "Olympic final"], MockChatLLM(), cache=cache,
+                                    prefilter=keyword_prefilter)
+    assert verdicts == [False, True]
+    assert len(cache) == 1
+
+    input_path = tmp_path / "articles.csv"
+    cache_path = tmp_path / "cache.json"
+    ARTICLES.to_csv(input_path, index=False)
+    filter_articles_with_llm(str(input_path), str(tmp_path / "filtered.csv"), llm=MockChatLLM(),
+                             cache_path=str(cache_path), use_prefilter=True)
+    assert len(load_verdict_cache(str(cache_path))) == 2
+
+    # Without the prefilter, the articles it rejected are sent to the LLM
+    llm = MockChatLLM()
+    filter_articles_with_llm(str(input_path), str(tmp_path / "filtered.csv"), llm=llm, cache_path=str(cache_path))
+    assert llm.calls == 2
+
+
+def test_filter_articles_with_llm_persists_verdicts(tmp_path):
+    input_path = tmp_path / "articles.csv"
+    output_path = tmp_path / "filtered.csv"
+    cache_path = tmp_path / "cache.json"
+    ARTICLES.to_csv(input_path, index=False)
+
+    llm = MockChatLLM()
+    filter_articles_with_llm(str(input_path), str(output_path), llm=llm, cache_path=str(cache_path), chunksize=3)
+    assert llm.calls == 4
+    assert len(load_verdict_cache(str(cache_path))) == 4
+    assert pd.read_csv(output_path)["headline"].tolist() == ["Games", "Vote"]
+
+    # A rerun only asks the LLM about articles that are not in the cache yet
+    rerun = MockChatLLM()
+    filter_articles_with_llm(str(input_path), str(output_path), llm=rerun, cache_path=str(cache_path))
+    assert rerun.calls == 0
+    assert pd.read_csv(output_path)["headline"].tolist() == ["Games", "Vote"]
+    assert not os.path.exists(str(output_path) + ".tmp")
+
+
+def test_filter_articles_with_llm_without_relevant_articles(tmp_path):
+    input_path = tmp_path / "articles.csv"
+    output_path = tmp_path / "filtered.csv"
+    ARTICLES.iloc[[1, 3]].to_csv(input_path, index=False)
+
+    filter_articles_with_llm(str(input_path), str(output_path), llm=MockChatLLM(), cache_path=None)
+    filtered = pd.read_csv(output_path)
+    assert filtered.empty
+    assert "content" in filtered.columns
+
+
+def test_filter_articles_with_llm_empty_input(tmp_path):
+    store = CorpusStore(str(tmp_path / "corpus"))
+    output_path = tmp_path / "filtered.csv"
+    llm = MockChatLLM()
+
+    filter_articles_with_llm(store.path, str(output_path), llm=llm, cache_path=None)
+    assert llm.calls == 0
+    assert not output_path.exists()
@@ -0,0 +1,50 @@
+# tests/test_embedding_pool.py
+import numpy as np
+
+from src.utils import embedding_pool
+from src.utils.embedding_pool import EmbeddingPool, benchmark_pool, missing_dependencies
+from src.utils.embedding_util import EmbeddingEngine, HashingEmbedder
+
+TEXTS = [f"Article {i} about the {'olympics' if i % 2 else 'election'} in {i} words" for i in range(10)]
+
+
+def test_pool_matches_single_process_model_in_input_order():
+    with EmbeddingPool("hashing", n_workers=2, pin_cores=False) as pool:
+        vectors = pool.encode(TEXTS)
+        assert pool.get_sentence_embedding_dimension() == 384
+        assert pool.encode([]).shape == (0, 384)
+    np.testing.assert_array_equal(vectors, HashingEmbedder().encode(TEXTS))
+
+
+def test_closed_pool_restarts_its_workers():
+    pool = EmbeddingPool("hashing", n_workers=1, pin_cores=False)
+    first = pool.encode(TEXTS[:3])
+    pool.close()
+    np.testing.assert_array_equal(pool.encode(TEXTS[:3]), first)
+    pool.close()
+
+
+def test_pool_works_behind_the_embedding_engine(tmp_path):
+    with EmbeddingPool("hashing", n_workers=2, pin_cores=False) as pool:
+        engine = EmbeddingEngine(pool, "hashing", cache_dir=str(tmp_path))
+        vectors = engine.encode(TEXTS + TEXTS[:2])
+    np.testing.assert_array_equal(vectors[:10], HashingEmbedder().encode(TEXTS))
+    assert engine.last_stats["encoded"] == 10
+
+
+def test_missing_dependencies_are_checked_before_starting_workers(monkeypatch):
+    assert missing_dependencies("hashing", "onnx") == []
+    monkeypatch.setattr(embedding_pool.importlib.util, "find_spec", lambda name: None)
+    assert missing_dependencies("all-MiniLM-L6-v2", "int8") == ["sentence_transformers", "torch"]
+
+    results = benchmark_pool(model_name="all-MiniLM-L6-v2", variants=("onnx",), worker_counts=(1,))
+    assert results == [{"variant": "onnx", "workers": None,
+                        "error": "not installed: sentence_transformers, torch, onnxruntime"}]
+
+
+def test_benchmark_pool_reports_workers_that_fail_to_start(monkeypatch):
+    # The dependencies look installed, but loading the model in the workers fails
+    monkeypatch.setattr(embedding_pool, "missing_dependencies", lambda model_name, variant: [])
+    results = benchmark_pool(model_name="no-such-model", variants=("fp32",), worker_counts=(1,))
+    assert len(results) == 1
+    assert results[0]["error"].startswith("workers failed")
@@ -0,0 +1,68 @@
+# tests/test_embedding_util.py
+import os
+
+import numpy as np
+
+from src.utils.embedding_util import EmbeddingCache, EmbeddingEngine, HashingEmbedder, content_hash
+
+
+class RecordingModel(HashingEmbedder):
+    """HashingEmbedder that records the texts of every encode call."""
+
+    def __init__(self, dimension=16):
+        super().__init__(dimension)
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return super().encode(texts, **kwargs)
+
+
+TEXTS = ["short", "a much longer text about the Olympic relay final", "medium length text", "short", None]
+
+
+def test_encode_keeps_input_order_and_dedups_by_content():
+    model = RecordingModel()
+    embeddings = EmbeddingEngine(model, "hashing", batch_size=2).encode(TEXTS)
+
+    expected = HashingEmbedder(16).encode(["" if text is None else text for text in TEXTS])
+    np.testing.assert_allclose(embeddings, expected)
+    assert embeddings.dtype == np.float32
+    # One call with each distinct text once, longest first
+    assert model.calls == [["a much longer text about the Olympic relay final", "medium length text", "short", ""]]
+
+
+def test_cache_hits_across_engine_instances(tmp_path):
+    first = EmbeddingEngine(RecordingModel(), "hashing", cache_dir=str(tmp_path))
+    expected = first.encode(TEXTS)
+    assert first.last_stats["cache_hits"] == 0
+    assert first.last_stats["encoded"] == 4
+
+    model = RecordingModel()
+    second = EmbeddingEngine(model, "hashing", cache_dir=str(tmp_path))
+    np.testing.assert_allclose(second.encode(TEXTS + ["new text"]), np.vstack([expected, model.encode(["new text"])]))
+    assert second.last_stats["cache_hits"] == len(TEXTS)
+    assert model.calls[0] == ["new text"]
+
+
+def test_flush_every_writes_one_shard_per_slice(tmp_path):
+    engine = EmbeddingEngine(RecordingModel(), "sentence-transformers/all-MiniLM-L6-v2", cache_dir=str(tmp_path),
+                             flush_every=2)
+    engine.encode(["one", "two", "three"])
+
+    files = sorted(os.listdir(engine.cache.path))
+    assert os.path.basename(engine.cache.path) == "sentence-transformers_all-MiniLM-L6-v2"
+    assert files == ["shard-00000.keys", "shard-00000.npy", "shard-00001.keys", "shard-00001.npy"]
+
+
+def test_cache_ignores_shards_without_keys_file(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "hashing")
+    vectors = np.arange(6, dtype=np.float32).reshape(2, 3)
+    cache.put_many([content_hash("a"), content_hash("b")], vectors)
+    # A crash after writing the matrix but before the keys file leaves an uncommitted shard
+    np.save(os.path.join(cache.path, "shard-00001.npy"), vectors)
+
+    reopened = EmbeddingCache(str(tmp_path), "hashing")
+    assert len(reopened) == 2
+    np.testing.assert_array_equal(reopened.get(content_hash("b")), vectors[1])
+    assert reopened.get(content_hash("c")) is None
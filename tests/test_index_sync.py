@@ -0,0 +1,144 @@
+# tests/test_index_sync.py
+import pandas as pd
+import pytest
+
+from src.utils.embedding_util import EmbeddingEngine, HashingEmbedder, content_hash
+from src.utils.index_sync import load_manifest, plan_sync, sync_config, sync_index
+from src.utils.near_duplicates import NearDuplicateIndex
+from src.utils.query_cache import QueryCache
+from src.utils.vector_store import LocalVectorIndex
+
+PARAGRAPH = "The relay team won gold in a record time after a close race in Paris. "
+
+
+def article(name, content, timestamp="2024-08-01 10:00:00"):
+    return {"headline": name.title(), "content": content, "timestamp": timestamp,
+            "url": f"https://www.bbc.com/news/articles/{name}"}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / "articles.csv"
+
+    def write(*articles):
+        pd.DataFrame(articles).to_csv(path, index=False)
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def engine():
+    return EmbeddingEngine(HashingEmbedder(), "hashing")
+
+
+def test_plan_prefers_the_latest_dated_version(corpus):
+    path = corpus(
+        article("a", "Newest version.", "2024-08-02 09:00:00"),
+        article("a", "Undated version.", float("nan")),
+        article("a", "Oldest version.", "2024-08-01 09:00:00"),
+        article("b", "Only undated."),
+    )
+    plan = plan_sync(path, load_manifest(None), sync_config("hashing"))
+    assert len(plan["current"]) == 2
+    assert plan["new"] == sorted(plan["current"])
+    assert content_hash("Newest version.") in [state["content"] for state in plan["current"].values()]
+
+
+def test_sync_index_only_touches_changed_articles(corpus, engine, tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    index = LocalVectorIndex(384)
+    path = corpus(article("a", PARAGRAPH * 20), article("b", "Turnout rises in swing states."),
+                  article("c", "Markets fall."))
+
+    first = sync_index(path, index, engine, manifest_path=manifest_path, chunk_size=300, chunk_overlap=0)
+    assert (first["new"], first["changed"], first["removed"]) == (3, 0, 0)
+    assert len(index) == first["upserted"]
+    assert first["upserted"] > 3
+
+    # Rerunning without changes embeds nothing
+    again = sync_index(path, index, engine, manifest_path=manifest_path, chunk_size=300, chunk_overlap=0)
+    assert (again["unchanged"], again["upserted"], again["deleted"]) == (3, 0, 0)
+
+    # Appending to a, editing b and removing c
+    path = corpus(article("a", PARAGRAPH * 20 + "An extra closing sentence."), article("b", "Turnout falls."))
+    third = sync_index(path, index, engine, manifest_path=manifest_path, chunk_size=300, chunk_overlap=0)
+    assert (third["changed"], third["removed"], third["unchanged"]) == (2, 1, 0)
+    assert third["reused"] > 0
+    assert third["upserted"] == 2
+    manifest = load_manifest(manifest_path)
+    assert sorted(index.ids) == sorted(chunk for state in manifest["articles"].values() for chunk in state["chunks"])
+    assert len(third["stale_articles"]) == 3
+
+
+def test_sync_index_invalidates_cached_answers_of_stale_articles(corpus, engine, tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    index = LocalVectorIndex(384)
+    path = corpus(article("a", "Swimmer wins gold."), article("b", "Turnout rises."), article("c", "Markets fall."))
+    sync_index(path, index, engine, manifest_path=manifest_path)
+    ids = {state["headline"]: article_id for article_id, state in load_manifest(manifest_path)["articles"].items()}
+    a, b, c = ids["A"], ids["B"], ids["C"]
+
+    cache = QueryCache()
+    cache.store("who won gold", "a swimmer", articles={a})
+    cache.store("turnout", "rising", articles={b, c})
+    path = corpus(article("a", "Swimmer wins gold."), article("b", "Turnout falls."))
+    summary = sync_index(path, index, engine, manifest_path=manifest_path, query_cache=cache)
+
+    assert sorted(summary["stale_articles"]) == sorted([b, c])
+    assert summary["invalidated"] == 1
+    assert cache.lookup("who won gold")[0] == "a swimmer"
+    assert cache.lookup("turnout")[0] is None
+
+
+class FailingIndex(LocalVectorIndex):
+    """Rejects every upsert containing a chunk with `marker` in its text while `marker` is set."""
+
+    marker = None
+
+    def upsert(self, vectors, namespace=None):
+        vectors = list(vectors)
+        if self.marker and any(self.marker in metadata["text"] for _, _, metadata in vectors):
+            raise ConnectionError("upsert failed")
+        return super().upsert(vectors, namespace)
+
+
+@pytest.mark.parametrize("previous_content", [PARAGRAPH * 20, None], ids=["changed", "new"])
+def test_partly_failed_upserts_leave_no_orphaned_chunks(corpus, engine, tmp_path, previous_content):
+    manifest_path = str(tmp_path / "manifest.json")
+    index = FailingIndex(384)
+    if previous_content is not None:
+        sync_index(corpus(article("a", previous_content)), index, engine, manifest_path=manifest_path,
+                   chunk_size=300, chunk_overlap=0)
+    edited = " ".join(f"Sentence {i} about the swimming final." for i in range(40)) + " Boycott announced."
+    path = corpus(article("a", edited))
+
+    index.marker = "Boycott"
+    failed = sync_index(path, index, engine, manifest_path=manifest_path, chunk_size=300, chunk_overlap=0,
+                        batch_size=1, max_retries=0, backoff=0)
+    assert len(failed["failed_ids"]) == 1
+    assert failed["upserted"] > 0
+    (state,) = load_manifest(manifest_path)["articles"].values()
+    assert state["content"] != content_hash(edited)
+    # Every chunk in the index is tracked by the manifest
+    assert set(index.ids) <= set(state["chunks"])
+
+    index.marker = None
+    retried = sync_index(path, index, engine, manifest_path=manifest_path, chunk_size=300, chunk_overlap=0)
+    assert retried["changed"] == 1
+    (state,) = load_manifest(manifest_path)["articles"].values()
+    assert sorted(index.ids) == sorted(state["chunks"])
+    # Removing the article deletes all of its chunks
+    removed = sync_index(corpus(article("b", "Markets fall.")), index, engine, manifest_path=manifest_path)
+    assert removed["deleted"] == len(state["chunks"])
+    assert len(index) == 1
+
+
+def test_sync_index_leaves_near_duplicates_out(corpus, engine, tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    index = LocalVectorIndex(384)
+    original = " ".join(f"Sentence {i} of the report on the relay final in Paris." for i in range(60))
+    path = corpus(article("a", original), article("copy", original.replace("Sentence 7 ", "Line 7 ")))
+    summary = sync_index(path, index, engine, manifest_path=manifest_path, near_duplicates=NearDuplicateIndex())
+    assert summary["near_duplicates"] == 1
+    assert summary["articles"] == 1
+    assert {metadata["article_id"] for metadata in index.metadata} == set(load_manifest(manifest_path)["articles"])
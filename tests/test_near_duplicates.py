@@ -0,0 +1,74 @@
+# tests/test_near_duplicates.py
+import random
+
+import pytest
+
+from src.utils.near_duplicates import NearDuplicateIndex, _edit, drop_near_duplicates, jaccard, shingle_hashes
+
+WORDS = ("gold silver bronze medal final relay sprint swimmer gymnast record crowd coach team olympic paris "
+         "stadium heat semi vote poll senate campaign debate rally ballot state").split()
+
+
+def article(seed, sentences=40):
+    rng = random.Random(seed)
+    return " ".join(" ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + "." for _ in range(sentences))
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert list(shingle_hashes("Gold medal, in Paris!")) == list(shingle_hashes("gold medal in paris"))
+    assert len(shingle_hashes("one two")) == 1
+    assert len(shingle_hashes("")) == 0
+    assert jaccard("a b c d e f", "a b c d e f") == 1.0
+
+
+def test_edited_copy_joins_the_original_cluster():
+    index = NearDuplicateIndex()
+    original, other = article(1), article(2)
+    copy = _edit(original, random.Random(0), edit_rate=0.005)
+
+    assert index.add("original", original) == "original"
+    assert index.add("other", other) == "other"
+    assert index.add("copy", copy) == "original"
+    assert index.query(copy)[0] == "original"
+    assert index.query(article(3))[0] is None
+    assert index.clusters() == {"original": ["original", "copy"]}
+    assert index.stats()["duplicates"] == 1
+
+
+def test_adding_an_id_again_returns_its_cluster():
+    index = NearDuplicateIndex()
+    index.add("a", article(1))
+    index.add("b", _edit(article(1), random.Random(0), edit_rate=0.005))
+    assert index.add("b", "completely different text") == "a"
+    assert len(index) == 2
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = NearDuplicateIndex(threshold=0.7, num_perm=64, bands=8)
+    index.add("a", article(1))
+    index.add("b", article(2))
+    path = str(tmp_path / "state" / "near_duplicates.npz")
+    index.save(path)
+
+    loaded = NearDuplicateIndex.open(path)
+    assert (loaded.threshold, loaded.num_perm, loaded.bands, loaded.ids) == (0.7, 64, 8, ["a", "b"])
+    assert loaded.add("c", _edit(article(2), random.Random(0), edit_rate=0.005)) == "b"
+    assert len(NearDuplicateIndex.open(str(tmp_path / "missing.npz"))) == 0
+
+
+def test_drop_near_duplicates_reports_dropped_records():
+    records = [
+        {"article_id": "a", "content": article(1)},
+        {"article_id": "b", "content": _edit(article(1), random.Random(0), edit_rate=0.005)},
+        {"article_id": "c", "content": article(2)},
+    ]
+    dropped = []
+    kept = drop_near_duplicates(records, NearDuplicateIndex(),
+                                on_duplicate=lambda record, canonical: dropped.append((record["article_id"], canonical)))
+    assert [record["article_id"] for record in kept] == ["a", "c"]
+    assert dropped == [("b", "a")]
+
+
+def test_bands_must_divide_num_perm():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=100, bands=16)
@@ -0,0 +1,84 @@
+# tests/test_pinecone_util.py
+import threading
+
+import numpy as np
+
+from src.utils.fake_index import FakeIndex
+from src.utils.pinecone_util import load_upserted_ids, upsert_vectors
+
+
+def make_vectors(n, offset=0.0):
+    return [(f"id-{i}", [float(i) + offset, 1.0, 2.0], {"headline": f"Headline {i}"}) for i in range(n)]
+
+
+def test_vectors_are_upserted_in_batches():
+    index = FakeIndex(latency=0, max_batch_size=100)
+    summary = upsert_vectors(index, iter(make_vectors(250)), batch_size=100, max_workers=2)
+
+    assert (summary["upserted"], summary["skipped"], summary["failed_ids"]) == (250, 0, [])
+    assert index.requests == 3
+    assert len(index.vectors) == 250
+    np.testing.assert_array_equal(index.vectors["id-7"][0], np.array([7.0, 1.0, 2.0], dtype=np.float32))
+
+
+def test_at_most_two_batches_per_worker_are_pending():
+    release = threading.Event()
+    pulled = []
+
+    class BlockingIndex(FakeIndex):
+        def upsert(self, vectors, namespace=None):
+            release.wait(5)
+            return super().upsert(vectors, namespace)
+
+    def vectors():
+        for vector in make_vectors(200):
+            pulled.append(vector[0])
+            yield vector
+
+    index = BlockingIndex(latency=0)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(upsert_vectors(index, vectors(), batch_size=10,
+                                                                          max_workers=2)))
+    thread.start()
+    thread.join(0.3)
+    # Four batches in flight plus the one waiting to be submitted
+    assert len(pulled) <= (2 * 2 + 1) * 10
+    release.set()
+    thread.join(5)
+    assert result["upserted"] == 200
+
+
+def test_failed_requests_are_retried():
+    index = FakeIndex(latency=0, failure_rate=0.3, seed=0)
+    summary = upsert_vectors(index, make_vectors(500), batch_size=50, max_retries=10, backoff=0)
+
+    assert index.failures > 0
+    assert index.requests == 10 + index.failures
+    assert (summary["upserted"], summary["failed_ids"]) == (500, [])
+
+
+def test_batches_failing_every_retry_are_reported():
+    index = FakeIndex(latency=0, failure_rate=1.0, seed=0)
+    summary = upsert_vectors(index, make_vectors(30), batch_size=10, max_retries=1, backoff=0)
+
+    assert summary["upserted"] == 0
+    assert sorted(summary["failed_ids"]) == sorted(vector_id for vector_id, _, _ in make_vectors(30))
+    assert index.requests == 3 * 2
+    assert not index.vectors
+
+
+def test_resume_from_checkpoint_skips_only_unchanged_vectors(tmp_path):
+    checkpoint = str(tmp_path / "upserted.txt")
+    index = FakeIndex(latency=0)
+    upsert_vectors(index, make_vectors(150), batch_size=50, checkpoint_path=checkpoint)
+    assert len(load_upserted_ids(checkpoint)) == 150
+
+    vectors = make_vectors(250)
+    # id-3 was re-embedded after its article changed
+    vectors[3] = ("id-3", [99.0, 1.0, 2.0], vectors[3][2])
+    summary = upsert_vectors(index, vectors, batch_size=50, checkpoint_path=checkpoint)
+
+    assert (summary["upserted"], summary["skipped"]) == (101, 149)
+    assert index.vectors["id-3"][0][0] == 99.0
+    assert len(index.vectors) == 250
+    assert upsert_vectors(index, vectors, batch_size=50, checkpoint_path=checkpoint)["skipped"] == 250
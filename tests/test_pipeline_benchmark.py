@@ -0,0 +1,56 @@
+# tests/test_pipeline_benchmark.py
+import time
+
+from src.benchmarks.pipeline_benchmark import _measure, find_regressions
+
+
+def test_measure_does_not_time_the_warm_up():
+    calls = []
+    result, seconds, peak_mb = _measure(lambda: calls.append("run") or 42, measure_memory=True,
+                                        warm_up=lambda: time.sleep(0.2), max_repeat=1)
+    assert result == 42
+    assert seconds < 0.1
+    assert peak_mb is not None
+    assert calls == ["run", "run"]
+
+
+def test_measure_keeps_the_fastest_of_repeated_short_runs():
+    delays = [0.05, 0.01, 0.03]
+
+    def stage():
+        time.sleep(delays.pop(0))
+
+    _, seconds, _ = _measure(stage, measure_memory=False, min_time=1.0, max_repeat=3)
+    assert not delays
+    assert 0.01 <= seconds < 0.03
+
+
+def test_find_regressions_respects_metric_direction():
+    previous = {"metrics": {"chunk.recursive.seconds": 1.0, "embed.docs_per_sec": 100.0, "chunk.recursive.chunks": 10,
+                            "dedup.duplicates": 5}}
+    latest = {"metrics": {"chunk.recursive.seconds": 1.1, "embed.docs_per_sec": 50.0, "chunk.recursive.chunks": 20,
+                          "dedup.duplicates": 50}}
+    assert [r["metric"] for r in find_regressions(previous, latest)] == ["embed.docs_per_sec"]
+
+    latest["metrics"]["chunk.recursive.seconds"] = 2.0
+    assert {r["metric"] for r in find_regressions(previous, latest)} == {"embed.docs_per_sec",
+                                                                         "chunk.recursive.seconds"}
+
+
+def test_find_regressions_ignores_millisecond_noise():
+    previous = {"metrics": {"chunk.character.seconds": 0.013, "chunk.character.docs_per_sec": 35000.0,
+                            "query.local.p95_ms": 0.4, "load.peak_mb": 1.0}}
+    latest = {"metrics": {"chunk.character.seconds": 0.018, "chunk.character.docs_per_sec": 25000.0,
+                          "query.local.p95_ms": 0.9, "load.peak_mb": 1.5}}
+    assert find_regressions(previous, latest) == []
+
+    latest["metrics"].update({"chunk.character.seconds": 0.5, "chunk.character.docs_per_sec": 900.0})
+    assert {r["metric"] for r in find_regressions(previous, latest)} == {"chunk.character.seconds",
+                                                                         "chunk.character.docs_per_sec"}
+
+
+def test_find_regressions_compares_with_the_median_of_earlier_runs():
+    runs = [{"metrics": {"embed.seconds": seconds}} for seconds in (1.0, 3.0, 1.1, 0.9, 1.0)]
+    assert find_regressions(runs, {"metrics": {"embed.seconds": 1.15}}) == []
+    regressions = find_regressions(runs, {"metrics": {"embed.seconds": 1.5}})
+    assert [(r["metric"], r["previous"]) for r in regressions] == [("embed.seconds", 1.0)]
@@ -0,0 +1,115 @@
+# tests/test_query_cache.py
+import numpy as np
+
+import src.utils.query_cache as query_cache
+from src.utils.query_cache import QueryCache, answer_query, article_overlap, normalize_query
+
+
+class FakeModel:
+    """Embeds known queries with fixed vectors; "men's" and "women's" final are nearly identical."""
+
+    VECTORS = {
+        "men's 100m final": [1.0, 0.0, 0.0],
+        "women's 100m final": [0.99, 0.05, 0.0],
+        "election polls": [0.0, 0.0, 1.0],
+    }
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, query):
+        self.calls += 1
+        return np.asarray(self.VECTORS[query], dtype=np.float32)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query():
+    assert normalize_query("Who  won the 100m?") == normalize_query("who won the 100m")
+
+
+def test_exact_hits_need_no_model():
+    cache = QueryCache()
+    cache.store("Who won?", "Answer", compute_ms=200)
+    value, info = cache.lookup("who won")
+    assert (value, info["level"]) == ("Answer", "exact")
+    assert cache.lookup("who lost")[0] is None
+    assert cache.stats()["saved_ms"] == 200
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_entries=2)
+    cache.store("a", 1)
+    cache.store("b", 2)
+    cache.lookup("a")
+    cache.store("c", 3)
+    assert cache.lookup("b")[0] is None
+    assert [cache.lookup(query)[0] for query in ("a", "c")] == [1, 3]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    cache = QueryCache(ttl=10, clock=clock)
+    cache.store("a", 1)
+    clock.now = 5
+    cache.store("b", 2)
+    clock.now = 12
+    assert cache.lookup("a")[0] is None
+    assert cache.lookup("b")[0] == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidate_articles_drops_dependent_entries():
+    cache = QueryCache()
+    cache.store("a", 1, articles={"x", "y"})
+    cache.store("b", 2, articles={"y"})
+    cache.store("c", 3, articles={"z"})
+    assert cache.invalidate_articles(["y"]) == 2
+    assert [cache.lookup(query)[0] for query in ("a", "b", "c")] == [None, None, 3]
+    assert cache.invalidate_articles(["y"]) == 0
+
+
+def test_semantic_hit_is_verified_against_fresh_articles():
+    model = FakeModel()
+    cache = QueryCache(model)
+    cache.store("men's 100m final", "Lyles won", articles={"men"})
+
+    value, info = cache.lookup("women's 100m final", current_articles=lambda _: {"women"})
+    assert value is None
+    assert info["overlap"] == 0.0
+    assert cache.stats()["rejected_semantic_hits"] == 1
+
+    value, info = cache.lookup("women's 100m final", current_articles=lambda _: {"men"})
+    assert (value, info["level"], info["overlap"]) == ("Lyles won", "semantic", 1.0)
+    assert cache.lookup("election polls")[0] is None
+
+
+def test_answer_query_does_not_share_answers_across_entities(monkeypatch):
+    articles = {"men's 100m final": "men", "women's 100m final": "women"}
+    monkeypatch.setattr(query_cache, "retrieve_articles", lambda query, model, index, top_k, query_embedding:
+                        [{"id": f"{articles[query]}-0", "metadata": {"article_id": articles[query]}}])
+    monkeypatch.setattr(query_cache, "generate_response", lambda query, matches, **kwargs: f"answer about {query}")
+
+    model = FakeModel()
+    cache = QueryCache(model)
+    first, _ = answer_query(cache, "men's 100m final", model, index=None)
+    second, info = answer_query(cache, "women's 100m final", model, index=None)
+    assert first["answer"] == "answer about men's 100m final"
+    assert second["answer"] == "answer about women's 100m final"
+    assert info["level"] is None
+    assert model.calls == 2
+
+    again, info = answer_query(cache, "Women's 100m final!", model, index=None)
+    assert (again, info["level"]) == (second, "exact")
+
+
+def test_article_overlap():
+    assert article_overlap({"a", "b"}, {"b", "c"}) == 1 / 3
+    assert article_overlap((), ()) == 1.0
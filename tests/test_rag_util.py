@@ -0,0 +1,114 @@
+# tests/test_rag_util.py
+import re
+
+import openai
+import pytest
+
+from src.utils.mock_openai_server import MockOpenAIServer
+from src.utils.rag_util import build_context, generate_response, stream_response
+
+
+class WordEncoding:
+    """One token per word and its trailing whitespace, so the tests need no tiktoken download."""
+
+    def encode_ordinary(self, text):
+        return re.findall(r"\S+\s*|\s+", text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+def match(match_id, article_id, text, headline="Headline"):
+    return {"id": match_id, "score": 1.0, "metadata": {
+        "article_id": article_id, "headline": headline, "url": f"https://bbc.com/{article_id}", "text": text,
+    }}
+
+
+MATCHES = [
+    match("a-1", "a", "Swimmer wins gold in the relay final.", "Olympics"),
+    match("b-1", "b", "Turnout in the swing states is rising.", "Election"),
+    match("a-2", "a", "The team broke the world record.", "Olympics"),
+    # Returned again by the lexical search
+    match("a-1", "a", "Swimmer wins gold in the relay final.", "Olympics"),
+]
+
+
+@pytest.fixture
+def client():
+    with MockOpenAIServer(first_token_latency=0.05, token_latency=0.0) as server:
+        yield openai.OpenAI(base_url=server.base_url, api_key="test"), server
+
+
+def test_build_context_groups_articles_and_drops_duplicate_chunks():
+    context, info = build_context(MATCHES, WordEncoding(), max_tokens=1000)
+    assert context.count("Olympics: https://bbc.com/a") == 1
+    assert context.count("Swimmer wins gold") == 1
+    # Chunks of one article stay together in the order of the best match
+    assert context.index("world record") < context.index("Election")
+    assert info["duplicates"] == 1
+    assert info["articles"] == 2
+    assert info["chunks"] == 3
+    assert info["sources"] == ["a-1", "a-2", "b-1"]
+    assert not info["truncated"]
+
+
+@pytest.mark.parametrize("max_tokens", [5, 12, 20])
+def test_build_context_respects_token_budget(max_tokens):
+    encoding = WordEncoding()
+    context, info = build_context(MATCHES, encoding, max_tokens=max_tokens)
+    assert len(encoding.encode_ordinary(context)) == info["context_tokens"] <= max_tokens
+    assert info["truncated"]
+
+
+def test_build_context_skips_chunks_without_budget_left():
+    encoding = WordEncoding()
+    header = "Olympics: https://bbc.com/a"
+    first = "Swimmer wins gold in the relay final."
+    # Budget ends exactly after the first chunk of article a, or one token (the separator) later
+    for extra in (0, 1):
+        budget = len(encoding.encode_ordinary(header + "\n" + first)) + extra
+        context, info = build_context(MATCHES, encoding, max_tokens=budget)
+        assert info["sources"] == ["a-1"]
+        assert info["chunks"] == 1
+        assert info["truncated"]
+        assert "world record" not in context
+
+
+def test_stream_response_streams_and_records_metrics(client):
+    client, server = client
+    metrics = {}
+    pieces = list(stream_response("Who won gold?", MATCHES, client=client, encoding=WordEncoding(),
+                                  max_context_tokens=1000, max_tokens=5, metrics=metrics))
+
+    assert len(pieces) == 5
+    assert "".join(pieces).startswith("Based on the provided articles:")
+    assert metrics["completion_tokens"] == 5
+    assert metrics["ttft_ms"] >= 50
+    assert metrics["total_ms"] >= metrics["ttft_ms"]
+    assert metrics["duplicates"] == 1
+
+    request = server.requests[-1]
+    assert request["stream"] is True
+    assert request["max_tokens"] == 5
+    prompt = request["messages"][-1]["content"]
+    assert prompt.count("Swimmer wins gold") == 1
+    assert "Frage: Who won gold?" in prompt
+
+
+def test_stream_response_keeps_prompt_within_budget(client):
+    client, server = client
+    metrics = {}
+    generate_response("Who won gold?", MATCHES, client=client, encoding=WordEncoding(), max_context_tokens=8,
+                      metrics=metrics)
+    assert metrics["context_tokens"] <= 8
+    assert metrics["truncated"]
+    assert "Election" not in server.requests[-1]["messages"][-1]["content"]
+
+
+def test_stream_response_without_matches_still_answers():
+    with MockOpenAIServer(reply="Der Kontext enthält keine Antwort.", first_token_latency=0.0) as server:
+        client = openai.OpenAI(base_url=server.base_url, api_key="test")
+        metrics = {}
+        answer = generate_response("Unknown?", [], client=client, encoding=WordEncoding(), metrics=metrics)
+    assert answer == "Der Kontext enthält keine Antwort."
+    assert metrics["context_tokens"] == 0
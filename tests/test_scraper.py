@@ -0,0 +1,57 @@
+# tests/test_scraper.py
+import os
+
+from src.scraping.fixture_server import FixtureServer, make_synthetic_fixtures
+from src.scraping.scraper import FAILED_CONTENT, ValidatorCache, scrape_bbc_news
+
+
+def add_article(directory, name, headline):
+    with open(os.path.join(directory, "news", "articles", f"{name}.html"), "w", encoding="utf-8") as f:
+        f.write(f"<html><body><article><p>Text of {headline}.</p></article></body></html>")
+    front_page = os.path.join(directory, "news.html")
+    with open(front_page, encoding="utf-8") as f:
+        html = f.read()
+    card = f'<a href="/news/articles/{name}"><h2 data-testid="card-headline">{headline}</h2></a>'
+    with open(front_page, "w", encoding="utf-8") as f:
+        f.write(html.replace("<body>", "<body>" + card))
+
+
+def test_scrape_parses_front_page_and_articles(tmp_path):
+    make_synthetic_fixtures(tmp_path, n_articles=5, paragraphs=2)
+    with FixtureServer(tmp_path) as server:
+        df = scrape_bbc_news(f"{server.url}/news", max_workers=2)
+
+    assert len(df) == 5
+    assert df["url"].is_unique
+    assert not (df["content"] == FAILED_CONTENT).any()
+    assert set(df["author"]) == {f"Reporter {i}" for i in range(5)}
+
+
+def test_conditional_front_page_does_not_lose_articles(tmp_path):
+    fixtures = tmp_path / "fixtures"
+    validators_path = str(tmp_path / "validators.json")
+    make_synthetic_fixtures(fixtures, n_articles=4, paragraphs=2)
+    with FixtureServer(fixtures) as server:
+        url = f"{server.url}/news"
+
+        # 200: a run that fails before its articles are stored does not save the validators
+        first = scrape_bbc_news(url, validators=ValidatorCache(validators_path))
+        assert len(first) == 4
+        assert not os.path.exists(validators_path)
+
+        # Repeated in full; one article is not stored (e.g. filtered out), then the validators are saved
+        validators = ValidatorCache(validators_path)
+        second = scrape_bbc_news(url, validators=validators)
+        assert len(second) == 4
+        left_out = second["url"].iloc[-1]
+        stored = set(second["url"]) - {left_out}
+        validators.save()
+
+        # 304: the unchanged front page short-circuits the run
+        assert scrape_bbc_news(url, known_urls=stored, validators=ValidatorCache(validators_path)).empty
+
+        # Once the front page changes, the article that was never stored is fetched again with its content
+        add_article(fixtures, "fresh", "Fresh story")
+        third = scrape_bbc_news(url, known_urls=stored, validators=ValidatorCache(validators_path))
+    assert set(third["url"]) == {left_out, f"{url}/articles/fresh"}
+    assert not (third["content"] == FAILED_CONTENT).any()
@@ -0,0 +1,96 @@
+# tests/test_tracing.py
+import json
+import urllib.request
+
+import pytest
+
+from src.utils.tracing import MetricsServer, Tracer, text_bytes
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_spans_nest_into_one_trace():
+    tracer = Tracer()
+    with tracer.span("query") as root:
+        with tracer.span("retrieve", top_k=5):
+            tracer.add("items", 3)
+        with tracer.span("generate"):
+            tracer.add("prompt_tokens", 120)
+
+    spans = tracer.trace(root.trace_id)
+    assert [span.name for span in spans] == ["query", "retrieve", "generate"]
+    assert [span.depth for span in spans] == [0, 1, 1]
+    assert spans[1].attributes == {"top_k": 5}
+    assert spans[1].counters == {"items": 3}
+    assert [span.name for span in tracer.traces()] == ["query"]
+
+
+def test_failed_span_is_recorded_and_reraised():
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("generate"):
+            raise ValueError("boom")
+
+    span = tracer.traces()[0]
+    assert span.status == "error"
+    assert span.error == "ValueError: boom"
+    assert tracer.metrics.stage_summary()[0]["errors"] == 1
+
+
+def test_export_buffers_finished_traces(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(export_path=str(path), flush_every=3, flush_interval=3600)
+    for number in range(2):
+        with tracer.span("chunk.recursive", doc=number):
+            with tracer.span("split"):
+                pass
+
+    assert not path.exists()
+    with tracer.span("chunk.recursive", doc=2):
+        pass
+    traces = read_lines(path)
+    assert [trace["spans"][0]["attributes"]["doc"] for trace in traces] == [0, 1, 2]
+    assert [len(trace["spans"]) for trace in traces] == [2, 2, 1]
+    assert [span["name"] for span in traces[0]["spans"]] == ["chunk.recursive", "split"]
+
+    with tracer.span("chunk.recursive", doc=3):
+        pass
+    tracer.flush()
+    assert len(read_lines(path)) == 4
+
+
+def test_export_writes_traces_in_memory(tmp_path):
+    tracer = Tracer()
+    with tracer.span("query"):
+        with tracer.span("retrieve"):
+            pass
+    with tracer.span("query") as second:
+        pass
+
+    path = tmp_path / "out" / "traces.jsonl"
+    tracer.export(str(path))
+    tracer.export(str(path), trace_id=second.trace_id)
+    traces = read_lines(path)
+    assert [len(trace["spans"]) for trace in traces] == [2, 1, 1]
+    assert traces[2]["trace_id"] == second.trace_id
+
+
+def test_metrics_render_and_server():
+    tracer = Tracer()
+    with tracer.span("retrieve"):
+        tracer.add("bytes", 10)
+
+    with MetricsServer(tracer) as server:
+        with urllib.request.urlopen(server.url) as response:
+            body = response.read().decode("utf-8")
+    assert 'rag_stage_calls_total{stage="retrieve",status="ok"} 1' in body
+    assert 'rag_stage_bytes_total{stage="retrieve"} 10' in body
+    assert 'rag_stage_seconds_count{stage="retrieve"} 1' in body
+
+
+def test_text_bytes():
+    assert text_bytes("gold medal") == 10
+    assert text_bytes("Zürich") == len("Zürich".encode("utf-8"))
@@ -0,0 +1,81 @@
+# tests/test_vector_store.py
+import numpy as np
+import pytest
+
+from src.utils.vector_store import LocalVectorIndex, VectorStore, evaluate_backends
+
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(1).normal(size=(500, 16)).astype(np.float32)
+
+
+@pytest.fixture
+def index(embeddings):
+    ids = [f"doc-{i}" for i in range(len(embeddings))]
+    return LocalVectorIndex.from_embeddings(ids, embeddings, [{"row": i} for i in range(len(ids))])
+
+
+def test_vector_store_is_abstract():
+    with pytest.raises(TypeError):
+        VectorStore()
+
+
+def test_query_returns_pinecone_shaped_matches(index, embeddings):
+    matches = index.query(embeddings[7].tolist(), top_k=3, include_metadata=True)["matches"]
+    assert len(matches) == 3
+    assert matches[0]["id"] == "doc-7"
+    assert matches[0]["metadata"] == {"row": 7}
+    assert matches[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert [m["score"] for m in matches] == sorted((m["score"] for m in matches), reverse=True)
+    assert "metadata" not in index.query(embeddings[7], top_k=1)["matches"][0]
+
+
+def test_upsert_replaces_and_delete_compacts(index, embeddings):
+    index.upsert([("doc-1", embeddings[2], {"row": "replaced"}), ("new", embeddings[3], {})])
+    assert len(index) == 501
+    matches = index.query(embeddings[2], top_k=2, include_metadata=True)["matches"]
+    assert {m["id"] for m in matches} == {"doc-1", "doc-2"}
+
+    index.delete(["doc-2", "missing"])
+    assert len(index) == 500
+    assert index.query(embeddings[2], top_k=1)["matches"][0]["id"] == "doc-1"
+    assert index.describe_index_stats() == {"total_vector_count": 500, "dimension": 16}
+
+
+def test_upsert_accepts_a_generator(index, embeddings):
+    vectors = ((f"gen-{i}", embeddings[i], {}) for i in range(3))
+    assert index.upsert(vectors) == {"upserted_count": 3}
+    assert len(index) == 503
+
+
+def test_ivf_finds_most_exact_neighbours(index, embeddings):
+    exact = LocalVectorIndex.from_embeddings(index.ids, embeddings)
+    index.build_ivf(n_lists=10, n_probe=4)
+    rows = evaluate_backends(embeddings[:50], {"exact": exact, "ivf": index}, reference="exact", top_k=5)
+    recall = {row["backend"]: row["recall@5"] for row in rows}
+    assert recall["exact"] == 1.0
+    assert recall["ivf"] > 0.7
+
+
+def test_save_and_load_round_trip(tmp_path, index, embeddings):
+    index.build_ivf(n_lists=10)
+    index.save(str(tmp_path))
+    loaded = LocalVectorIndex.load(str(tmp_path))
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.memory_bytes() == loaded.centroids.nbytes + loaded.assignments.nbytes
+    assert loaded.query(embeddings[5], top_k=1, exact=True)["matches"][0]["id"] == "doc-5"
+
+
+def test_memory_mapped_index_can_be_saved_back_to_its_own_path(tmp_path, index, embeddings):
+    index.save(str(tmp_path))
+    loaded = LocalVectorIndex.load(str(tmp_path))
+    loaded.save(str(tmp_path))
+    loaded.upsert([("extra", embeddings[0] * -1, {})])
+    loaded.save(str(tmp_path))
+
+    reloaded = LocalVectorIndex.load(str(tmp_path))
+    assert len(reloaded) == 501
+    np.testing.assert_allclose(reloaded.matrix[:500], index.matrix, atol=1e-6)
+    assert reloaded.query(embeddings[9], top_k=1)["matches"][0]["id"] == "doc-9"
+    assert reloaded.centroids is None
@@ -0,0 +1,84 @@
+# tests/test_warm_server.py
+import os
+import stat
+import threading
+
+import numpy as np
+import pytest
+
+from src.utils.embedding_util import HashingEmbedder
+from src.utils.vector_store import LocalVectorIndex
+from src.utils.warm_server import WarmServer, connect
+
+TEXTS = ["Olympic relay final", "Swing state turnout"]
+
+
+@pytest.fixture
+def key_path(tmp_path, monkeypatch):
+    monkeypatch.delenv("RAG_WARM_SERVER_KEY", raising=False)
+    monkeypatch.setenv("RAG_WARM_SERVER_KEY_FILE", str(tmp_path / "warm.key"))
+    return tmp_path / "warm.key"
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = str(tmp_path / "index")
+    LocalVectorIndex.from_embeddings(["a", "b"], HashingEmbedder().encode(TEXTS), [{"n": 0}, {"n": 1}]).save(path)
+    return path
+
+
+def start_server(preload_indexes=()):
+    server = WarmServer("hashing", ("127.0.0.1", 0), preload_indexes=preload_indexes)
+    ready = threading.Event()
+    threading.Thread(target=server.serve_forever, args=(ready,), daemon=True).start()
+    assert ready.wait(10)
+    return server
+
+
+def test_client_uses_the_server_model_and_preloaded_index(key_path, index_path):
+    server = start_server([f"local:{index_path}"])
+    client = connect(server.address)
+    try:
+        np.testing.assert_array_equal(client.encode(TEXTS), HashingEmbedder().encode(TEXTS))
+        assert client.get_sentence_embedding_dimension() == 384
+        matches = client.index(f"local:{index_path}").query(client.encode(TEXTS[1]), top_k=1,
+                                                            include_metadata=True)["matches"]
+        assert matches[0]["id"] == "b"
+        assert matches[0]["metadata"] == {"n": 1}
+        assert client.stats()["encode"]["requests"] == 2
+    finally:
+        client.close()
+
+
+def test_server_creates_a_private_random_key(key_path):
+    server = start_server()
+    assert stat.S_IMODE(os.stat(key_path).st_mode) == 0o600
+    assert len(key_path.read_text()) == 64
+
+    # A client without the key cannot connect
+    os.environ["RAG_WARM_SERVER_KEY"] = "guessed"
+    try:
+        assert connect(server.address) is None
+    finally:
+        del os.environ["RAG_WARM_SERVER_KEY"]
+
+
+def test_client_without_key_does_not_connect(key_path):
+    assert connect(("127.0.0.1", 1)) is None
+    assert not key_path.exists()
+
+
+def test_key_file_readable_by_others_is_rejected(key_path):
+    server = start_server()
+    os.chmod(key_path, 0o644)
+    assert connect(server.address) is None
+
+
+def test_clients_cannot_open_local_indexes_that_were_not_preloaded(key_path, index_path):
+    server = start_server()
+    client = connect(server.address)
+    try:
+        with pytest.raises(RuntimeError, match="not preloaded"):
+            client.index(f"local:{index_path}").query([0.0] * 384, top_k=1)
+    finally:
+        client.close()